@@ -0,0 +1,48 @@
+"""
+AST memory footprint and comparison speed for long generated queries, like
+the ones built by scripts from a list of records.
+
+    $ python benchmarks/bench_ast.py [terms ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmark import measure, report
+
+from djangoql.parser import get_parser
+
+
+def build_query(terms):
+    return ' or '.join(
+        '(name = "b%s" and author.id in (%s, %s))' % (i, i, i + 1)
+        for i in range(terms)
+    )
+
+
+def main(sizes):
+    parser = get_parser('recursive_descent')
+    for terms in sizes:
+        query = build_query(terms)
+        tracemalloc.start()
+        start = time.time()
+        ast = parser.parse(query)
+        elapsed = time.time() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        report('parse: %s terms' % terms, elapsed)
+        sys.stdout.write('%-50s %9.2f MB\n' % (
+            'AST memory: %s terms' % terms,
+            memory / 1024.0 / 1024,
+        ))
+        other = parser.parse(query)
+        report('compare: %s terms' % terms, measure(
+            lambda: ast == other, number=10, repeat=3,
+        ))
+        report('hash: %s terms' % terms, measure(
+            lambda: hash(ast), number=10, repeat=3,
+        ))
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]] or [1000, 5000, 20000])
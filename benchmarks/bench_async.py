@@ -0,0 +1,148 @@
+"""
+Load test of the suggestions view under ASGI: SuggestionsAPIView vs.
+AsyncSuggestionsAPIView, served by Django's ASGI handler in process.
+Measures throughput of concurrent requests, and how long a request that is
+abandoned by its client keeps the server busy (the async view cancels its
+query). Uses a temporary SQLite database with given number of books.
+
+    $ python benchmarks/bench_async.py [books] [concurrency]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmark import report, setup_django
+
+
+urlpatterns = []
+
+
+def setup(books):
+    setup_django()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    from core.models import Book
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_async.sqlite3')
+    connection.settings_dict['TEST']['NAME'] = path
+    connection.creation.create_test_db(verbosity=0)
+    user = User.objects.create(username='bench')
+    Book.objects.bulk_create(
+        Book(name='book %s %s' % (i % 997, i), author=user)
+        for i in range(books)
+    )
+    settings.ROOT_URLCONF = __name__
+    settings.ALLOWED_HOSTS = ['*']
+    return connection
+
+
+def add_urls():
+    from django.urls import path
+
+    from core.models import Book
+    from djangoql.async_views import AsyncSuggestionsAPIView
+    from djangoql.schema import DjangoQLSchema
+    from djangoql.views import SuggestionsAPIView
+
+    class Schema(DjangoQLSchema):
+        suggest_options = {Book: ['name']}
+
+    urlpatterns.extend([
+        path('sync/', SuggestionsAPIView.as_view(schema=Schema(Book))),
+        path('async/', AsyncSuggestionsAPIView.as_view(schema=Schema(Book))),
+    ])
+
+
+async def request(app, url, search, disconnect_after=None):
+    """
+    Sends a GET request to the ASGI app, and disconnects after given number
+    of seconds if it's not answered by then
+    """
+    disconnect = asyncio.Event()
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': url,
+        'raw_path': url.encode('ascii'),
+        'query_string': ('field=name&search=%s' % search).encode('ascii'),
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': ('127.0.0.1', 10000),
+        'server': ('localhost', 80),
+    }
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnect.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.body' and \
+                not message.get('more_body'):
+            disconnect.set()
+
+    if disconnect_after is not None:
+        asyncio.get_running_loop().call_later(disconnect_after, disconnect.set)
+    await app(scope, receive, send)
+
+
+async def load(app, url, concurrency, count, disconnect_after=None):
+    """
+    Sends count requests, concurrency of them at a time, and returns the
+    time it took to finish all of them
+    """
+    searches = ['%s 1' % (i % 997) for i in range(count)]
+
+    async def client():
+        while searches:
+            await request(app, url, searches.pop(), disconnect_after)
+
+    start = time.time()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return time.time() - start
+
+
+def main(books, concurrency):
+    connection = setup(books)
+    add_urls()
+    from django.core.asgi import get_asgi_application
+
+    app = get_asgi_application()
+    count = concurrency * 5
+    try:
+        for url in ('/sync/', '/async/'):
+            name = url.strip('/')
+            seconds = asyncio.run(load(app, url, concurrency, count))
+            report(
+                '%s: %s requests, %s at a time' % (name, count, concurrency),
+                seconds,
+            )
+            sys.stdout.write('%-50s %10.1f/s\n' % (
+                '%s: throughput' % name,
+                count / seconds,
+            ))
+            # One at a time, so that requests aren't abandoned before their
+            # views even start
+            seconds = asyncio.run(load(app, url, 1, 10, disconnect_after=0.01))
+            report('%s: request abandoned after 10 ms' % name, seconds / 10)
+    finally:
+        connection.creation.destroy_test_db(
+            connection.settings_dict['NAME'],
+            verbosity=0,
+        )
+
+
+if __name__ == '__main__':
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else 200000,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 10,
+    )
@@ -0,0 +1,38 @@
+"""
+Validation and conversion of huge "in (...)" lists, for plain fields and
+fields with choices.
+
+    $ python benchmarks/bench_choices.py [size]
+"""
+import sys
+
+from benchmark import measure, report, setup_django
+
+
+def main(size):
+    setup_django()
+    from core.models import Book
+    from djangoql.schema import IntField, StrField
+
+    labels = ['Drama', 'Comics', 'Other']
+    samples = [
+        ('ints', IntField(model=Book, name='id'), list(range(size))),
+        ('strings', StrField(model=Book, name='name'), [
+            'book%s' % i for i in range(size)
+        ]),
+        ('choice codes', IntField(model=Book, name='genre'), [
+            i % 5 for i in range(size)
+        ]),
+        ('choice labels', IntField(model=Book, name='genre'), [
+            labels[i % 3] for i in range(size)
+        ]),
+    ]
+    for name, field, values in samples:
+        report(
+            'clean: %s %s' % (size, name),
+            measure(lambda: field.clean('in', values), number=1, repeat=3),
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
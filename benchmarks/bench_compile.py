@@ -0,0 +1,50 @@
+"""
+Validation and Q building for queries with lots of dates: single-pass
+compilation vs. separate validation and build_filter() passes, which parse
+each date twice.
+
+    $ python benchmarks/bench_compile.py [dates]
+"""
+import sys
+from datetime import date, timedelta
+
+from benchmark import measure, report, setup_django
+
+
+def main(count):
+    setup_django()
+    from core.models import Book
+    from djangoql.parser import get_parser
+    from djangoql.queryset import build_filter
+    from djangoql.schema import DjangoQLSchema
+
+    start = date(2000, 1, 1)
+    dates = [
+        '"%s 12:00"' % (start + timedelta(days=i)).isoformat()
+        for i in range(count)
+    ]
+    queries = [
+        ('in list', 'written in (%s)' % ', '.join(dates)),
+        ('chain', ' or '.join('written = %s' % d for d in dates)),
+    ]
+    for name, query in queries:
+        ast = get_parser().parse(query)
+
+        def two_passes():
+            schema = DjangoQLSchema(Book)
+            schema.validate(ast)
+            build_filter(ast, schema)
+
+        def single_pass():
+            schema = DjangoQLSchema(Book)
+            build_filter(ast, schema, compiled=schema.compile(ast))
+
+        for func in (two_passes, single_pass):
+            report(
+                '%s: %s of %s dates' % (func.__name__, name, count),
+                measure(func, number=10, repeat=3),
+            )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
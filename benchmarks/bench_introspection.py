@@ -0,0 +1,98 @@
+"""
+Schema introspection of a large, densely connected graph of models: eager
+introspection vs. lazy introspection which touches only the models that
+a query refers to, and loading of a snapshot of the whole graph.
+Models have fields of various types, including subclasses of built-in
+fields, so that resolving of DjangoQL field classes is measured too.
+
+    $ python benchmarks/bench_introspection.py [models]
+"""
+import random
+import sys
+import time
+from io import StringIO
+
+from benchmark import measure, report, setup_django
+
+
+def create_models(count, relations=3):
+    from django.db import models
+
+    random.seed(0)
+    result = []
+    for i in range(count):
+        attrs = {
+            '__module__': __name__,
+            'Meta': type('Meta', (), {'app_label': 'core'}),
+            'name': models.CharField(max_length=10),
+            'slug': models.SlugField(),
+            'email': models.EmailField(),
+            'text': models.TextField(),
+            'count': models.PositiveIntegerField(),
+            'size': models.BigIntegerField(),
+            'price': models.DecimalField(max_digits=7, decimal_places=2),
+            'rating': models.FloatField(),
+            'is_active': models.BooleanField(default=False),
+            'created': models.DateTimeField(),
+            'day': models.DateField(),
+            'uuid': models.UUIDField(),
+        }
+        for j in random.sample(range(i), min(i, relations)):
+            attrs['rel%s' % j] = models.ForeignKey(
+                result[j],
+                on_delete=models.CASCADE,
+                related_name='back%s_%s' % (i, j),
+            )
+        result.append(type(str('Model%s' % i), (models.Model,), attrs))
+    return result
+
+
+def main(count):
+    setup_django()
+    from django.test.utils import isolate_apps
+
+    from djangoql.parser import get_parser
+    from djangoql.schema import DjangoQLSchema
+
+    class EagerSchema(DjangoQLSchema):
+        cache_introspection = False
+
+    class LazySchema(EagerSchema):
+        lazy_introspection = True
+
+    with isolate_apps('core'):
+        models = create_models(count)
+        root = models[count // 2]
+        ast = get_parser().parse('name = "x"')
+        report(
+            'introspect: %s models' % count,
+            measure(lambda: EagerSchema(root).models, number=5, repeat=5),
+        )
+        for schema_cls in (EagerSchema, LazySchema):
+            schema = schema_cls(root)
+            start = time.time()
+            schema.validate(ast)
+            report('%s: validate' % schema_cls.__name__, time.time() - start)
+            start = time.time()
+            found = len(schema.models)
+            report(
+                '%s: all %s models' % (schema_cls.__name__, found),
+                time.time() - start,
+            )
+
+        f = StringIO()
+        EagerSchema(root).dump_snapshot(f)
+        f.seek(0)
+        start = time.time()
+        schema = EagerSchema.load_snapshot(root, f)
+        report(
+            'load_snapshot: %s models, %.1f KB' % (
+                len(schema.models),
+                len(f.getvalue()) / 1024.0,
+            ),
+            time.time() - start,
+        )
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,40 @@
+"""
+Tokenization speed of the PLY-based DjangoQLLexer vs. DjangoQLFastLexer on
+long queries and large "in (...)" lists.
+"""
+from benchmark import measure, report
+
+from djangoql.lexer import DjangoQLFastLexer, DjangoQLLexer
+
+
+def drain(lexer, text):
+    token = lexer.input(text).token
+    while token() is not None:
+        pass
+
+
+def main():
+    long_query = ' or '.join(
+        '(name ~ "book %s" and rating >= %s.5 and author.is_active = True)' % (
+            i, i % 5,
+        )
+        for i in range(100)
+    )
+    samples = [('100 conditions', long_query)]
+    for size in (1000, 10000, 100000):
+        samples.append((
+            'in list of %s items' % size,
+            'id in (%s)' % ', '.join(str(i) for i in range(size)),
+        ))
+    lexers = (('ply', DjangoQLLexer()), ('fast', DjangoQLFastLexer()))
+    for label, text in samples:
+        number = max(1, 100000 // len(text))
+        for name, lexer in lexers:
+            report(
+                '%s: %s' % (name, label),
+                measure(lambda: drain(lexer, text), number=number, repeat=3),
+            )
+
+
+if __name__ == '__main__':
+    main()
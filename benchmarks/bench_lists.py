@@ -0,0 +1,35 @@
+"""
+Parsing time and AST memory footprint for huge "in (...)" lists, like lists
+of IDs pasted from a spreadsheet.
+
+    $ python benchmarks/bench_lists.py [size ...]
+"""
+import sys
+import time
+import tracemalloc
+
+from benchmark import report
+
+from djangoql.parser import get_parser
+
+
+def main(sizes):
+    for size in sizes:
+        query = 'id in (%s)' % ', '.join(str(i) for i in range(size))
+        for backend in ('ply', 'recursive_descent'):
+            parser = get_parser(backend)
+            start = time.time()
+            parser.parse(query)
+            report('%s: %s items' % (backend, size), time.time() - start)
+        tracemalloc.start()
+        ast = parser.parse(query)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        sys.stdout.write('%-50s %9.1f MB\n' % (
+            'AST memory: %s items' % len(ast.right.values),
+            memory / 1024.0 / 1024,
+        ))
+
+
+if __name__ == '__main__':
+    main([int(s) for s in sys.argv[1:]] or [10000, 100000, 1000000])
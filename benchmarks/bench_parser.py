@@ -0,0 +1,40 @@
+"""
+Parse latency of a fresh parser per query (as apply_search() used to do) vs.
+the shared per-thread parser returned by get_parser(), and of the PLY-based
+parser vs. the recursive descent one.
+"""
+from benchmark import measure, report
+
+from djangoql.parser import DjangoQLParser, get_parser
+
+
+QUERIES = (
+    'name = "foo"',
+    'name ~ "war" and author.last_name = "Tolstoy"',
+    '(genre in (1, 2, 3) or rating >= 4.5) and written > "2017-01-30" '
+    'and author.groups.name not in ("Banned", "Spam") and is_published = True',
+)
+
+
+def main():
+    for query in QUERIES:
+        label = query if len(query) < 30 else query[:27] + '...'
+        report(
+            'uncached parser: %s' % label,
+            measure(
+                lambda: DjangoQLParser(write_tables=False).parse(query),
+                number=20,
+            ),
+        )
+        report(
+            'get_parser(): %s' % label,
+            measure(lambda: get_parser('ply').parse(query)),
+        )
+        report(
+            'recursive descent: %s' % label,
+            measure(lambda: get_parser('recursive_descent').parse(query)),
+        )
+
+
+if __name__ == '__main__':
+    main()
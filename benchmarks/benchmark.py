@@ -0,0 +1,45 @@
+"""
+Shared helpers for DjangoQL benchmarks.
+
+Benchmarks are plain scripts, run them from the repository root, e.g.:
+
+    $ python benchmarks/bench_parser.py
+"""
+import os
+import sys
+import timeit
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def setup_django():
+    """
+    Configure Django with the settings of the test project, so benchmarks can
+    use its models
+    """
+    test_project = os.path.join(ROOT, 'test_project')
+    if test_project not in sys.path:
+        sys.path.insert(0, test_project)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'test_project.settings')
+    import django
+    django.setup()
+
+
+def measure(func, number=1000, repeat=5):
+    """
+    Returns the best time of a single func() call, in seconds
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number
+
+
+def report(name, seconds):
+    if seconds >= 1:
+        value = '%.3f s' % seconds
+    elif seconds >= 0.001:
+        value = '%.3f ms' % (seconds * 1000)
+    else:
+        value = '%.3f us' % (seconds * 1000000)
+    sys.stdout.write('%-50s %12s\n' % (name, value))
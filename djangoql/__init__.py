@@ -1 +1,11 @@
 __version__ = '0.18.1'
+
+try:
+    import django
+except ImportError:
+    # setup.py imports the package to get its version
+    pass
+else:
+    if django.VERSION < (3, 2):
+        # Older versions don't pick up apps.DjangoQLConfig automatically
+        default_app_config = 'djangoql.apps.DjangoQLConfig'
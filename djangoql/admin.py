@@ -1,3 +1,4 @@
+import hashlib
 import json
 
 from django.contrib import messages
@@ -7,20 +8,22 @@ from django.db import DataError, NotSupportedError
 from django.forms import Media
 from django.http import HttpResponse
 from django.template.loader import render_to_string
+from django.views.decorators.http import condition
 from django.views.generic import TemplateView
 
+from .cache import LRUCache
 from .compat import text_type
 from .exceptions import DjangoQLError
 from .queryset import apply_search
-from .schema import DjangoQLSchema
+from .schema import DjangoQLField, DjangoQLSchema, StrField, _func
 from .serializers import SuggestionsAPISerializer
 from .views import SuggestionsAPIView
 
 
 try:
-    from django.core.urlresolvers import reverse
+    from django.core.urlresolvers import NoReverseMatch, reverse
 except ImportError:  # Django 2.0
-    from django.urls import reverse
+    from django.urls import NoReverseMatch, reverse
 
 try:
     from django.urls import re_path  # Django >= 4.0
@@ -32,6 +35,27 @@ except ImportError:
 
 DJANGOQL_SEARCH_MARKER = 'q-l'
 
+# Schemas serialized for the completion widget, keyed by their ETags
+_introspection_payloads = LRUCache(maxsize=100)
+
+
+def _has_static_options(schema):
+    """
+    Checks that options of all fields that are serialized with the schema
+    are their choices, which can't change unless the schema does. Like
+    SuggestionsAPISerializer, it doesn't look at suggest_options: options
+    of fields without async_options are serialized anyway.
+    """
+    defaults = (_func(DjangoQLField.get_options), _func(StrField.get_options))
+    for fields in schema.models.values():
+        for field in fields.values():
+            if field.async_options:
+                continue
+            if _func(type(field).get_options) not in defaults or \
+                    not field._field_choices():
+                return False
+    return True
+
 
 class DjangoQLChangeList(ChangeList):
     def get_filters_params(self, *args, **kwargs):
@@ -49,6 +73,8 @@ class DjangoQLSearchMixin(object):
     djangoql_completion = True
     djangoql_completion_enabled_by_default = True
     djangoql_schema = DjangoQLSchema
+    djangoql_cache = None
+    djangoql_suggestions_cache = None
     djangoql_syntax_help_template = 'djangoql/syntax_help.html'
 
     def search_mode_toggle_enabled(self):
@@ -78,7 +104,12 @@ class DjangoQLSearchMixin(object):
             return queryset, use_distinct
 
         try:
-            qs = apply_search(queryset, search_term, self.djangoql_schema)
+            qs = apply_search(
+                queryset,
+                search_term,
+                self.djangoql_schema,
+                cache=self.djangoql_cache,
+            )
         except (DjangoQLError, ValueError, FieldError, ValidationError) as e:
             msg = self.djangoql_error_message(e)
             messages.add_message(request, messages.WARNING, msg)
@@ -141,7 +172,7 @@ class DjangoQLSearchMixin(object):
             custom_urls += [
                 re_path(
                     r'^introspect/$',
-                    self.admin_site.admin_view(self.introspect),
+                    self.djangoql_admin_view(self.introspect),
                     name='%s_%s_djangoql_introspect' % (
                         self.model._meta.app_label,
                         self.model._meta.model_name,
@@ -149,7 +180,7 @@ class DjangoQLSearchMixin(object):
                 ),
                 re_path(
                     r'^suggestions/$',
-                    self.admin_site.admin_view(self.suggestions),
+                    self.djangoql_admin_view(self.suggestions),
                     name='%s_%s_djangoql_suggestions' % (
                         self.model._meta.app_label,
                         self.model._meta.model_name,
@@ -165,21 +196,85 @@ class DjangoQLSearchMixin(object):
             ]
         return custom_urls + super(DjangoQLSearchMixin, self).get_urls()
 
-    def introspect(self, request):
-        suggestions_url = reverse('%s:%s_%s_djangoql_suggestions' % (
+    def djangoql_admin_view(self, view):
+        """
+        Wraps introspect and suggestions views for the admin site
+        """
+        return self.admin_site.admin_view(view)
+
+    def djangoql_suggestions_url(self):
+        return reverse('%s:%s_%s_djangoql_suggestions' % (
             self.admin_site.name,
             self.model._meta.app_label,
             self.model._meta.model_name,
         ))
+
+    def djangoql_introspection_etag(self, schema, suggestions_url):
+        content = '%s %s' % (schema.fingerprint(), suggestions_url)
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def djangoql_introspection(self, schema, suggestions_url):
+        """
+        Returns the schema serialized for the completion widget and its ETag.
+        It's cached by the ETag, so it's serialized again only when the
+        schema changes. Schemas with fields whose options are serialized too
+        and aren't choices can change without that, so they are serialized
+        on every call, and their ETags are hashes of their payloads.
+        """
+        key = self.djangoql_introspection_etag(schema, suggestions_url)
+        content = _introspection_payloads.get(key)
+        if content is not None:
+            return key, content
         serializer = SuggestionsAPISerializer(suggestions_url)
-        response = serializer.serialize(self.djangoql_schema(self.model))
-        return HttpResponse(
-            content=json.dumps(response, indent=2),
-            content_type='application/json; charset=utf-8',
+        content = json.dumps(serializer.serialize(schema), indent=2)
+        if _has_static_options(schema):
+            _introspection_payloads.set(key, content)
+            return key, content
+        return hashlib.sha1(content.encode('utf-8')).hexdigest(), content
+
+    def djangoql_warm_up(self):
+        """
+        Introspect the schema and serialize it for the completion widget in
+        advance, so that the first requests don't have to do it
+        """
+        self.djangoql_schema.warm_up(self.model)
+        if not self.djangoql_completion:
+            return
+        try:
+            suggestions_url = self.djangoql_suggestions_url()
+        except NoReverseMatch:
+            # The admin site isn't in the URLconf
+            return
+        self.djangoql_introspection(
+            self.djangoql_schema(self.model),
+            suggestions_url,
         )
 
+    def introspect(self, request):
+        suggestions_url = self.djangoql_suggestions_url()
+        schema = self.djangoql_schema(self.model)
+
+        introspection = []
+
+        def etag(request):
+            # Cached payloads aren't sent again if the client has them
+            introspection.extend(
+                self.djangoql_introspection(schema, suggestions_url),
+            )
+            return introspection[0]
+
+        @condition(etag_func=etag)
+        def view(request):
+            return HttpResponse(
+                content=introspection[1],
+                content_type='application/json; charset=utf-8',
+            )
+
+        return view(request)
+
     def suggestions(self, request):
         view = SuggestionsAPIView.as_view(
             schema=self.djangoql_schema(self.model),
+            cache=self.djangoql_suggestions_cache,
         )
         return view(request)
@@ -0,0 +1,38 @@
+import threading
+
+from django.apps import AppConfig
+from django.core.signals import request_started
+
+from .conf import get_setting
+
+
+_warm_up_lock = threading.Lock()
+
+
+def warm_up_on_request(**kwargs):
+    """
+    Warms up DjangoQL once, before the first request of the process is
+    handled
+    """
+    with _warm_up_lock:
+        if not request_started.disconnect(dispatch_uid='djangoql_warm_up'):
+            # Another thread has done it
+            return
+        from .warmup import warm_up
+        warm_up()
+
+
+class DjangoQLConfig(AppConfig):
+    name = 'djangoql'
+    verbose_name = 'DjangoQL'
+
+    def ready(self):
+        # Warm up schemas of model admins and querysets, if enabled. It's
+        # done on the first request rather than here, so that management
+        # commands like migrate don't run it before URLconfs or tables
+        # exist.
+        if get_setting('DJANGOQL_WARM_UP', False):
+            request_started.connect(
+                warm_up_on_request,
+                dispatch_uid='djangoql_warm_up',
+            )
@@ -1,12 +1,67 @@
 from __future__ import unicode_literals
 
-from .compat import text_type
+import weakref
+from array import array
+
+from .compat import PY2, binary_type, text_type
+
+
+_setattr = object.__setattr__
+
+if PY2:
+    # str and unicode, int and long values are the same for the schema
+    _value_types = {binary_type: text_type, long: int}  # noqa: F821
+else:
+    _value_types = {}
+
+
+def _value_type(value):
+    value_type = type(value)
+    return _value_types.get(value_type, value_type)
 
 
 class Node(object):
+    """
+    Base class for AST nodes.
+
+    Nodes are immutable, and their structural hash is computed once, when
+    the node is created. This makes them usable as dict keys and cheap to
+    compare: nodes with different hashes are never equal. Values of
+    different types are never equal, even if Python considers them equal,
+    like 1, 1.0 and True.
+    """
+    __slots__ = ('_hash',)
+    _fields = ()
+
+    @classmethod
+    def _create(cls, *values):
+        node = object.__new__(cls)
+        for field, value in zip(cls._fields, values):
+            _setattr(node, field, value)
+        _setattr(node, '_hash', hash(
+            (cls.__name__,) + node._compare_key(),
+        ))
+        return node
+
+    def _compare_key(self):
+        return tuple(getattr(self, f) for f in self._fields)
+
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def __reduce__(self):
+        return _restore, (
+            self.__class__,
+            tuple(getattr(self, f) for f in self._fields),
+        )
+
     def __str__(self):
         children = []
-        for k, v in self.__dict__.items():
+        for k in self._fields:
+            v = getattr(self, k)
             if isinstance(v, (list, tuple)):
                 v = '[%s]' % ', '.join([text_type(v) for v in v if v])
             children.append('%s=%s' % (k, v))
@@ -18,33 +73,72 @@ class Node(object):
 
     __repr__ = __str__
 
+    def __hash__(self):
+        return self._hash
+
     def __eq__(self, other):
-        if not isinstance(other, self.__class__):
-            return False
-        for k, v in self.__dict__.items():
-            if getattr(other, k) != v:
+        # Compare trees with an explicit stack, so that long chains of
+        # logical expressions don't hit the recursion limit
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a is b:
+                continue
+            if type(a) is not type(b) or a._hash != b._hash:
                 return False
+            for x, y in zip(a._compare_key(), b._compare_key()):
+                if isinstance(x, Node):
+                    stack.append((x, y))
+                elif x != y:
+                    return False
         return True
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
 
+def _restore(cls, values):
+    # Go through the constructor, so that interned nodes stay interned
+    return cls(*values)
+
+
 class Expression(Node):
-    def __init__(self, left, operator, right):
-        self.left = left
-        self.operator = operator
-        self.right = right
+    __slots__ = ('left', 'operator', 'right')
+    _fields = __slots__
+
+    def __new__(cls, left, operator, right):
+        # Expressions are the most numerous nodes, so avoid the generic
+        # _create() here
+        node = object.__new__(cls)
+        _setattr(node, 'left', left)
+        _setattr(node, 'operator', operator)
+        _setattr(node, 'right', right)
+        _setattr(node, '_hash', hash((cls.__name__, left, operator, right)))
+        return node
+
+    def _compare_key(self):
+        return self.left, self.operator, self.right
 
 
 class Name(Node):
-    def __init__(self, parts):
+    """
+    Names are interned: creating a name with the same parts as an existing
+    one returns the existing instance
+    """
+    __slots__ = ('parts', '__weakref__')
+    _fields = ('parts',)
+    _interned = weakref.WeakValueDictionary()
+
+    def __new__(cls, parts):
         if isinstance(parts, list):
-            self.parts = parts
-        elif isinstance(parts, tuple):
-            self.parts = list(parts)
-        else:
-            self.parts = [parts]
+            parts = tuple(parts)
+        elif not isinstance(parts, tuple):
+            parts = (parts,)
+        key = (cls, parts)
+        node = cls._interned.get(key)
+        if node is None:
+            node = cls._interned[key] = cls._create(parts)
+        return node
 
     @property
     def value(self):
@@ -52,27 +146,144 @@ class Name(Node):
 
 
 class Const(Node):
-    def __init__(self, value):
-        self.value = value
+    __slots__ = ('value',)
+    _fields = __slots__
+
+    def __new__(cls, value):
+        node = object.__new__(cls)
+        _setattr(node, 'value', value)
+        _setattr(node, '_hash', hash((cls.__name__, _value_type(value), value)))
+        return node
+
+    def _compare_key(self):
+        return _value_type(self.value), self.value
 
 
 class List(Node):
-    def __init__(self, items):
-        self.items = items
+    __slots__ = ('values',)
+    _fields = __slots__
+
+    def __new__(cls, items):
+        return cls.from_values([i.value for i in items])
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Create a list node from plain values without wrapping each of them
+        into a Const node
+        """
+        return cls._create(cls.compact(values))
+
+    @classmethod
+    def compact(cls, values):
+        """
+        Homogeneous lists of integers are stored as arrays of 64-bit
+        integers, which take 8 bytes per item, other lists as tuples
+        """
+        if values and all(type(v) is int for v in values):
+            try:
+                return array('q', values)
+            except (OverflowError, ValueError):
+                # Too large numbers, or no 'q' typecode in Python 2
+                pass
+        return tuple(values)
+
+    def _compare_key(self):
+        return (tuple((_value_type(v), v) for v in self.values),)
+
+    def __reduce__(self):
+        return _restore_list, (self.__class__, tuple(self.values))
+
+    @property
+    def items(self):
+        return [Const(value=v) for v in self.values]
 
     @property
     def value(self):
-        return [i.value for i in self.items]
+        return list(self.values)
+
+    def __str__(self):
+        items = ', '.join(text_type(i) for i in self.items)
+        return '<List: items=[%s]>' % items
+
+    __repr__ = __str__
+
+
+def _restore_list(cls, values):
+    return cls.from_values(values)
 
 
 class Operator(Node):
-    def __init__(self, operator):
-        self.operator = operator
+    """
+    Operators are interned: there's only one instance of each operator
+    """
+    __slots__ = ('operator',)
+    _fields = __slots__
+    _interned = {}
+
+    def __new__(cls, operator):
+        key = (cls, operator)
+        node = cls._interned.get(key)
+        if node is None:
+            node = cls._interned.setdefault(key, cls._create(operator))
+        return node
 
 
 class Logical(Operator):
-    pass
+    __slots__ = ()
 
 
 class Comparison(Operator):
-    pass
+    __slots__ = ()
+
+
+def operands(expression):
+    """
+    Returns operands of a chain of the same logical operator, like a, b and c
+    for "a or b or c", regardless of how the chain is parenthesized
+    """
+    operator = expression.operator
+    result = []
+    stack = [expression]
+    while stack:
+        node = stack.pop()
+        if node.operator == operator:
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            result.append(node)
+    return result
+
+
+class NodeVisitor(object):
+    """
+    Walks expressions with an explicit stack instead of recursion, so long
+    machine-generated queries don't hit the recursion limit.
+
+    Subclasses implement visit_comparison(), which is called for each
+    comparison from left to right, and visit_logical(), which is called
+    once per chain of the same logical operator with results of visiting
+    all of its operands. visit() returns the result for the root node.
+    """
+    def visit(self, node):
+        stack = [(node, None)]
+        results = []
+        while stack:
+            node, chain = stack.pop()
+            if chain is not None:
+                values = results[-len(chain):]
+                del results[-len(chain):]
+                results.append(self.visit_logical(node, node.operator, values))
+            elif isinstance(node.operator, Logical):
+                chain = operands(node)
+                stack.append((node, chain))
+                stack.extend((n, None) for n in reversed(chain))
+            else:
+                results.append(self.visit_comparison(node))
+        return results[0]
+
+    def visit_comparison(self, node):
+        raise NotImplementedError
+
+    def visit_logical(self, node, operator, results):
+        return None
@@ -0,0 +1,186 @@
+"""
+Async versions of DjangoQL views for ASGI deployments. Requires Python 3 and
+Django 4.1+, which supports async handlers of class-based views.
+"""
+import asyncio
+from functools import update_wrapper
+
+import django
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.utils.cache import add_never_cache_headers
+
+from asgiref.sync import async_to_sync, sync_to_async
+
+from .admin import DjangoQLSearchMixin
+from .schema import DjangoQLField, _func
+from .views import SuggestionsAPIView
+
+
+if django.VERSION < (4, 1):
+    raise ImproperlyConfigured('djangoql.async_views requires Django 4.1+')
+
+
+def cancel_query(connection):
+    """
+    Interrupts the query that is running on given Django database connection.
+    Can be called from any thread. Returns False if the database doesn't
+    support that, only PostgreSQL and SQLite do.
+    """
+    raw = connection.connection
+    if raw is None:
+        return False
+    try:
+        if connection.vendor == 'postgresql':
+            # Both psycopg2 and psycopg 3 connections have cancel()
+            raw.cancel()
+        elif connection.vendor == 'sqlite':
+            raw.interrupt()
+        else:
+            return False
+    except Exception:
+        # The connection may be closed by now
+        return False
+    return True
+
+
+async def run_cancellable(func, *args, **kwargs):
+    """
+    Calls func in a thread, like sync_to_async() does. If the calling task
+    is cancelled, e.g. because the client has disconnected, the query that
+    func runs on the database with given alias is cancelled too, instead of
+    keeping the database busy until it's complete.
+    """
+    using = kwargs.pop('using', None) or DEFAULT_DB_ALIAS
+    state = {'cancelled': False, 'connection': None}
+
+    def run():
+        if state['cancelled']:
+            return None
+        state['connection'] = connections[using]
+        try:
+            return func(*args, **kwargs)
+        finally:
+            state['connection'] = None
+
+    task = asyncio.ensure_future(sync_to_async(run)())
+    try:
+        # sync_to_async() waits for the thread when it's cancelled, so it's
+        # shielded to cancel the query first
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        state['cancelled'] = True
+        connection = state['connection']
+        if connection is not None:
+            cancel_query(connection)
+        try:
+            await task
+        except Exception:
+            # The interrupted query has failed, it doesn't matter anymore
+            pass
+        raise
+
+
+def get_options_async(field, search, limit=None):
+    """
+    Default implementation of DjangoQLField.aget_options()
+    """
+    def get_options():
+        options = field.get_options(search)
+        if limit is not None:
+            options = options[:limit]
+        # Querysets are lazy, they're evaluated here, while their query can
+        # be cancelled
+        return list(options)
+
+    return run_cancellable(
+        get_options,
+        using=router.db_for_read(field.model) if field.model else None,
+    )
+
+
+async def _await(func, *args):
+    # aget_options() may be a plain function that returns an awaitable
+    return await func(*args)
+
+
+class AsyncSuggestionsAPIView(SuggestionsAPIView):
+    """
+    SuggestionsAPIView for ASGI deployments.
+
+    Suggestions are queried in a thread, and the query is cancelled if the
+    view is, which Django 5.0+ does when the client disconnects, e.g. when
+    a request for a previous keystroke is abandoned. Fields that override
+    aget_options() get their suggestions with it.
+    """
+    async def get(self, request, *args, **kwargs):
+        def get_page():
+            # Resolving the field may introspect the schema, so it's done in
+            # the thread too
+            params = self.get_params(request)
+            items, next_cursor = self.get_items(**params)
+            return params['page_number'], items, next_cursor
+
+        model = self.schema.current_model if self.schema else None
+        try:
+            page_number, items, next_cursor = await run_cancellable(
+                get_page,
+                using=router.db_for_read(model) if model else None,
+            )
+        except ValueError as e:
+            return self.error_response(e)
+        return self.page_response(page_number, items, next_cursor)
+
+    def get_suggestions(self, field, search):
+        if not field.suggest_options or _func(type(field).aget_options) is \
+                _func(DjangoQLField.aget_options):
+            return super(AsyncSuggestionsAPIView, self).get_suggestions(
+                field,
+                search,
+            )
+        # get_items() runs in a thread, and the coroutine runs in the event
+        # loop of the view
+        return async_to_sync(_await)(field.aget_options, search)
+
+
+class AsyncDjangoQLSearchMixin(DjangoQLSearchMixin):
+    """
+    DjangoQLSearchMixin with async introspect and suggestions views, for
+    admin sites served with ASGI
+    """
+    def djangoql_admin_view(self, view):
+        admin_view = self.admin_site.admin_view(view)
+
+        async def inner(request, *args, **kwargs):
+            has_permission = await sync_to_async(
+                self.admin_site.has_permission,
+            )(request)
+            if not has_permission:
+                # The admin view redirects to the login page
+                return await sync_to_async(admin_view)(
+                    request,
+                    *args,
+                    **kwargs
+                )
+            # Both views accept only GET requests, which aren't protected
+            # from CSRF, so only never_cache() of the admin view is applied
+            response = await view(request, *args, **kwargs)
+            add_never_cache_headers(response)
+            return response
+
+        return update_wrapper(inner, view)
+
+    async def introspect(self, request):
+        # Serialization of the schema may query options of fields, and
+        # introspection of big schemas would block the event loop
+        return await run_cancellable(
+            super(AsyncDjangoQLSearchMixin, self).introspect,
+            request,
+        )
+
+    async def suggestions(self, request):
+        view = AsyncSuggestionsAPIView.as_view(
+            schema=self.djangoql_schema(self.model),
+            cache=self.djangoql_suggestions_cache,
+        )
+        return await view(request)
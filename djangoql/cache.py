@@ -0,0 +1,68 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    Thread-safe mapping with a size bound and least-recently-used eviction.
+
+    Keeps hit/miss counters, so cache efficiency can be monitored.
+    """
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError('maxsize must be a positive integer')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_many(self, predicate):
+        """
+        Delete all entries with keys matching given predicate
+        """
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
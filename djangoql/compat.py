@@ -4,8 +4,10 @@ import sys
 PY2 = sys.version_info.major == 2
 
 if PY2:
+    from collections import Mapping  # noqa: F401
     binary_type = str
     text_type = unicode  # noqa: F821
 else:
+    from collections.abc import Mapping  # noqa: F401
     binary_type = bytes
     text_type = str
@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+def get_setting(name, default=None):
+    """
+    Returns DjangoQL setting from Django settings, or default if it's not
+    specified or Django settings are not configured
+    """
+    try:
+        return getattr(settings, name, default)
+    except ImproperlyConfigured:
+        return default
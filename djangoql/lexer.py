@@ -1,5 +1,8 @@
 from __future__ import unicode_literals
 
+import re
+import threading
+
 import ply.lex as lex
 from ply.lex import TOKEN
 
@@ -7,10 +10,30 @@ from .exceptions import DjangoQLLexerError
 
 
 class DjangoQLLexer(object):
+    # Compiled PLY lexers, one per lexer class. Building a lexer compiles the
+    # master regex of all token rules, so it's done once per process, and
+    # every instance gets its own lightweight clone with independent state.
+    _prototypes = {}
+    _prototypes_lock = threading.Lock()
+
     def __init__(self, **kwargs):
-        self._lexer = lex.lex(module=self, **kwargs)
+        if kwargs:
+            self._lexer = lex.lex(module=self, **kwargs)
+        else:
+            self._lexer = self._get_prototype().clone()
         self.reset()
 
+    @classmethod
+    def _get_prototype(cls):
+        prototype = cls._prototypes.get(cls)
+        if prototype is None:
+            with cls._prototypes_lock:
+                prototype = cls._prototypes.get(cls)
+                if prototype is None:
+                    prototype = lex.lex(module=cls.__new__(cls))
+                    cls._prototypes[cls] = prototype
+        return prototype
+
     def reset(self):
         self.text = ''
         self._lexer.lineno = 1
@@ -41,12 +64,14 @@ class DjangoQLLexer(object):
         """
         Returns token position in current text, starting from 1
         """
-        cr = max(
-            self.text.rfind(lt, 0, t.lexpos) for lt in self.line_terminators
-        )
+        return self.column(self.text, t.lexpos)
+
+    @classmethod
+    def column(cls, text, lexpos):
+        cr = max(text.rfind(lt, 0, lexpos) for lt in cls.line_terminators)
         if cr == -1:
-            return t.lexpos + 1
-        return t.lexpos - cr
+            return lexpos + 1
+        return lexpos - cr
 
     whitespace = ' \t\v\f\u00A0'
     line_terminators = '\n\r\u2028\u2029'
@@ -160,14 +185,183 @@ class DjangoQLLexer(object):
         return t
 
     def t_error(self, t):
+        # Rule functions are shared by all clones of the prototype lexer, so
+        # they must not rely on instance state and use t.lexer instead
         raise DjangoQLLexerError(
             message='Illegal character %s' % repr(t.value[0]),
             value=t.value,
             line=t.lineno,
-            column=self.find_column(t),
+            column=self.column(t.lexer.lexdata, t.lexpos),
         )
 
     @TOKEN('[' + re_line_terminators + ']+')
     def t_newline(self, t):
         t.lexer.lineno += len(t.value)
         return
+
+
+class DjangoQLToken(object):
+    """
+    Lightweight replacement for PLY LexToken used by DjangoQLFastLexer
+    """
+    __slots__ = ('type', 'value', 'lineno', 'lexpos', 'column', 'lexer')
+
+    def __init__(self, type, value, lineno, lexpos, column):  # noqa: A002
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.column = column
+
+    def __str__(self):
+        return 'LexToken(%s,%r,%d,%d)' % (
+            self.type,
+            self.value,
+            self.lineno,
+            self.lexpos,
+        )
+
+    __repr__ = __str__
+
+
+class DjangoQLFastLexer(DjangoQLLexer):
+    """
+    Drop-in replacement for DjangoQLLexer that doesn't use PLY.
+
+    All token rules are combined into a single regex with named groups, and
+    the whole text is scanned in one pass on the first request for a token.
+    Keywords are recognized with a dict lookup, and line and column numbers
+    are tracked as the text is scanned. Illegal characters are reported when
+    the token stream reaches them, exactly like DjangoQLLexer does.
+    """
+    keywords = {
+        'or': 'OR',
+        'and': 'AND',
+        'not': 'NOT',
+        'in': 'IN',
+        'startswith': 'STARTSWITH',
+        'endswith': 'ENDSWITH',
+        'True': 'TRUE',
+        'False': 'FALSE',
+        'None': 'NONE',
+    }
+    punctuators = {
+        ',': 'COMMA',
+        '(': 'PAREN_L',
+        ')': 'PAREN_R',
+        '=': 'EQUALS',
+        '!=': 'NOT_EQUALS',
+        '>': 'GREATER',
+        '>=': 'GREATER_EQUAL',
+        '<': 'LESS',
+        '<=': 'LESS_EQUAL',
+        '~': 'CONTAINS',
+        '!~': 'NOT_CONTAINS',
+    }
+    # Alternatives are listed in the same order as PLY tries them for
+    # DjangoQLLexer: function rules first, then string rules by length.
+    # Ignored characters are consumed in the same match as the next token.
+    master_re = re.compile(
+        '[' + DjangoQLLexer.whitespace + ']*(?:'
+        '(?P<newline>[' + DjangoQLLexer.re_line_terminators + ']+)|'
+        '(?P<STRING_VALUE>' + DjangoQLLexer.t_STRING_VALUE.regex + ')|'
+        '(?P<FLOAT_VALUE>' + DjangoQLLexer.t_FLOAT_VALUE.regex + ')|'
+        '(?P<INT_VALUE>' + DjangoQLLexer.re_int_value + ')|'
+        '(?P<NAME>' + DjangoQLLexer.t_NAME + ')|'
+        r'(?P<punctuator>!=|>=|<=|!~|[,()=><~])|'
+        '(?P<error>[^' + DjangoQLLexer.whitespace + '])'
+        ')',
+        re.UNICODE | re.DOTALL,
+    )
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.text = ''
+        self._stream = iter(())
+        self._error = None
+        return self
+
+    def input(self, s):
+        self.reset()
+        self.text = s
+        self._stream = iter(self.scan())
+        return self
+
+    def token(self):
+        t = next(self._stream, None)
+        if t is None and self._error is not None:
+            value, line, column = self._error
+            raise DjangoQLLexerError(
+                message='Illegal character %s' % repr(value[0]),
+                value=value,
+                line=line,
+                column=column,
+            )
+        return t
+
+    def scan(self):
+        """
+        Returns a list of tokens found in the text, up to the first illegal
+        character, if any
+        """
+        text = self.text
+        keywords = self.keywords
+        punctuators = self.punctuators
+        tokens = []
+        append = tokens.append
+        lineno = 1
+        last_line_terminator = -1
+        for m in self.master_re.finditer(text):
+            kind = m.lastgroup
+            start = m.start(kind)
+            value = m.group(kind)
+            if kind == 'newline':
+                lineno += len(value)
+                last_line_terminator = m.end() - 1
+                continue
+            if kind == 'NAME':
+                keyword = keywords.get(value)
+                if keyword is None and '.' in value:
+                    head = value.partition('.')[0]
+                    keyword = keywords.get(head)
+                    if keyword is not None:
+                        # A keyword can't be followed by a dot, so that's
+                        # where the illegal character is
+                        append(DjangoQLToken(
+                            keyword,
+                            head,
+                            lineno,
+                            start,
+                            start - last_line_terminator,
+                        ))
+                        start += len(head)
+                        kind = 'error'
+                if keyword is not None and kind != 'error':
+                    kind = keyword
+            elif kind == 'punctuator':
+                kind = punctuators[value]
+            elif kind == 'STRING_VALUE':
+                value = value[1:-1]  # cut leading and trailing quotes ""
+            if kind == 'error':
+                self._error = (
+                    text[start:],
+                    lineno,
+                    start - last_line_terminator,
+                )
+                break
+            append(DjangoQLToken(
+                kind,
+                value,
+                lineno,
+                start,
+                start - last_line_terminator,
+            ))
+        return tokens
+
+    def find_column(self, t):
+        column = getattr(t, 'column', None)
+        if column is not None:
+            return column
+        return super(DjangoQLFastLexer, self).find_column(t)
@@ -0,0 +1,80 @@
+import json
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from ...exceptions import DjangoQLSchemaError
+from ...schema import DjangoQLSchema, RelationField
+from ...serializers import DjangoQLSchemaSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows models and fields that are searchable with a DjangoQL schema, '
+        'and the size of the schema sent to the completion widget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'model',
+            help='Model to search, like auth.User',
+        )
+        parser.add_argument(
+            '--schema',
+            help='Dotted path to the schema class, DjangoQLSchema by default',
+        )
+        parser.add_argument(
+            '--snapshot',
+            help='File to write the snapshot of the schema to, which can be '
+                 'loaded with DjangoQLSchema.load_snapshot()',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            model = apps.get_model(options['model'])
+        except (LookupError, ValueError) as e:
+            raise CommandError(e)
+        schema_cls = DjangoQLSchema
+        if options['schema']:
+            try:
+                schema_cls = import_string(options['schema'])
+            except ImportError as e:
+                raise CommandError(e)
+        try:
+            schema = schema_cls(model)
+        except DjangoQLSchemaError as e:
+            raise CommandError(e)
+
+        total_fields = 0
+        total_relations = 0
+        for model_label, fields in schema.models.items():
+            relations = len([
+                f for f in fields.values() if isinstance(f, RelationField)
+            ])
+            self.stdout.write('%-40s %5s fields, %5s relations' % (
+                model_label,
+                len(fields),
+                relations,
+            ))
+            total_fields += len(fields)
+            total_relations += relations
+
+        size = len(json.dumps(
+            DjangoQLSchemaSerializer().serialize(schema),
+            indent=2,
+        ))
+        self.stdout.write('')
+        self.stdout.write('Models: %s' % len(schema.models))
+        self.stdout.write('Fields: %s' % total_fields)
+        self.stdout.write('Relations: %s' % total_relations)
+        self.stdout.write('Serialized size: %.1f KB' % (size / 1024.0))
+        self.stdout.write('Fingerprint: %s' % schema.fingerprint())
+
+        if options['snapshot']:
+            try:
+                with open(options['snapshot'], 'w') as f:
+                    schema.dump_snapshot(f)
+            except (DjangoQLSchemaError, IOError) as e:
+                raise CommandError(e)
+            self.stdout.write('Snapshot written to %s' % options['snapshot'])
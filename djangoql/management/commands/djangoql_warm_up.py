@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from ...exceptions import DjangoQLError
+from ...warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Prepares the DjangoQL parser, and schemas of all model admins that '
+        'use DjangoQLSearchMixin and models with DjangoQLQuerySet managers, '
+        'and shows how long it takes for each of them'
+    )
+
+    def handle(self, *args, **options):
+        self.total = 0
+
+        def report(name, seconds):
+            self.total += seconds
+            self.stdout.write('%-50s %8.1f ms' % (name, seconds * 1000))
+
+        try:
+            warm_up(callback=report)
+        except DjangoQLError as e:
+            raise CommandError(e)
+        self.stdout.write('')
+        self.stdout.write('%-50s %8.1f ms' % ('Total', self.total * 1000))
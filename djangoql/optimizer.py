@@ -0,0 +1,172 @@
+from __future__ import unicode_literals
+
+from collections import OrderedDict
+
+from .ast import Comparison, Expression, List, Logical, NodeVisitor
+from .schema import DjangoQLField, _func
+
+
+class DjangoQLOptimizer(NodeVisitor):
+    """
+    Rewrites validated expressions into equivalent ones that are cheaper for
+    the database. Each rewrite can be turned off with a class attribute or
+    a constructor argument.
+
+    optimize() returns the rewritten expression, or None if the expression
+    can't match anything.
+
+    Rewrites are applied only to fields that use the default lookups of
+    DjangoQLField, without choices. Comparisons with None are never
+    rewritten.
+    """
+    # a = 1 or a = 2 or a in (3, 4)  ->  a in (1, 2, 3, 4)
+    collapse_equality = True
+    # a = 1 and b = 2 and a = 1  ->  a = 1 and b = 2
+    merge_duplicates = True
+    # a != 1 and a not in (2, 3)  ->  a not in (1, 2, 3)
+    fold_not_in = True
+    # a = 1 and a = 2  ->  nothing matches
+    drop_contradictions = True
+    # Types of fields that are compared exactly by all databases. String
+    # comparisons may be case-insensitive, depending on collation, so "a" and
+    # "A" aren't necessarily a contradiction.
+    contradiction_types = ('int', 'bool')
+
+    def __init__(self, schema, collapse_equality=None, merge_duplicates=None,
+                 fold_not_in=None, drop_contradictions=None):
+        self.schema = schema
+        if collapse_equality is not None:
+            self.collapse_equality = collapse_equality
+        if merge_duplicates is not None:
+            self.merge_duplicates = merge_duplicates
+        if fold_not_in is not None:
+            self.fold_not_in = fold_not_in
+        if drop_contradictions is not None:
+            self.drop_contradictions = drop_contradictions
+        self._fields = {}
+
+    def optimize(self, node):
+        return self.visit(node)
+
+    def field(self, name):
+        """
+        Returns the field for given name if it's safe to rewrite comparisons
+        with it, otherwise None
+        """
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+        field = self.schema.resolve_name(name)
+        if field is not None:
+            cls = type(field)
+            for method in ('get_lookup', 'get_lookup_value', 'get_operator'):
+                if _func(getattr(cls, method)) is not _func(
+                    getattr(DjangoQLField, method),
+                ):
+                    field = None
+                    break
+            if field is not None and field._field_choices():
+                field = None
+        self._fields[name] = field
+        return field
+
+    def values(self, node, operators):
+        """
+        Returns a list of values that given comparison compares its field
+        to, if it can be rewritten and uses one of given operators
+        """
+        if node.operator.operator not in operators:
+            return None
+        if isinstance(node.right, List):
+            values = node.right.value
+        else:
+            values = [node.right.value]
+        if None in values or self.field(node.left) is None:
+            return None
+        return values
+
+    def visit_comparison(self, node):
+        return node
+
+    def visit_logical(self, node, operator, results):
+        if operator.operator == 'or':
+            # Drop operands that can't match anything
+            results = [r for r in results if r is not None]
+            if not results:
+                return None
+        elif None in results:
+            return None
+
+        if self.merge_duplicates:
+            results = list(OrderedDict.fromkeys(results))
+        if operator.operator == 'or':
+            if self.collapse_equality:
+                results = self.merge(results, ('=', 'in'), 'in')
+        else:
+            if self.fold_not_in:
+                results = self.merge(results, ('!=', 'not in'), 'not in')
+            if self.drop_contradictions and self.contradiction(results):
+                return None
+
+        result = results[-1]
+        for i in range(len(results) - 2, -1, -1):
+            result = Expression(results[i], operator, result)
+        return result
+
+    def merge(self, operands, operators, operator):
+        """
+        Replaces comparisons of the same field using given operators with
+        a single comparison using given list operator. It's placed where the
+        first of them was.
+        """
+        groups = OrderedDict()
+        for i, node in enumerate(operands):
+            if isinstance(node.operator, Comparison):
+                values = self.values(node, operators)
+                if values is not None:
+                    groups.setdefault(node.left, []).append((i, values))
+        replaced = {}
+        for name, group in groups.items():
+            if len(group) < 2:
+                continue
+            values = OrderedDict()
+            for _, v in group:
+                values.update(OrderedDict.fromkeys(v))
+            replaced[group[0][0]] = Expression(
+                name,
+                Comparison(operator),
+                List.from_values(list(values)),
+            )
+            for i, _ in group[1:]:
+                replaced[i] = None
+        if not replaced:
+            return operands
+        result = []
+        for i, node in enumerate(operands):
+            node = replaced.get(i, node)
+            if node is not None:
+                result.append(node)
+        return result
+
+    def contradiction(self, operands):
+        """
+        Checks if operands of "and" require the same field to be equal to
+        different values
+        """
+        allowed = {}
+        for node in operands:
+            if isinstance(node.operator, Logical):
+                continue
+            values = self.values(node, ('=', 'in'))
+            if values is None:
+                continue
+            if self.field(node.left).type not in self.contradiction_types:
+                continue
+            values = set(values)
+            if node.left in allowed:
+                values &= allowed[node.left]
+            if not values:
+                return True
+            allowed[node.left] = values
+        return False
@@ -1,13 +1,21 @@
 from __future__ import unicode_literals
 
+import copy
+import importlib
+import inspect
+import os
 import re
+import sys
+import threading
+import warnings
 from decimal import Decimal
 
 import ply.yacc as yacc
 
 from .ast import Comparison, Const, Expression, List, Logical, Name
 from .compat import binary_type, text_type
-from .exceptions import DjangoQLParserError
+from .conf import get_setting
+from .exceptions import DjangoQLError, DjangoQLParserError
 from .lexer import DjangoQLLexer
 
 
@@ -28,17 +36,210 @@ def unescape_repl(m):
 def unescape(value):
     if isinstance(value, binary_type):
         value = value.decode('utf8')
-    return re.sub(unescape_pattern, unescape_repl, value)
+    if '\\' not in value:
+        return value
+    return unescape_pattern.sub(unescape_repl, value)
 
 
-class DjangoQLParser(object):
+class SyntaxErrorMixin(object):
+    """
+    Syntax error reporting shared by all parser implementations
+    """
+    def p_error(self, token):
+        if token is None:
+            self.raise_syntax_error('Unexpected end of input')
+        else:
+            fragment = text_type(token.value)
+            if len(fragment) > 20:
+                fragment = fragment[:17] + '...'
+            self.raise_syntax_error(
+                'Syntax error at %s' % repr(fragment),
+                token=token,
+            )
+
+    def raise_syntax_error(self, message, token=None):
+        if token is None:
+            raise DjangoQLParserError(message)
+        lexer = token.lexer
+        if callable(getattr(lexer, 'find_column', None)):
+            column = lexer.find_column(token)
+        elif getattr(lexer, 'lexdata', None) is not None:
+            # Tokens produced by rule functions refer to the PLY lexer
+            column = DjangoQLLexer.column(lexer.lexdata, token.lexpos)
+        else:
+            column = None
+        raise DjangoQLParserError(
+            message=message,
+            value=token.value,
+            line=token.lineno,
+            column=column,
+        )
+
+
+# Tables of the package, and a module name that can't be imported, for
+# parsers that don't have tables. PLY would import a top-level "parsetab"
+# module, which may belong to another project, if it was given None.
+_tabmodule = 'djangoql.parsetab'
+_no_tabmodule = 'djangoql._no_parsetab'
+
+
+def _rule(name):
+    def rule(p):
+        return getattr(p.parser.djangoql_parser, name)(p)
+    return rule
+
+
+class DjangoQLParser(SyntaxErrorMixin):
+    # Module with precomputed parsing tables. Subclasses that modify the
+    # grammar either get tables built from scratch, or can provide their own
+    # tables here.
+    tabmodule = _tabmodule
+    lexer_class = DjangoQLLexer
+
+    # LR parsers built by PLY, one per parser class. Building a parser
+    # introspects grammar docstrings and computes LALR tables, so it's done
+    # once per process, and every instance gets a shallow copy of it. Rules
+    # of the copies are called on the instance that is parsing.
+    _prototypes = {}
+    _prototypes_lock = threading.Lock()
+
     def __init__(self, debug=False, **kwargs):
-        self.default_lexer = DjangoQLLexer()
+        self.default_lexer = self.lexer_class()
         self.tokens = self.default_lexer.tokens
-        kwargs['debug'] = debug
-        if 'write_tables' not in kwargs:
-            kwargs['write_tables'] = False
-        self.yacc = yacc.yacc(module=self, **kwargs)
+        if debug or kwargs:
+            kwargs['debug'] = debug
+            if 'write_tables' not in kwargs:
+                kwargs['write_tables'] = False
+            self.yacc = yacc.yacc(module=self, **kwargs)
+        else:
+            self.yacc = copy.copy(self._get_prototype())
+            self.yacc.djangoql_parser = self
+            self.yacc.errorfunc = self.p_error
+
+    @classmethod
+    def _get_prototype(cls):
+        prototype = cls._prototypes.get(cls)
+        if prototype is None:
+            with cls._prototypes_lock:
+                prototype = cls._prototypes.get(cls)
+                if prototype is None:
+                    tabmodule = cls.tabmodule
+                    if tabmodule == _tabmodule and \
+                            not cls.tables_up_to_date():
+                        if cls.grammar_signature() == \
+                                DjangoQLParser.grammar_signature():
+                            cls.check_tables()
+                        # Either tables of the package are stale, or the
+                        # grammar is modified
+                        tabmodule = None
+                    prototype = yacc.yacc(
+                        module=cls._grammar_module(),
+                        tabmodule=tabmodule or _no_tabmodule,
+                        debug=False,
+                        write_tables=False,
+                    )
+                    # PLY binds rules to the object it has introspected,
+                    # which never ran __init__() and would be shared by all
+                    # instances
+                    for production in prototype.productions:
+                        if production.func:
+                            production.callable = _rule(production.func)
+                    cls._prototypes[cls] = prototype
+        return prototype
+
+    @classmethod
+    def _grammar_module(cls):
+        # PLY signs the grammar with docstrings of rules, and Python 3.13+
+        # strips their indentation at compile time. Strip it everywhere, so
+        # that tables match the grammar on all versions.
+        for name in dir(cls):
+            if name.startswith('p_'):
+                func = getattr(cls, name)
+                # Unbound methods in Python 2
+                func = getattr(func, '__func__', func)
+                if inspect.isfunction(func) and func.__doc__:
+                    func.__doc__ = '\n'.join(
+                        line.strip() for line in func.__doc__.splitlines()
+                    ).strip()
+        module = cls.__new__(cls)
+        module.tokens = cls.lexer_class.tokens
+        return module
+
+    @classmethod
+    def grammar_signature(cls):
+        """
+        Returns grammar signature, as it's computed by PLY
+        """
+        module = cls._grammar_module()
+        pdict = dict((k, getattr(module, k)) for k in dir(module))
+        pdict['__file__'] = __file__
+        reflect = yacc.ParserReflect(pdict, log=yacc.NullLogger())
+        reflect.get_all()
+        return reflect.signature()
+
+    @classmethod
+    def tables_up_to_date(cls):
+        if not cls.tabmodule:
+            return False
+        try:
+            tables = importlib.import_module(cls.tabmodule)
+        except ImportError:
+            return False
+        return (
+            getattr(tables, '_tabversion', None) == yacc.__tabversion__ and
+            getattr(tables, '_lr_signature', None) == cls.grammar_signature()
+        )
+
+    @classmethod
+    def check_tables(cls):
+        """
+        Check that precomputed parsing tables match the grammar. It's done
+        automatically only for tables of the package, when they're used with
+        the grammar of DjangoQLParser.
+
+        If they don't, PLY falls back to building the tables from scratch on
+        every process start. What happens in this case is controlled by the
+        DJANGOQL_STALE_TABLES setting: 'warn' (default) issues a warning,
+        'error' raises DjangoQLError, and 'ignore' does nothing.
+        """
+        action = get_setting('DJANGOQL_STALE_TABLES', 'warn')
+        if action == 'ignore' or cls.tables_up_to_date():
+            return
+        message = (
+            'Parsing tables in %s do not match the grammar of %s.%s, they '
+            'will be rebuilt on every process start. Run '
+            '"python -m djangoql.parser" to regenerate them' % (
+                cls.tabmodule,
+                cls.__module__,
+                cls.__name__,
+            )
+        )
+        if action == 'error':
+            raise DjangoQLError(message)
+        warnings.warn(message, RuntimeWarning)
+
+    @classmethod
+    def write_tables(cls):
+        """
+        Regenerate precomputed parsing tables, if they're out of date. They
+        are written to the package of tabmodule, or next to the module of the
+        parser class if tabmodule isn't in a package.
+        """
+        if not cls.tabmodule or cls.tables_up_to_date():
+            return False
+        package = cls.tabmodule.rpartition('.')[0]
+        if package:
+            path = importlib.import_module(package).__file__
+        else:
+            path = sys.modules[cls.__module__].__file__
+        yacc.yacc(
+            module=cls._grammar_module(),
+            tabmodule=cls.tabmodule,
+            outputdir=os.path.dirname(os.path.abspath(path)),
+            debug=False,
+            write_tables=True,
+        )
+        return True
 
     def parse(self, input=None, lexer=None, **kwargs):  # noqa: A002
         lexer = lexer or self.default_lexer
@@ -192,43 +393,59 @@ class DjangoQLParser(object):
         """
         const_list_value : PAREN_L const_value_list PAREN_R
         """
-        p[0] = List(items=p[2])
+        p[0] = List.from_values(p[2])
 
     def p_const_value_list(self, p):
         """
         const_value_list : const_value_list COMMA const_value
         """
-        p[0] = p[1] + [p[3]]
+        # Extend the list in place, building a new one on every step would
+        # make parsing of long lists quadratic
+        p[1].append(p[3].value)
+        p[0] = p[1]
 
     def p_const_value_list_single(self, p):
         """
         const_value_list : const_value
         """
-        p[0] = [p[1]]
+        p[0] = [p[1].value]
 
-    def p_error(self, token):
-        if token is None:
-            self.raise_syntax_error('Unexpected end of input')
-        else:
-            fragment = text_type(token.value)
-            if len(fragment) > 20:
-                fragment = fragment[:17] + '...'
-            self.raise_syntax_error(
-                'Syntax error at %s' % repr(fragment),
-                token=token,
-            )
 
-    def raise_syntax_error(self, message, token=None):
-        if token is None:
-            raise DjangoQLParserError(message)
-        lexer = token.lexer
-        if callable(getattr(lexer, 'find_column', None)):
-            column = lexer.find_column(token)
-        else:
-            column = None
-        raise DjangoQLParserError(
-            message=message,
-            value=token.value,
-            line=token.lineno,
-            column=column,
-        )
+PARSERS = {
+    'ply': 'djangoql.parser.DjangoQLParser',
+    'recursive_descent': 'djangoql.rdparser.DjangoQLRecursiveDescentParser',
+}
+
+_local = threading.local()
+
+
+def get_parser(backend=None):
+    """
+    Returns a parser instance for the current thread.
+
+    Parsing tables are shared by all threads, while each thread gets its own
+    parser and lexer state, so this is the cheapest way to obtain a parser
+    that is safe to use in a multi-threaded environment.
+
+    :param backend: parser implementation, either a key of PARSERS or
+        a dotted path to a parser class. Defaults to the DJANGOQL_PARSER
+        setting, or 'ply' if it's not specified.
+    """
+    backend = backend or get_setting('DJANGOQL_PARSER', 'ply')
+    parsers = _local.__dict__.setdefault('parsers', {})
+    parser = parsers.get(backend)
+    if parser is None:
+        path = PARSERS.get(backend, backend)
+        if '.' not in path:
+            raise DjangoQLError('Unknown DjangoQL parser: %s' % backend)
+        module_name, class_name = path.rsplit('.', 1)
+        parser_class = getattr(importlib.import_module(module_name), class_name)
+        parser = parsers[backend] = parser_class()
+    return parser
+
+
+if __name__ == '__main__':
+    if DjangoQLParser.write_tables():
+        print('Parsing tables updated')  # noqa: T001
+    else:
+        print('Parsing tables are up to date')  # noqa: T001
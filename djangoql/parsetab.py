@@ -6,9 +6,9 @@ _tabversion = '3.10'
 
 _lr_method = 'LALR'
 
-_lr_signature = 'expressionAND COMMA CONTAINS EQUALS FALSE FLOAT_VALUE GREATER GREATER_EQUAL IN INT_VALUE LESS LESS_EQUAL NAME NONE NOT NOT_CONTAINS NOT_EQUALS OR PAREN_L PAREN_R STRING_VALUE TRUE\n        expression : PAREN_L expression PAREN_R\n        \n        expression : expression logical expression\n        \n        expression : name comparison_number number\n                   | name comparison_string string\n                   | name comparison_equality boolean_value\n                   | name comparison_equality none\n                   | name comparison_in_list const_list_value\n        \n        name : NAME\n        \n        logical : AND\n                | OR\n        \n        comparison_number : comparison_equality\n                          | comparison_greater_less\n        \n        comparison_string : comparison_equality\n                          | comparison_greater_less\n                          | comparison_contains\n        \n        comparison_equality : EQUALS\n                            | NOT_EQUALS\n        \n        comparison_greater_less : GREATER\n                                | GREATER_EQUAL\n                                | LESS\n                                | LESS_EQUAL\n        \n        comparison_contains : CONTAINS\n                            | NOT_CONTAINS\n        \n        comparison_in_list : IN\n                           | NOT IN\n        \n        const_value : number\n                    | string\n                    | none\n                    | boolean_value\n        \n        number : INT_VALUE\n        \n        number : FLOAT_VALUE\n        \n        string : STRING_VALUE\n        \n        none : NONE\n        \n        boolean_value : true\n                      | false\n        \n        true : TRUE\n        \n        false : FALSE\n        \n        const_list_value : PAREN_L const_value_list PAREN_R\n        \n        const_value_list : const_value_list COMMA const_value\n        \n        const_value_list : const_value\n        '
+_lr_signature = 'expressionAND COMMA CONTAINS ENDSWITH EQUALS FALSE FLOAT_VALUE GREATER GREATER_EQUAL IN INT_VALUE LESS LESS_EQUAL NAME NONE NOT NOT_CONTAINS NOT_EQUALS OR PAREN_L PAREN_R STARTSWITH STRING_VALUE TRUEexpression : PAREN_L expression PAREN_Rexpression : expression logical expressionexpression : name comparison_number number\n| name comparison_string string\n| name comparison_equality boolean_value\n| name comparison_equality none\n| name comparison_in_list const_list_valuename : NAMElogical : AND\n| ORcomparison_number : comparison_equality\n| comparison_greater_lesscomparison_string : comparison_equality\n| comparison_greater_less\n| comparison_string_specificcomparison_equality : EQUALS\n| NOT_EQUALScomparison_greater_less : GREATER\n| GREATER_EQUAL\n| LESS\n| LESS_EQUALcomparison_string_specific : CONTAINS\n| NOT_CONTAINS\n| STARTSWITH\n| NOT STARTSWITH\n| ENDSWITH\n| NOT ENDSWITHcomparison_in_list : IN\n| NOT INconst_value : number\n| string\n| none\n| boolean_valuenumber : INT_VALUEnumber : FLOAT_VALUEstring : STRING_VALUEnone : NONEboolean_value : true\n| falsetrue : TRUEfalse : FALSEconst_list_value : PAREN_L const_value_list PAREN_Rconst_value_list : const_value_list COMMA const_valueconst_value_list : const_value'
     
-_lr_action_items = {'PAREN_L':([0,2,5,6,7,12,17,41,],[2,2,2,-9,-10,40,-24,-25,]),'NAME':([0,2,5,6,7,],[4,4,4,-9,-10,]),'$end':([1,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,48,],[0,-2,-1,-3,-30,-31,-4,-32,-5,-6,-34,-35,-33,-36,-37,-7,-38,]),'AND':([1,8,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,48,],[6,6,6,-1,-3,-30,-31,-4,-32,-5,-6,-34,-35,-33,-36,-37,-7,-38,]),'OR':([1,8,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,48,],[7,7,7,-1,-3,-30,-31,-4,-32,-5,-6,-34,-35,-33,-36,-37,-7,-38,]),'EQUALS':([3,4,],[15,-8,]),'NOT_EQUALS':([3,4,],[16,-8,]),'IN':([3,4,18,],[17,-8,41,]),'NOT':([3,4,],[18,-8,]),'GREATER':([3,4,],[19,-8,]),'GREATER_EQUAL':([3,4,],[20,-8,]),'LESS':([3,4,],[21,-8,]),'LESS_EQUAL':([3,4,],[22,-8,]),'CONTAINS':([3,4,],[23,-8,]),'NOT_CONTAINS':([3,4,],[24,-8,]),'PAREN_R':([8,25,26,27,28,29,30,31,32,33,34,35,36,37,38,39,42,43,44,45,46,47,48,50,],[26,-2,-1,-3,-30,-31,-4,-32,-5,-6,-34,-35,-33,-36,-37,-7,48,-40,-26,-27,-28,-29,-38,-39,]),'INT_VALUE':([9,11,13,15,16,19,20,21,22,40,49,],[28,-11,-12,-16,-17,-18,-19,-20,-21,28,28,]),'FLOAT_VALUE':([9,11,13,15,16,19,20,21,22,40,49,],[29,-11,-12,-16,-17,-18,-19,-20,-21,29,29,]),'STRING_VALUE':([10,11,13,14,15,16,19,20,21,22,23,24,40,49,],[31,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,31,31,]),'NONE':([11,15,16,40,49,],[36,-16,-17,36,36,]),'TRUE':([11,15,16,40,49,],[37,-16,-17,37,37,]),'FALSE':([11,15,16,40,49,],[38,-16,-17,38,38,]),'COMMA':([28,29,31,34,35,36,37,38,42,43,44,45,46,47,50,],[-30,-31,-32,-34,-35,-33,-36,-37,49,-40,-26,-27,-28,-29,-39,]),}
+_lr_action_items = {'PAREN_L':([0,2,5,6,7,12,17,43,],[2,2,2,-9,-10,42,-28,-29,]),'NAME':([0,2,5,6,7,],[4,4,4,-9,-10,]),'$end':([1,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,52,],[0,-2,-1,-3,-34,-35,-4,-36,-5,-6,-38,-39,-37,-40,-41,-7,-42,]),'AND':([1,8,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,52,],[6,6,6,-1,-3,-34,-35,-4,-36,-5,-6,-38,-39,-37,-40,-41,-7,-42,]),'OR':([1,8,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,52,],[7,7,7,-1,-3,-34,-35,-4,-36,-5,-6,-38,-39,-37,-40,-41,-7,-42,]),'EQUALS':([3,4,],[15,-8,]),'NOT_EQUALS':([3,4,],[16,-8,]),'IN':([3,4,18,],[17,-8,43,]),'NOT':([3,4,],[18,-8,]),'GREATER':([3,4,],[19,-8,]),'GREATER_EQUAL':([3,4,],[20,-8,]),'LESS':([3,4,],[21,-8,]),'LESS_EQUAL':([3,4,],[22,-8,]),'CONTAINS':([3,4,],[23,-8,]),'NOT_CONTAINS':([3,4,],[24,-8,]),'STARTSWITH':([3,4,18,],[25,-8,44,]),'ENDSWITH':([3,4,18,],[26,-8,45,]),'PAREN_R':([8,27,28,29,30,31,32,33,34,35,36,37,38,39,40,41,46,47,48,49,50,51,52,54,],[28,-2,-1,-3,-34,-35,-4,-36,-5,-6,-38,-39,-37,-40,-41,-7,52,-44,-30,-31,-32,-33,-42,-43,]),'INT_VALUE':([9,11,13,15,16,19,20,21,22,42,53,],[30,-11,-12,-16,-17,-18,-19,-20,-21,30,30,]),'FLOAT_VALUE':([9,11,13,15,16,19,20,21,22,42,53,],[31,-11,-12,-16,-17,-18,-19,-20,-21,31,31,]),'STRING_VALUE':([10,11,13,14,15,16,19,20,21,22,23,24,25,26,42,44,45,53,],[33,-13,-14,-15,-16,-17,-18,-19,-20,-21,-22,-23,-24,-26,33,-25,-27,33,]),'NONE':([11,15,16,42,53,],[38,-16,-17,38,38,]),'TRUE':([11,15,16,42,53,],[39,-16,-17,39,39,]),'FALSE':([11,15,16,42,53,],[40,-16,-17,40,40,]),'COMMA':([30,31,33,36,37,38,39,40,46,47,48,49,50,51,54,],[-34,-35,-36,-38,-39,-37,-40,-41,53,-44,-30,-31,-32,-33,-43,]),}
 
 _lr_action = {}
 for _k, _v in _lr_action_items.items():
@@ -17,7 +17,7 @@ for _k, _v in _lr_action_items.items():
       _lr_action[_x][_k] = _y
 del _lr_action_items
 
-_lr_goto_items = {'expression':([0,2,5,],[1,8,25,]),'name':([0,2,5,],[3,3,3,]),'logical':([1,8,25,],[5,5,5,]),'comparison_number':([3,],[9,]),'comparison_string':([3,],[10,]),'comparison_equality':([3,],[11,]),'comparison_in_list':([3,],[12,]),'comparison_greater_less':([3,],[13,]),'comparison_contains':([3,],[14,]),'number':([9,40,49,],[27,44,44,]),'string':([10,40,49,],[30,45,45,]),'boolean_value':([11,40,49,],[32,47,47,]),'none':([11,40,49,],[33,46,46,]),'true':([11,40,49,],[34,34,34,]),'false':([11,40,49,],[35,35,35,]),'const_list_value':([12,],[39,]),'const_value_list':([40,],[42,]),'const_value':([40,49,],[43,50,]),}
+_lr_goto_items = {'expression':([0,2,5,],[1,8,27,]),'name':([0,2,5,],[3,3,3,]),'logical':([1,8,27,],[5,5,5,]),'comparison_number':([3,],[9,]),'comparison_string':([3,],[10,]),'comparison_equality':([3,],[11,]),'comparison_in_list':([3,],[12,]),'comparison_greater_less':([3,],[13,]),'comparison_string_specific':([3,],[14,]),'number':([9,42,53,],[29,48,48,]),'string':([10,42,53,],[32,49,49,]),'boolean_value':([11,42,53,],[34,51,51,]),'none':([11,42,53,],[35,50,50,]),'true':([11,42,53,],[36,36,36,]),'false':([11,42,53,],[37,37,37,]),'const_list_value':([12,],[41,]),'const_value_list':([42,],[46,]),'const_value':([42,53,],[47,54,]),}
 
 _lr_goto = {}
 for _k, _v in _lr_goto_items.items():
@@ -27,44 +27,48 @@ for _k, _v in _lr_goto_items.items():
 del _lr_goto_items
 _lr_productions = [
   ("S' -> expression","S'",1,None,None,None),
-  ('expression -> PAREN_L expression PAREN_R','expression',3,'p_expression_parens','parser.py',49),
-  ('expression -> expression logical expression','expression',3,'p_expression_logical','parser.py',55),
-  ('expression -> name comparison_number number','expression',3,'p_expression_comparison','parser.py',61),
-  ('expression -> name comparison_string string','expression',3,'p_expression_comparison','parser.py',62),
-  ('expression -> name comparison_equality boolean_value','expression',3,'p_expression_comparison','parser.py',63),
-  ('expression -> name comparison_equality none','expression',3,'p_expression_comparison','parser.py',64),
-  ('expression -> name comparison_in_list const_list_value','expression',3,'p_expression_comparison','parser.py',65),
-  ('name -> NAME','name',1,'p_name','parser.py',71),
-  ('logical -> AND','logical',1,'p_logical','parser.py',77),
-  ('logical -> OR','logical',1,'p_logical','parser.py',78),
-  ('comparison_number -> comparison_equality','comparison_number',1,'p_comparison_number','parser.py',84),
-  ('comparison_number -> comparison_greater_less','comparison_number',1,'p_comparison_number','parser.py',85),
-  ('comparison_string -> comparison_equality','comparison_string',1,'p_comparison_string','parser.py',91),
-  ('comparison_string -> comparison_greater_less','comparison_string',1,'p_comparison_string','parser.py',92),
-  ('comparison_string -> comparison_contains','comparison_string',1,'p_comparison_string','parser.py',93),
-  ('comparison_equality -> EQUALS','comparison_equality',1,'p_comparison_equality','parser.py',99),
-  ('comparison_equality -> NOT_EQUALS','comparison_equality',1,'p_comparison_equality','parser.py',100),
-  ('comparison_greater_less -> GREATER','comparison_greater_less',1,'p_comparison_greater_less','parser.py',106),
-  ('comparison_greater_less -> GREATER_EQUAL','comparison_greater_less',1,'p_comparison_greater_less','parser.py',107),
-  ('comparison_greater_less -> LESS','comparison_greater_less',1,'p_comparison_greater_less','parser.py',108),
-  ('comparison_greater_less -> LESS_EQUAL','comparison_greater_less',1,'p_comparison_greater_less','parser.py',109),
-  ('comparison_contains -> CONTAINS','comparison_contains',1,'p_comparison_contains','parser.py',115),
-  ('comparison_contains -> NOT_CONTAINS','comparison_contains',1,'p_comparison_contains','parser.py',116),
-  ('comparison_in_list -> IN','comparison_in_list',1,'p_comparison_in_list','parser.py',122),
-  ('comparison_in_list -> NOT IN','comparison_in_list',2,'p_comparison_in_list','parser.py',123),
-  ('const_value -> number','const_value',1,'p_const_value','parser.py',132),
-  ('const_value -> string','const_value',1,'p_const_value','parser.py',133),
-  ('const_value -> none','const_value',1,'p_const_value','parser.py',134),
-  ('const_value -> boolean_value','const_value',1,'p_const_value','parser.py',135),
-  ('number -> INT_VALUE','number',1,'p_number_int','parser.py',141),
-  ('number -> FLOAT_VALUE','number',1,'p_number_float','parser.py',147),
-  ('string -> STRING_VALUE','string',1,'p_string','parser.py',153),
-  ('none -> NONE','none',1,'p_none','parser.py',159),
-  ('boolean_value -> true','boolean_value',1,'p_boolean_value','parser.py',165),
-  ('boolean_value -> false','boolean_value',1,'p_boolean_value','parser.py',166),
-  ('true -> TRUE','true',1,'p_true','parser.py',172),
-  ('false -> FALSE','false',1,'p_false','parser.py',178),
-  ('const_list_value -> PAREN_L const_value_list PAREN_R','const_list_value',3,'p_const_list_value','parser.py',184),
-  ('const_value_list -> const_value_list COMMA const_value','const_value_list',3,'p_const_value_list','parser.py',190),
-  ('const_value_list -> const_value','const_value_list',1,'p_const_value_list_single','parser.py',196),
+  ('expression -> PAREN_L expression PAREN_R','expression',3,'p_expression_parens','parser.py',236),
+  ('expression -> expression logical expression','expression',3,'p_expression_logical','parser.py',242),
+  ('expression -> name comparison_number number','expression',3,'p_expression_comparison','parser.py',248),
+  ('expression -> name comparison_string string','expression',3,'p_expression_comparison','parser.py',249),
+  ('expression -> name comparison_equality boolean_value','expression',3,'p_expression_comparison','parser.py',250),
+  ('expression -> name comparison_equality none','expression',3,'p_expression_comparison','parser.py',251),
+  ('expression -> name comparison_in_list const_list_value','expression',3,'p_expression_comparison','parser.py',252),
+  ('name -> NAME','name',1,'p_name','parser.py',258),
+  ('logical -> AND','logical',1,'p_logical','parser.py',264),
+  ('logical -> OR','logical',1,'p_logical','parser.py',265),
+  ('comparison_number -> comparison_equality','comparison_number',1,'p_comparison_number','parser.py',271),
+  ('comparison_number -> comparison_greater_less','comparison_number',1,'p_comparison_number','parser.py',272),
+  ('comparison_string -> comparison_equality','comparison_string',1,'p_comparison_string','parser.py',278),
+  ('comparison_string -> comparison_greater_less','comparison_string',1,'p_comparison_string','parser.py',279),
+  ('comparison_string -> comparison_string_specific','comparison_string',1,'p_comparison_string','parser.py',280),
+  ('comparison_equality -> EQUALS','comparison_equality',1,'p_comparison_equality','parser.py',286),
+  ('comparison_equality -> NOT_EQUALS','comparison_equality',1,'p_comparison_equality','parser.py',287),
+  ('comparison_greater_less -> GREATER','comparison_greater_less',1,'p_comparison_greater_less','parser.py',293),
+  ('comparison_greater_less -> GREATER_EQUAL','comparison_greater_less',1,'p_comparison_greater_less','parser.py',294),
+  ('comparison_greater_less -> LESS','comparison_greater_less',1,'p_comparison_greater_less','parser.py',295),
+  ('comparison_greater_less -> LESS_EQUAL','comparison_greater_less',1,'p_comparison_greater_less','parser.py',296),
+  ('comparison_string_specific -> CONTAINS','comparison_string_specific',1,'p_comparison_string_specific','parser.py',302),
+  ('comparison_string_specific -> NOT_CONTAINS','comparison_string_specific',1,'p_comparison_string_specific','parser.py',303),
+  ('comparison_string_specific -> STARTSWITH','comparison_string_specific',1,'p_comparison_string_specific','parser.py',304),
+  ('comparison_string_specific -> NOT STARTSWITH','comparison_string_specific',2,'p_comparison_string_specific','parser.py',305),
+  ('comparison_string_specific -> ENDSWITH','comparison_string_specific',1,'p_comparison_string_specific','parser.py',306),
+  ('comparison_string_specific -> NOT ENDSWITH','comparison_string_specific',2,'p_comparison_string_specific','parser.py',307),
+  ('comparison_in_list -> IN','comparison_in_list',1,'p_comparison_in_list','parser.py',316),
+  ('comparison_in_list -> NOT IN','comparison_in_list',2,'p_comparison_in_list','parser.py',317),
+  ('const_value -> number','const_value',1,'p_const_value','parser.py',326),
+  ('const_value -> string','const_value',1,'p_const_value','parser.py',327),
+  ('const_value -> none','const_value',1,'p_const_value','parser.py',328),
+  ('const_value -> boolean_value','const_value',1,'p_const_value','parser.py',329),
+  ('number -> INT_VALUE','number',1,'p_number_int','parser.py',335),
+  ('number -> FLOAT_VALUE','number',1,'p_number_float','parser.py',341),
+  ('string -> STRING_VALUE','string',1,'p_string','parser.py',347),
+  ('none -> NONE','none',1,'p_none','parser.py',353),
+  ('boolean_value -> true','boolean_value',1,'p_boolean_value','parser.py',359),
+  ('boolean_value -> false','boolean_value',1,'p_boolean_value','parser.py',360),
+  ('true -> TRUE','true',1,'p_true','parser.py',366),
+  ('false -> FALSE','false',1,'p_false','parser.py',372),
+  ('const_list_value -> PAREN_L const_value_list PAREN_R','const_list_value',3,'p_const_list_value','parser.py',378),
+  ('const_value_list -> const_value_list COMMA const_value','const_value_list',3,'p_const_value_list','parser.py',384),
+  ('const_value_list -> const_value','const_value_list',1,'p_const_value_list_single','parser.py',393),
 ]
@@ -1,47 +1,323 @@
-from django.db.models import QuerySet
+import re
 
-from .ast import Logical
-from .parser import DjangoQLParser
-from .schema import DjangoQLField, DjangoQLSchema
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import ManyToManyField, ManyToManyRel, ManyToOneRel, Q, \
+    QuerySet
 
+from .ast import NodeVisitor
+from .cache import LRUCache
+from .lexer import DjangoQLLexer
+from .parser import get_parser
+from .schema import DjangoQLSchema
 
-def build_filter(expr, schema_instance):
-    if isinstance(expr.operator, Logical):
-        left = build_filter(expr.left, schema_instance)
-        right = build_filter(expr.right, schema_instance)
-        if expr.operator.operator == 'or':
-            return left | right
-        else:
-            return left & right
-
-    field = schema_instance.resolve_name(expr.left)
-    if not field:
-        # That must be a reference to a model without specifying a field.
-        # Let's construct an abstract lookup field for it
-        field = DjangoQLField(
-            name=expr.left.parts[-1],
-            nullable=True,
-        )
-    return field.get_lookup(
-        path=expr.left.parts[:-1],
-        operator=expr.operator.operator,
-        value=expr.right.value,
+
+class RelatedLookup(object):
+    """
+    A lookup on a multi-valued relation that should be checked with
+    an EXISTS subquery, together with other lookups on the same relation
+    from the same chain of logical operators
+    """
+    def __init__(self, relation, q):
+        self.relation = relation
+        self.q = q
+
+
+class DjangoQLFilterBuilder(NodeVisitor):
+    """
+    Builds a Q object for a validated expression. Chains of the same logical
+    operator become a single flat Q object instead of nested ones.
+
+    With multi_valued_relations = 'exists' schemas, positive comparisons
+    with fields of reverse foreign keys and many-to-many relations are
+    grouped by relation within each chain and checked with EXISTS
+    subqueries instead of joins, which would multiply result rows.
+
+    With joins, all comparisons of a relation refer to the same related
+    object. Separate subqueries can't express that when the relation is
+    compared in several operands of an "and" chain, like in
+    "(book.name = "x" or id = 1) and book.rating > 2", so joins are used
+    for such relations.
+    """
+    def __init__(self, schema_instance, compiled=None):
+        self.schema_instance = schema_instance
+        self.compiled = compiled or {}
+        self.exists = schema_instance.multi_valued_relations == 'exists'
+        self.joined = set()
+        self._relations = {}
+        self._uses = {}
+        self._conflicts = set()
+
+    def build(self, expr):
+        while True:
+            # Relations of Q objects built so far, by their ids
+            self._uses = {}
+            self._conflicts = set()
+            result = self.visit(expr)
+            if not self._conflicts:
+                break
+            # Relations that can't be checked with subqueries are joined,
+            # which may make other chains mixed, so start over
+            self.joined.update(self._conflicts)
+        if isinstance(result, RelatedLookup):
+            result = self.exists_q(result.relation, result.q)
+        return result
+
+    def visit_comparison(self, expr):
+        compiled = self.compiled.get(expr)
+        if compiled is None:
+            compiled = self.schema_instance.compile_comparison(expr)
+        if self.exists and \
+                not compiled.field.get_operator(compiled.operator)[1]:
+            relation = self.relation(compiled.path)
+            if relation is not None:
+                if compiled.value is not None and \
+                        relation not in self.joined:
+                    return RelatedLookup(relation, compiled.get_lookup(
+                        path=compiled.path[len(relation[0]):],
+                    ))
+                # Comparisons with None are checked with joins
+                return self.used(compiled.get_lookup(), {relation})
+        return compiled.get_lookup()
+
+    def visit_logical(self, expr, operator, results):
+        connector = Q.OR if operator.operator == 'or' else Q.AND
+        if self.exists:
+            results = self.group(results, connector)
+        # Empty Q objects are skipped, just like Q.__and__() and Q.__or__()
+        # do it
+        children = [q for q in results if q]
+        if len(children) < 2:
+            return children[0] if children else Q()
+        q = self.combine(children, connector)
+        if self.exists:
+            relations = set()
+            for child in children:
+                relations.update(self._uses.get(id(child), ()))
+            self.used(q, relations)
+        return q
+
+    def combine(self, children, connector):
+        q = Q()
+        q.connector = connector
+        q.children = children
+        return q
+
+    def group(self, results, connector):
+        """
+        Replaces lookups on the same multi-valued relation with a single
+        EXISTS subquery, placed where the first of them was
+        """
+        groups = {}
+        for result in results:
+            if isinstance(result, RelatedLookup):
+                groups.setdefault(result.relation, []).append(result.q)
+        if connector == Q.AND:
+            # A relation can't be checked with separate subqueries in
+            # several operands of "and", unless they're all its comparisons
+            # that go into a single subquery
+            counts = {}
+            for result in results:
+                if isinstance(result, RelatedLookup):
+                    continue
+                for relation in self._uses.get(id(result), ()):
+                    counts[relation] = counts.get(relation, 0) + 1
+            for relation, count in counts.items():
+                if relation not in self.joined and \
+                        (count > 1 or relation in groups):
+                    self._conflicts.add(relation)
+        if not groups:
+            return results
+        grouped = []
+        for result in results:
+            if isinstance(result, RelatedLookup):
+                lookups = groups.pop(result.relation, None)
+                if lookups is None:
+                    continue
+                if len(lookups) == 1:
+                    q = lookups[0]
+                else:
+                    q = self.combine(lookups, connector)
+                if len(results) == len(lookups):
+                    # The whole chain is about this relation, the caller can
+                    # group it further
+                    return [RelatedLookup(result.relation, q)]
+                result = self.exists_q(result.relation, q)
+            grouped.append(result)
+        return grouped
+
+    def relation(self, path):
+        """
+        Finds the first multi-valued relation in given path. Returns a tuple of
+        (path to the relation, lookup from the related model back to the
+        outer one, outer field it refers to, related model), or None if
+        there's no such relation or it can't be checked with a subquery.
+        """
+        path = tuple(path)
+        try:
+            return self._relations[path]
+        except KeyError:
+            pass
+        result = None
+        model = self.schema_instance.current_model
+        for i, name in enumerate(path):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                break
+            if not field.is_relation or not field.related_model:
+                break
+            if field.many_to_many or field.one_to_many:
+                back = self.reverse_lookup(field)
+                if back is not None:
+                    result = (
+                        path[:i + 1],
+                        back[0],
+                        '__'.join(path[:i] + (back[1],)),
+                        field.related_model,
+                    )
+                break
+            model = field.related_model
+        self._relations[path] = result
+        return result
+
+    def reverse_lookup(self, field):
+        """
+        Returns a pair of (lookup from the related model back to field's
+        model, field of field's model that it refers to)
+        """
+        if isinstance(field, ManyToOneRel):
+            # Reverse foreign key
+            return field.field.name, field.field_name
+        if isinstance(field, ManyToManyRel):
+            return field.field.name, 'pk'
+        if isinstance(field, ManyToManyField):
+            name = field.related_query_name()
+            if name.endswith('+'):
+                # related_name='+', there's no way back
+                return None
+            return name, 'pk'
+        return None
+
+    def exists_q(self, relation, q):
+        from django.db.models import Exists, OuterRef
+
+        path, back, outer_field, related_model = relation
+        queryset = related_model._base_manager.filter(
+            **{back: OuterRef(outer_field)}
+        ).filter(q)
+        return self.used(Q(Exists(queryset.values('pk'))), {relation})
+
+    def used(self, q, relations):
+        """
+        Remembers multi-valued relations checked by given Q object
+        """
+        if relations:
+            self._uses[id(q)] = relations
+        return q
+
+
+def build_filter(expr, schema_instance, compiled=None):
+    """
+    Builds a Q object for given expression
+
+    :param compiled: optional result of schema_instance.compile(expr), to
+        reuse validated comparisons and converted values from
+    """
+    return DjangoQLFilterBuilder(schema_instance, compiled=compiled).build(expr)
+
+
+class DjangoQLQueryCache(LRUCache):
+    """
+    Cache of parsed and validated search queries.
+
+    Entries are keyed by schema class, model and query text with insignificant
+    whitespace removed. Only characters that the lexer skips count as
+    whitespace, so a cached query fails or succeeds the same way it would
+    without the cache. Caching is opt-in, pass an instance of this class to
+    apply_search() or set it as djangoql_cache on DjangoQLQuerySet or
+    DjangoQLSearchMixin.
+    """
+    separators = DjangoQLLexer.whitespace + DjangoQLLexer.line_terminators
+    normalize_pattern = re.compile(
+        r'("(?:[^"\\]|\\.)*")|[' + separators + ']+',
+        re.UNICODE,
     )
 
+    def __init__(self, maxsize=1000):
+        super(DjangoQLQueryCache, self).__init__(maxsize=maxsize)
+        self._schemas = {}
 
-def apply_search(queryset, search, schema=None):
+    @classmethod
+    def normalize(cls, search):
+        return cls.normalize_pattern.sub(
+            lambda m: m.group(1) or ' ',
+            search,
+        ).strip(cls.separators)
+
+    def key(self, schema, model, search):
+        return schema, model, self.normalize(search)
+
+    def get_ast(self, schema, model, search):
+        return self.get(self.key(schema, model, search))
+
+    def set_ast(self, schema, model, search, ast):
+        schema_name = '%s.%s' % (schema.__module__, schema.__name__)
+        previous = self._schemas.get(schema_name)
+        if previous is not None and previous is not schema:
+            # Schema class was reloaded, entries cached for the old one
+            # should not be served anymore
+            self.invalidate(previous)
+        self._schemas[schema_name] = schema
+        self.set(self.key(schema, model, search), ast)
+
+    def invalidate(self, schema=None):
+        """
+        Drop entries cached for given schema class, or all entries
+        """
+        if schema is None:
+            self.clear()
+            self._schemas.clear()
+        else:
+            self.delete_many(lambda key: key[0] is schema)
+
+
+def apply_search(queryset, search, schema=None, cache=None):
     """
     Applies search written in DjangoQL mini-language to given queryset
+
+    :param cache: optional DjangoQLQueryCache instance to reuse parsed and
+        validated queries from
     """
-    ast = DjangoQLParser().parse(search)
     schema = schema or DjangoQLSchema
     schema_instance = schema(queryset.model)
-    schema_instance.validate(ast)
-    return queryset.filter(build_filter(ast, schema_instance))
+    ast = None
+    compiled = None
+    if cache is not None:
+        ast = cache.get_ast(schema, queryset.model, search)
+    if ast is None:
+        ast = get_parser().parse(search)
+        compiled = schema_instance.validate(ast)
+        if not isinstance(compiled, dict):
+            # validate() is overridden and doesn't return compile() results
+            compiled = None
+        if cache is not None:
+            cache.set_ast(schema, queryset.model, search, ast)
+    ast = schema_instance.optimize(ast)
+    if ast is None:
+        return queryset.none()
+    return queryset.filter(
+        build_filter(ast, schema_instance, compiled=compiled),
+    )
 
 
 class DjangoQLQuerySet(QuerySet):
     djangoql_schema = None
+    djangoql_cache = None
 
     def djangoql(self, search, schema=None):
-        return apply_search(self, search, schema=schema or self.djangoql_schema)
+        return apply_search(
+            self,
+            search,
+            schema=schema or self.djangoql_schema,
+            cache=self.djangoql_cache,
+        )
@@ -1,21 +1,93 @@
+import hashlib
 import inspect
+import json
+import re
+import threading
+import time
 import warnings
+from bisect import bisect_left
 from collections import OrderedDict, deque
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
+from itertools import islice
+from operator import attrgetter
 
+import django
+from django.apps import apps
 from django.conf import settings
 from django.core.exceptions import FieldDoesNotExist
-from django.db import models
+from django.core.signals import setting_changed
+from django.db import connections, models
 from django.db.models import ManyToManyRel, ManyToOneRel
 from django.db.models.fields.related import ForeignObjectRel
+from django.db.models.signals import class_prepared
+from django.utils.module_loading import import_string
 from django.utils.timezone import get_current_timezone
+from django.utils.translation import get_language
 
-from .ast import Comparison, Const, List, Logical, Name, Node
-from .compat import text_type
+from .ast import Comparison, Const, List, Name, Node, NodeVisitor
+from .cache import LRUCache
+from .compat import Mapping, text_type
 from .exceptions import DjangoQLSchemaError
 
 
+def _func(method):
+    # Unbound methods in Python 2 wrap the underlying function
+    return getattr(method, '__func__', method)
+
+
+_unset = object()
+
+_date_re = re.compile(r'([0-9]{4})-([0-9]{2})-([0-9]{2})\Z')
+_datetime_re = re.compile(
+    r'([0-9]{4})-([0-9]{2})-([0-9]{2})'
+    r'(?: ([0-9]{2}):([0-9]{2})(?::([0-9]{2}))?)?\Z',
+)
+# Recently parsed literals
+_parsed_dates = LRUCache(maxsize=1000)
+_parsed_datetimes = LRUCache(maxsize=1000)
+
+
+def _parse_date(value):
+    """
+    Parses a date in "YYYY-MM-DD" format like strptime() does. Values in
+    the canonical format are parsed with a regex, others fall back to
+    strptime(), which also accepts things like single-digit months.
+    """
+    result = _parsed_dates.get(value)
+    if result is not None:
+        return result
+    match = _date_re.match(value)
+    if match:
+        result = date(*[int(g) for g in match.groups()])
+    else:
+        result = datetime.strptime(value, '%Y-%m-%d').date()
+    _parsed_dates.set(value, result)
+    return result
+
+
+def _parse_datetime(value):
+    """
+    Parses a naive timestamp in "YYYY-MM-DD[ HH:MM[:SS]]" format like
+    strptime() does, see _parse_date()
+    """
+    result = _parsed_datetimes.get(value)
+    if result is not None:
+        return result
+    match = _datetime_re.match(value)
+    if match:
+        result = datetime(*[int(g) for g in match.groups() if g is not None])
+    else:
+        mask = '%Y-%m-%d'
+        if len(value) > 10:
+            mask += ' %H:%M'
+        if len(value) > 16:
+            mask += ':%S'
+        result = datetime.strptime(value, mask)
+    _parsed_datetimes.set(value, result)
+    return result
+
+
 class DjangoQLField(object):
     """
     Abstract searchable field
@@ -42,11 +114,39 @@ class DjangoQLField(object):
     def _field_choices(self):
         if self.model:
             try:
-                return self.model._meta.get_field(self.name).choices
+                return self.model._meta.get_field(self.name).choices or []
             except (AttributeError, FieldDoesNotExist):
                 pass
         return []
 
+    def _choice_lookups(self, choices):
+        """
+        Returns a pair of dicts for given choices: (codes, labels), which map
+        codes and labels to the position of the first choice they belong to
+        and its code. Labels may be translated, so dicts are built once per
+        language. They're built again if choices are a different object, e.g.
+        a regenerated list. Returns None if choices aren't hashable.
+        """
+        cache = self.__dict__.setdefault('_choice_lookups_cache', {})
+        key = get_language()
+        entry = cache.get(key)
+        if entry is not None and entry[0] is choices:
+            return entry[1]
+        codes = {}
+        labels = {}
+        try:
+            for i, c in enumerate(choices):
+                codes.setdefault(c[0], (i, c[0]))
+                labels.setdefault(c[1], (i, c[0]))
+        except TypeError:
+            result = None
+        else:
+            result = (codes, labels)
+        # The entry refers to choices, so their id can't be reused while
+        # it's cached
+        cache[key] = (choices, result)
+        return result
+
     @property
     def async_options(self):
         return not self._field_choices()
@@ -65,6 +165,18 @@ class DjangoQLField(object):
                     result.append(choice)
         return result
 
+    def aget_options(self, search, limit=None):
+        """
+        Async version of get_options(), requires Python 3 and Django 4.1+.
+        Returns an awaitable that runs get_options() in a thread, and cancels
+        its database query if it's cancelled. Options are evaluated in the
+        thread, so querysets are fetched as a list, with at most limit items
+        if it's given. Override it with a coroutine function to provide
+        options asynchronously.
+        """
+        from .async_views import get_options_async
+        return get_options_async(self, search, limit=limit)
+
     def get_lookup_name(self):
         """
         Override this method to provide custom lookup name
@@ -78,11 +190,28 @@ class DjangoQLField(object):
         choices = self._field_choices()
         if choices:
             if isinstance(value, list):
+                try:
+                    value = set(value)
+                except TypeError:
+                    pass
                 return [c[0] for c in choices if c[0] in value or c[1] in value]
-            else:
+            lookups = self._choice_lookups(choices)
+            if lookups is None:
                 for c in choices:
                     if value in c:
                         return c[0]
+                return value
+            try:
+                # The first choice that has the value either as a code or as
+                # a label
+                found = min(
+                    lookups[0].get(value, (len(choices), None)),
+                    lookups[1].get(value, (len(choices), None)),
+                )
+            except TypeError:
+                return value
+            if found[0] < len(choices):
+                return found[1]
         return value
 
     def get_operator(self, operator):
@@ -136,11 +265,51 @@ class DjangoQLField(object):
         :param value: value passed for comparison
         :return: Q-object
         """
+        return self.get_converted_lookup(
+            path,
+            operator,
+            self.get_lookup_value(value),
+        )
+
+    def get_converted_lookup(self, path, operator, lookup_value):
+        """
+        Same as get_lookup(), but for a value that is already converted with
+        clean()
+        """
         search = '__'.join(path + [self.get_lookup_name()])
         op, invert = self.get_operator(operator)
-        q = models.Q(**{'%s%s' % (search, op): self.get_lookup_value(value)})
+        q = models.Q(**{'%s%s' % (search, op): lookup_value})
         return ~q if invert else q
 
+    def clean(self, operator, value):
+        """
+        Validates a value compared to this field with given operator, and
+        returns it converted for the lookup. Lists are passed as a whole.
+        Values for custom get_lookup() are returned as is, since it gets
+        original values and converts them itself.
+        """
+        if isinstance(value, list):
+            self.validate_list(value)
+        else:
+            self.validate(value)
+        if _func(type(self).get_lookup) not in _converted_lookups:
+            return value
+        return self.get_lookup_value(value)
+
+    def validate_list(self, values):
+        """
+        Validates values of a list. If validate() isn't overridden, values of
+        valid types are accepted without checking them one by one. Otherwise
+        each distinct value is validated once.
+        """
+        if _func(type(self).validate) in _type_validators:
+            allowed = set(self.value_types)
+            if set(map(type, values)) <= allowed:
+                return
+        # Keyed by type as well, so that 1 and True are both validated
+        for _, value in OrderedDict.fromkeys((type(v), v) for v in values):
+            self.validate(value)
+
     def validate(self, value):
         if not self.nullable and value is None:
             raise DjangoQLSchemaError(
@@ -190,20 +359,185 @@ class StrField(DjangoQLField):
     type = 'str'
     value_types = [text_type]
     value_types_description = 'strings'
+    # How get_options() finds suggestions: 'icontains' - values that contain
+    # the search, 'istartswith' - values that start with it, which can use
+    # an index, or 'trigram' - values similar to it, with pg_trgm on
+    # PostgreSQL. 'trigram' falls back to 'icontains' on other databases.
+    options_lookup = 'icontains'
+    # Look for suggestions only among this many rows with the greatest
+    # primary keys, i.e. the most recent ones
+    options_scan_limit = None
+    # If the field has at most this many distinct values, they're loaded
+    # into memory, and suggestions are found there instead of querying the
+    # database. Values are loaded again after options_dictionary_timeout
+    # seconds, or on refresh_options_dictionary() call. Doesn't apply to
+    # the 'trigram' lookup.
+    options_dictionary_threshold = None
+    options_dictionary_timeout = 300
 
     def get_options(self, search):
         choice_options = super(StrField, self).get_options(search)
         if choice_options:
             return choice_options
-        lookup = {}
+        if self.options_dictionary_threshold is not None and \
+                self.options_lookup != 'trigram':
+            dictionary = self.get_options_dictionary()
+            if dictionary is not None:
+                return dictionary.search(search, self.options_lookup)
+        queryset = self.get_options_queryset()
         if search:
-            lookup['%s__icontains' % self.name] = search
-        return self.model.objects\
-            .filter(**lookup)\
+            lookup = '%s__%s' % (self.name, self.get_options_lookup(queryset))
+            queryset = queryset.filter(**{lookup: search})
+        return queryset\
             .order_by(self.name)\
             .values_list(self.name, flat=True)\
             .distinct()
 
+    def get_options_queryset(self):
+        queryset = self.model.objects.all()
+        if self.options_scan_limit is not None:
+            queryset = self.limit_options_scan(queryset)
+        return queryset
+
+    def get_options_dictionary(self):
+        """
+        Returns OptionsDictionary with all distinct values of the field, or
+        None if there are more than options_dictionary_threshold of them.
+        Results are shared by all fields with the same model and name, and
+        kept for options_dictionary_timeout seconds.
+        """
+        key = self._options_dictionary_key()
+        entry = _options_dictionaries.get(key)
+        if entry is None or entry[0] <= time.time():
+            return self.refresh_options_dictionary()
+        return entry[1]
+
+    def refresh_options_dictionary(self):
+        """
+        Loads distinct values of the field again, see
+        get_options_dictionary()
+        """
+        threshold = self.options_dictionary_threshold
+        values = list(
+            self.get_options_queryset()
+                .order_by(self.name)
+                .values_list(self.name, flat=True)
+                .distinct()[:threshold + 1],
+        )
+        # Too many values are remembered too, so that they're not loaded
+        # on every call
+        dictionary = OptionsDictionary(values) \
+            if len(values) <= threshold else None
+        _options_dictionaries[self._options_dictionary_key()] = (
+            time.time() + self.options_dictionary_timeout,
+            dictionary,
+        )
+        return dictionary
+
+    def _options_dictionary_key(self):
+        return (
+            self.model,
+            self.name,
+            self.options_scan_limit,
+            self.options_dictionary_threshold,
+        )
+
+    def get_options_lookup(self, queryset):
+        """
+        Returns the lookup that get_options() filters values with
+        """
+        if self.options_lookup not in ('icontains', 'istartswith', 'trigram'):
+            raise DjangoQLSchemaError(
+                "options_lookup must be 'icontains', 'istartswith' or "
+                "'trigram'",
+            )
+        if self.options_lookup != 'trigram':
+            return self.options_lookup
+        if not _has_trigrams(queryset.db):
+            return 'icontains'
+        if django.VERSION < (3, 0):
+            return 'trigram_similar'
+        # Compares the search with parts of values, which suits
+        # completion of partially typed values better
+        return 'trigram_word_similar'
+
+    def limit_options_scan(self, queryset):
+        """
+        Limits given queryset to options_scan_limit rows with the greatest
+        primary keys
+        """
+        limit = self.options_scan_limit
+        threshold = list(
+            queryset.order_by('-pk').values_list('pk', flat=True)[
+                limit - 1:limit
+            ],
+        )
+        if not threshold:
+            # Fewer rows than the limit
+            return queryset
+        return queryset.filter(pk__gte=threshold[0])
+
+
+class OptionsDictionary(object):
+    """
+    In-memory list of distinct values of a field, in the order returned by
+    the database, which can be searched like the database does it
+    """
+    __slots__ = ('values', 'index')
+
+    def __init__(self, values):
+        self.values = values
+        # Lowercase values with their positions, for prefix search
+        self.index = sorted(
+            (v.lower(), i) for i, v in enumerate(values) if v is not None
+        )
+
+    def search(self, search, lookup='icontains'):
+        """
+        Returns values that contain given search, or start with it for
+        the 'istartswith' lookup, ignoring case. Without search, returns all
+        values.
+        """
+        if not search:
+            return list(self.values)
+        search = search.lower()
+        if lookup == 'istartswith':
+            positions = []
+            start = bisect_left(self.index, (search,))
+            for value, i in islice(self.index, start, None):
+                if not value.startswith(search):
+                    break
+                positions.append(i)
+            positions.sort()
+        else:
+            positions = [i for value, i in self.index if search in value]
+            positions.sort()
+        return [self.values[i] for i in positions]
+
+
+_options_dictionaries = {}
+_trigram_support = {}
+
+
+def _has_trigrams(alias):
+    """
+    Checks if trigram lookups can be used with given database: it must be
+    PostgreSQL with the pg_trgm extension, and django.contrib.postgres must
+    be installed
+    """
+    if alias not in _trigram_support:
+        connection = connections[alias]
+        supported = False
+        if connection.vendor == 'postgresql' and \
+                apps.is_installed('django.contrib.postgres'):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'",
+                )
+                supported = cursor.fetchone() is not None
+        _trigram_support[alias] = supported
+    return _trigram_support[alias]
+
 
 class BoolField(DjangoQLField):
     type = 'bool'
@@ -218,8 +552,21 @@ class DateField(DjangoQLField):
 
     def validate(self, value):
         super(DateField, self).validate(value)
+        self.parse(value)
+
+    def clean(self, operator, value):
+        if isinstance(value, list):
+            return [self.clean(operator, v) for v in value]
+        if _func(type(self).validate) is _func(DateField.validate):
+            # Don't parse the value twice
+            DjangoQLField.validate(self, value)
+        else:
+            self.validate(value)
+        return self.parse(value)
+
+    def parse(self, value):
         try:
-            self.get_lookup_value(value)
+            return self.get_lookup_value(value)
         except ValueError:
             raise DjangoQLSchemaError(
                 'Field "%s" can be compared to dates in '
@@ -232,7 +579,7 @@ class DateField(DjangoQLField):
     def get_lookup_value(self, value):
         if not value:
             return None
-        return datetime.strptime(value, '%Y-%m-%d').date()
+        return _parse_date(value)
 
 
 class DateTimeField(DjangoQLField):
@@ -242,8 +589,42 @@ class DateTimeField(DjangoQLField):
 
     def validate(self, value):
         super(DateTimeField, self).validate(value)
+        self.parse(value)
+
+    def clean(self, operator, value):
+        # The current timezone is resolved once for all values of a list
+        tzinfo = self.get_timezone()
+        if isinstance(value, list):
+            return [self._clean(operator, v, tzinfo) for v in value]
+        return self._clean(operator, value, tzinfo)
+
+    def _clean(self, operator, value, tzinfo):
+        if _func(type(self).validate) is _func(DateTimeField.validate):
+            # Don't parse the value twice
+            DjangoQLField.validate(self, value)
+        else:
+            self.validate(value)
+        lookup_value = self.parse(value, tzinfo)
+        # See get_lookup() below
+        return value if operator in ('~', '!~') else lookup_value
+
+    def get_timezone(self):
+        """
+        Returns the timezone of parsed timestamps, None if they're naive
+        """
+        return get_current_timezone() if settings.USE_TZ else None
+
+    def parse(self, value, tzinfo=_unset):
+        """
+        Converts value with get_lookup_value(). If a timezone is given and
+        get_lookup_value() isn't overridden, the value is converted directly
+        with this timezone, without looking up the current one.
+        """
         try:
-            self.get_lookup_value(value)
+            if tzinfo is _unset or _func(type(self).get_lookup_value) is not \
+                    _func(DateTimeField.get_lookup_value):
+                return self.get_lookup_value(value)
+            return self.to_datetime(value, tzinfo)
         except ValueError:
             raise DjangoQLSchemaError(
                 'Field "%s" can be compared to timestamps in '
@@ -254,22 +635,17 @@ class DateTimeField(DjangoQLField):
             )
 
     def get_lookup_value(self, value):
+        return self.to_datetime(value, self.get_timezone())
+
+    def to_datetime(self, value, tzinfo):
         if not value:
             return None
-        mask = '%Y-%m-%d'
-        if len(value) > 10:
-            mask += ' %H:%M'
-        if len(value) > 16:
-            mask += ':%S'
-        dt = datetime.strptime(value, mask)
-        if settings.USE_TZ:
-            dt = dt.replace(tzinfo=get_current_timezone())
+        dt = _parse_datetime(value)
+        if tzinfo is not None:
+            dt = dt.replace(tzinfo=tzinfo)
         return dt
 
     def get_lookup(self, path, operator, value):
-        search = '__'.join(path + [self.get_lookup_name()])
-        op, invert = self.get_operator(operator)
-
         # Add LIKE operator support for datetime fields. For LIKE comparisons
         # we don't want to convert source value to datetime instance, because
         # it would effectively kill the idea. What we want is expressions like
@@ -282,9 +658,7 @@ class DateTimeField(DjangoQLField):
         #       'created LIKE %2017-01-30 00:00:00%'
         # which is not what we want for this case.
         val = value if operator in ('~', '!~') else self.get_lookup_value(value)
-
-        q = models.Q(**{'%s%s' % (search, op): val})
-        return ~q if invert else q
+        return self.get_converted_lookup(path, operator, val)
 
 
 class RelationField(DjangoQLField):
@@ -305,10 +679,191 @@ class RelationField(DjangoQLField):
         return DjangoQLSchema.model_label(self.related_model)
 
 
+class LazyModels(Mapping):
+    """
+    Read-only mapping of model labels to their fields, just like the result of
+    DjangoQLSchema.introspect(), but models are introspected on first access.
+    Instances are shared by threads, so introspection is done under a lock.
+    """
+    def __init__(self, schema, model, exclude=()):
+        self.schema = schema
+        self._lock = threading.RLock()
+        self.exclude = frozenset(exclude)
+        model_label = schema.model_label(model)
+        # Models that are known to be reachable, by their labels, and their
+        # distances from the root model. Distances are final only for models
+        # that were reached by the breadth-first walk below.
+        self._reachable = {model_label: model}
+        self._depths = {model_label: 0}
+        self._fields = {}
+        # State of the breadth-first walk through the relation graph
+        self._queue = deque([model_label])
+        self._queued = {model_label}
+        self._order = []
+        self._all = None
+
+    def __getitem__(self, model_label):
+        fields = self._fields.get(model_label)
+        if fields is not None:
+            return fields
+        with self._lock:
+            if model_label not in self._reachable or \
+                    model_label in self.exclude:
+                if self._all is None:
+                    # The model may be reachable via models not introspected
+                    # yet
+                    return self.all()[model_label]
+                raise KeyError(model_label)
+            if self.schema.max_depth is not None:
+                # Fields depend on the distance from the root model, make
+                # sure it's final
+                self.walk(self._depths[model_label])
+            return self.introspect(model_label)
+
+    def introspect(self, model_label):
+        with self._lock:
+            fields = self._fields.get(model_label)
+            if fields is not None:
+                return fields
+            depth = self._depths[model_label]
+            fields = self.schema.introspect_model(
+                self._reachable[model_label],
+                depth=depth,
+            )
+            for field in fields.values():
+                if isinstance(field, RelationField):
+                    self._reachable.setdefault(
+                        field.relation,
+                        field.related_model,
+                    )
+                    if self._depths.get(field.relation, depth + 2) > depth + 1:
+                        self._depths[field.relation] = depth + 1
+            self._fields[model_label] = fields
+            return fields
+
+    def walk(self, depth=None):
+        """
+        Continues the breadth-first walk through the relation graph, until all
+        models closer than given depth are introspected
+        """
+        with self._lock:
+            queue = self._queue
+            while queue and (depth is None or self._depths[queue[0]] < depth):
+                model_label = queue.popleft()
+                if model_label in self.exclude:
+                    continue
+                self._order.append(model_label)
+                for field in self.introspect(model_label).values():
+                    if isinstance(field, RelationField) and \
+                            field.relation not in self._queued:
+                        self._queued.add(field.relation)
+                        queue.append(field.relation)
+
+    def all(self):
+        """
+        Walks the whole relation graph, in the same order as
+        DjangoQLSchema.introspect() does it
+        """
+        result = self._all
+        if result is None:
+            with self._lock:
+                if self._all is None:
+                    self.walk()
+                    self._all = OrderedDict(
+                        (model_label, self._fields[model_label])
+                        for model_label in self._order
+                    )
+                result = self._all
+        return result
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def __len__(self):
+        return len(self.all())
+
+    def __contains__(self, model_label):
+        try:
+            self[model_label]
+        except KeyError:
+            return False
+        return True
+
+
+_introspection_cache = {}
+_resolved_names_cache = {}
+_fingerprint_cache = {}
+_field_cls_cache = {}
+
+
+def clear_introspection_cache(**kwargs):
+    """
+    Drop cached introspection results of all schemas. Called automatically
+    when new models are created or settings are changed.
+    """
+    _introspection_cache.clear()
+    _resolved_names_cache.clear()
+    _fingerprint_cache.clear()
+    _field_cls_cache.clear()
+
+
+class_prepared.connect(clear_introspection_cache)
+setting_changed.connect(clear_introspection_cache)
+
+
 class DjangoQLSchema(object):
     include = ()  # models to include into introspection
     exclude = ()  # models to exclude from introspection
     suggest_options = None
+    # Set to DjangoQLOptimizer or its subclass to rewrite validated queries
+    # into equivalent ones which are cheaper for the database
+    optimizer_class = None
+    # How to check fields of reverse foreign keys and many-to-many relations:
+    # 'join' - with joins, like Django does it by default, or 'exists' - with
+    # EXISTS subqueries, which don't multiply result rows. 'exists' requires
+    # Django 3.0+
+    multi_valued_relations = 'join'
+    # Introspection results are shared by all instances of the schema class
+    # with the same model. Set to False if get_fields() returns different
+    # results for different instances.
+    cache_introspection = True
+    # Introspect models only when they're accessed, so that validation of
+    # queries touches only the models that they refer to. The whole relation
+    # graph is walked only when schema.models is iterated, for example, for
+    # the completion widget. introspect() is not used in this mode.
+    lazy_introspection = False
+    # Limits of the relation graph that is searchable with the schema:
+    # max_depth - how many relations away from the current model search can
+    #   go, max_relations - how many relations of each model can be used.
+    #   Relations are taken in the order returned by get_fields().
+    max_depth = None
+    max_relations = None
+    # Models and their fields that can be searched, for example,
+    # {User: ['username', 'groups'], Group: ['name']}. All fields of models
+    # that aren't listed can be searched.
+    include_fields = None
+    # Max size of the index of resolved names
+    max_resolved_names = 10000
+    # DjangoQL field classes for model field classes. Subclasses of these
+    # model fields, like PositiveIntegerField, use the class of their closest
+    # base class. field_classes of schema subclasses are merged with the ones
+    # of their base classes, for example:
+    #   field_classes = {JSONField: StrField}
+    field_classes = {
+        models.CharField: StrField,
+        models.TextField: StrField,
+        models.UUIDField: StrField,
+        models.BinaryField: StrField,
+        models.GenericIPAddressField: StrField,
+        models.AutoField: IntField,
+        models.IntegerField: IntField,
+        models.BooleanField: BoolField,
+        models.NullBooleanField: BoolField,
+        models.DecimalField: FloatField,
+        models.FloatField: FloatField,
+        models.DateTimeField: DateTimeField,
+        models.DateField: DateField,
+    }
 
     def __init__(self, model):
         if not inspect.isclass(model) or not issubclass(model, models.Model):
@@ -326,10 +881,21 @@ class DjangoQLSchema(object):
                     self.__class__,
                 ),
             )
+        if self.multi_valued_relations not in ('join', 'exists'):
+            raise DjangoQLSchemaError(
+                "multi_valued_relations must be either 'join' or 'exists'",
+            )
+        if self.multi_valued_relations == 'exists' and django.VERSION < (3, 0):
+            raise DjangoQLSchemaError(
+                "multi_valued_relations = 'exists' requires Django 3.0+",
+            )
         self.current_model = model
         self._models = None
+        self._resolved_names = None
         if self.suggest_options is None:
             self.suggest_options = {}
+        if self.include_fields is None:
+            self.include_fields = {}
 
     def excluded(self, model):
         return model in self.exclude or (
@@ -338,13 +904,192 @@ class DjangoQLSchema(object):
 
     @property
     def models(self):
-        if not self._models:
-            self._models = self.introspect(
-                model=self.current_model,
-                exclude=tuple(self.model_label(m) for m in self.exclude),
-            )
+        if self._models is None:
+            if self.cache_introspection:
+                key = self.introspection_key()
+                self._models = _introspection_cache.get(key)
+                if self._models is None:
+                    self._models = _introspection_cache.setdefault(
+                        key,
+                        self._introspect(),
+                    )
+            else:
+                self._models = self._introspect()
         return self._models
 
+    def _introspect(self):
+        exclude = tuple(self.model_label(m) for m in self.exclude)
+        if self.lazy_introspection:
+            return LazyModels(self, self.current_model, exclude=exclude)
+        return self.introspect(model=self.current_model, exclude=exclude)
+
+    def introspection_key(self):
+        """
+        Key of introspection results in the process-wide cache. Override this
+        if get_fields() of your schema depends on anything besides the schema
+        class, the model and the options below.
+        """
+        return (
+            self.__class__,
+            self.current_model,
+            tuple(self.include),
+            tuple(self.exclude),
+            self._freeze(self.suggest_options),
+            self.max_depth,
+            self.max_relations,
+            self._freeze(self.include_fields),
+        )
+
+    @classmethod
+    def _freeze(cls, model_fields):
+        return tuple(sorted(
+            (cls.model_label(model), tuple(fields))
+            for model, fields in model_fields.items()
+        ))
+
+    @classmethod
+    def warm_up(cls, *models):
+        """
+        Introspect given models in advance, so that the first searches don't
+        have to do it
+        """
+        for model in models:
+            cls(model).models
+
+    def fingerprint(self):
+        """
+        Returns a hash of models, fields, their types and relations that are
+        searchable with the schema, which is the same in all processes as
+        long as the schema and models are the same. Choice labels are hashed
+        too, so it depends on the active language. Can be used as an ETag of
+        the serialized schema or as a cache key.
+        """
+        if not self.cache_introspection:
+            return self._fingerprint()
+        key = (self.introspection_key(), get_language())
+        result = _fingerprint_cache.get(key)
+        if result is None:
+            result = _fingerprint_cache.setdefault(key, self._fingerprint())
+        return result
+
+    def _fingerprint(self):
+        models = {}
+        for model_label, fields in self.models.items():
+            models[model_label] = [
+                (
+                    name,
+                    field.type,
+                    field.nullable,
+                    field.suggest_options,
+                    getattr(field, 'relation', None),
+                    list(field._field_choices()),
+                )
+                for name, field in fields.items()
+            ]
+        # Lazy translations of choice labels are converted with text_type()
+        content = json.dumps(
+            [self.model_label(self.current_model), models],
+            sort_keys=True,
+            separators=(',', ':'),
+            default=text_type,
+        )
+        return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+    def _snapshot_key(self):
+        key = repr(self.introspection_key())
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def dump_snapshot(self, fp):
+        """
+        Writes introspection results to given file object as compact JSON,
+        so that other processes can load them with load_snapshot() instead of
+        introspecting models. Fields are recreated from their classes, so
+        they must be importable and accept the same arguments as
+        DjangoQLField or RelationField.
+        """
+        models = OrderedDict()
+        for model_label, fields in self.models.items():
+            models[model_label] = [
+                self._snapshot_field(field) for field in fields.values()
+            ]
+        # json.dump() writes native strings in Python 2, which text files
+        # like io.StringIO don't accept. Output is ASCII, so it can be
+        # written to either kind of file as text.
+        fp.write(text_type(json.dumps(
+            {
+                'key': self._snapshot_key(),
+                'fingerprint': self.fingerprint(),
+                'models': models,
+            },
+            separators=(',', ':'),
+        )))
+
+    def _snapshot_field(self, field):
+        cls = type(field)
+        path = '%s.%s' % (cls.__module__, cls.__name__)
+        try:
+            importable = import_string(path) is cls
+        except ImportError:
+            importable = False
+        if not importable:
+            raise DjangoQLSchemaError(
+                "Field %s can't be stored in a snapshot: %s is not "
+                'importable' % (field.name, path),
+            )
+        return [
+            field.name,
+            path,
+            self.model_label(field.model) if field.model else None,
+            field.nullable,
+            field.suggest_options,
+            getattr(field, 'relation', None),
+        ]
+
+    @classmethod
+    def load_snapshot(cls, model, fp):
+        """
+        Reads introspection results written by dump_snapshot() from given
+        file object, and shares them with all instances of the schema for
+        given model, like warm_up() does. Returns the schema instance.
+
+        Snapshots aren't updated when models change, they should be made
+        again on every deployment.
+        """
+        schema = cls(model)
+        snapshot = json.load(fp)
+        if snapshot.get('key') != schema._snapshot_key():
+            raise DjangoQLSchemaError(
+                'Snapshot was made for a different schema or model',
+            )
+        registry = model._meta.apps
+        models_by_label = {}
+        classes = {}
+
+        def get_model(label):
+            if label not in models_by_label:
+                models_by_label[label] = registry.get_model(label)
+            return models_by_label[label]
+
+        result = OrderedDict()
+        for model_label, fields in snapshot['models'].items():
+            result[model_label] = model_fields = OrderedDict()
+            for name, path, label, nullable, suggest, relation in fields:
+                kwargs = {
+                    'model': get_model(label) if label else None,
+                    'name': name,
+                    'nullable': nullable,
+                    'suggest_options': suggest,
+                }
+                if relation is not None:
+                    kwargs['related_model'] = get_model(relation)
+                if path not in classes:
+                    classes[path] = import_string(path)
+                model_fields[name] = classes[path](**kwargs)
+        schema._models = result
+        if schema.cache_introspection:
+            _introspection_cache[schema.introspection_key()] = result
+        return schema
+
     @classmethod
     def model_label(self, model):
         return text_type(model._meta)
@@ -353,34 +1098,70 @@ class DjangoQLSchema(object):
         """
         Start with given model and recursively walk through its relationships.
 
-        Returns a dict with all model labels and their fields found.
+        Returns an ordered dict with all model labels and their fields found,
+        in breadth-first order.
         """
-        result = {}
-        open_set = deque([model])
+        result = OrderedDict()
+        open_set = deque([(model, 0)])
         closed_set = set(exclude)
 
         while open_set:
-            model = open_set.popleft()
+            model, depth = open_set.popleft()
             model_label = self.model_label(model)
 
             if model_label in closed_set:
                 continue
 
-            model_fields = OrderedDict()
-            for field in self.get_fields(model):
-                if not isinstance(field, DjangoQLField):
-                    field = self.get_field_instance(model, field)
-                if not field:
-                    continue
+            model_fields = self.introspect_model(model, depth=depth)
+            for field in model_fields.values():
                 if isinstance(field, RelationField):
-                    open_set.append(field.related_model)
-                model_fields[field.name] = field
+                    open_set.append((field.related_model, depth + 1))
 
             result[model_label] = model_fields
             closed_set.add(model_label)
 
         return result
 
+    def introspect_model(self, model, depth=0):
+        """
+        Returns an ordered dict with fields of given model, which is depth
+        relations away from the current model
+        """
+        allowed = self.include_fields.get(model)
+        follow_relations = self.max_depth is None or depth < self.max_depth
+        relations = 0
+        model_fields = OrderedDict()
+        cls = type(self)
+        if _func(cls.get_fields) is _func(DjangoQLSchema.get_fields) and \
+                _func(cls.get_field_instance) is \
+                _func(DjangoQLSchema.get_field_instance):
+            # Iterate model fields directly instead of looking them up by
+            # their names
+            fields = [(f.name, f) for f in self._get_model_fields(model)]
+        else:
+            fields = [(f, None) for f in self.get_fields(model)]
+        for field, model_field in fields:
+            if not isinstance(field, DjangoQLField):
+                if allowed is not None and field not in allowed:
+                    continue
+                if model_field is None:
+                    field = self.get_field_instance(model, field)
+                else:
+                    field = self._get_field_instance(model, model_field)
+            if not field:
+                continue
+            if allowed is not None and field.name not in allowed:
+                continue
+            if isinstance(field, RelationField):
+                if not follow_relations or (
+                    self.max_relations is not None and
+                    relations >= self.max_relations
+                ):
+                    continue
+                relations += 1
+            model_fields[field.name] = field
+        return model_fields
+
     def get_fields(self, model):
         """
         By default, returns all field names of a given model.
@@ -389,12 +1170,21 @@ class DjangoQLSchema(object):
         plain list of field names from it, like ['id', 'name'], or call
         .super() and exclude unwanted fields from its result.
         """
+        return [f.name for f in self._get_model_fields(model)]
+
+    def _get_model_fields(self, model):
         return sorted(
-            [f.name for f in model._meta.get_fields() if f.name != 'password'],
+            [f for f in model._meta.get_fields() if f.name != 'password'],
+            key=attrgetter('name'),
         )
 
     def get_field_instance(self, model, field_name):
-        field = model._meta.get_field(field_name)
+        return self._get_field_instance(
+            model,
+            model._meta.get_field(field_name),
+        )
+
+    def _get_field_instance(self, model, field):
         field_kwargs = {'model': model, 'name': field.name}
         if field.is_relation:
             if not field.related_model:
@@ -417,26 +1207,25 @@ class DjangoQLSchema(object):
         return field_cls(**field_kwargs)
 
     def get_field_cls(self, field):
-        str_fields = (
-            models.CharField,
-            models.TextField,
-            models.UUIDField,
-            models.BinaryField,
-            models.GenericIPAddressField,
-        )
-        if isinstance(field, str_fields):
-            return StrField
-        elif isinstance(field, (models.AutoField, models.IntegerField)):
-            return IntField
-        elif isinstance(field, (models.BooleanField, models.NullBooleanField)):
-            return BoolField
-        elif isinstance(field, (models.DecimalField, models.FloatField)):
-            return FloatField
-        elif isinstance(field, models.DateTimeField):
-            return DateTimeField
-        elif isinstance(field, models.DateField):
-            return DateField
-        return DjangoQLField
+        """
+        Returns the DjangoQL field class for given model field. It's looked
+        up in field_classes of the schema by the class of the model field
+        and then by its base classes, and cached for each model field class.
+        """
+        key = (self.__class__, type(field))
+        try:
+            return _field_cls_cache[key]
+        except KeyError:
+            pass
+        field_classes = {}
+        for cls in reversed(self.__class__.__mro__):
+            field_classes.update(cls.__dict__.get('field_classes') or {})
+        result = DjangoQLField
+        for cls in type(field).__mro__:
+            if cls in field_classes:
+                result = field_classes[cls]
+                break
+        return _field_cls_cache.setdefault(key, result)
 
     def as_dict(self):
         from .serializers import DjangoQLSchemaSerializer
@@ -446,8 +1235,38 @@ class DjangoQLSchema(object):
         )
         return DjangoQLSchemaSerializer().serialize(self)
 
+    @property
+    def resolved_names(self):
+        """
+        Index of names resolved with resolve_name(), keyed by their parts.
+        Shared by all instances that share introspection results.
+        """
+        if self._resolved_names is None:
+            if self.cache_introspection:
+                self._resolved_names = _resolved_names_cache.setdefault(
+                    self.introspection_key(),
+                    {},
+                )
+            else:
+                self._resolved_names = {}
+        return self._resolved_names
+
     def resolve_name(self, name):
         assert isinstance(name, Name)
+        resolved_names = self.resolved_names
+        try:
+            return resolved_names[name.parts]
+        except KeyError:
+            pass
+        field = self._resolve_name(name)
+        if len(resolved_names) >= self.max_resolved_names:
+            # Names can be arbitrarily long with circular relations, don't
+            # let the index grow indefinitely
+            resolved_names.clear()
+        resolved_names[name.parts] = field
+        return field
+
+    def _resolve_name(self, name):
         model = self.model_label(self.current_model)
         field = None
         for name_part in name.parts:
@@ -466,19 +1285,50 @@ class DjangoQLSchema(object):
 
     def validate(self, node):
         """
-        Validate DjangoQL AST tree vs. current schema
+        Validate DjangoQL AST tree vs. current schema. Returns the result of
+        compile(), which apply_search() reuses to build the filter.
+        """
+        return self.compile(node)
+
+    def compile(self, node):
+        """
+        Validate DjangoQL AST tree vs. current schema and convert values for
+        lookups in a single pass. Returns a dict of CompiledComparison objects
+        keyed by comparison nodes of the tree.
         """
         assert isinstance(node, Node)
-        if isinstance(node.operator, Logical):
-            self.validate(node.left)
-            self.validate(node.right)
-            return
+        compiler = DjangoQLSchemaCompiler(self)
+        compiler.visit(node)
+        return compiler.compiled
+
+    def optimize(self, node):
+        """
+        Rewrite validated DjangoQL AST tree with optimizer_class, if it's set.
+        Returns None if the tree can't match anything.
+        """
+        if self.optimizer_class is None:
+            return node
+        return self.optimizer_class(self).optimize(node)
+
+    def validate_comparison(self, node):
+        """
+        Validate a single comparison vs. current schema, returns
+        a CompiledComparison. Called by compile() for each comparison.
+        """
+        return self.compile_comparison(node)
+
+    def compile_comparison(self, node):
+        """
+        Validate a single comparison vs. current schema and convert its value
+        for lookups, returns a CompiledComparison
+        """
         assert isinstance(node.left, Name)
         assert isinstance(node.operator, Comparison)
         assert isinstance(node.right, (Const, List))
 
         # Check that field and value types are compatible
         field = self.resolve_name(node.left)
+        operator = node.operator.operator
         value = node.right.value
         if field is None:
             if value is not None:
@@ -486,7 +1336,73 @@ class DjangoQLSchema(object):
                     'Related model %s can be compared to None only, but not to '
                     '%s' % (node.left.value, type(value).__name__),
                 )
+            # That must be a reference to a model without specifying a field.
+            # Let's construct an abstract lookup field for it
+            field = DjangoQLField(name=node.left.parts[-1], nullable=True)
+            lookup_value = value
         else:
-            values = value if isinstance(node.right, List) else [value]
-            for v in values:
-                field.validate(v)
+            lookup_value = field.clean(operator, value)
+        return CompiledComparison(
+            field=field,
+            path=list(node.left.parts[:-1]),
+            operator=operator,
+            value=value,
+            lookup_value=lookup_value,
+        )
+
+
+class CompiledComparison(object):
+    """
+    Validated comparison with the field it refers to and its value converted
+    for the lookup
+    """
+    __slots__ = ('field', 'path', 'operator', 'value', 'lookup_value')
+
+    def __init__(self, field, path, operator, value, lookup_value):
+        self.field = field
+        self.path = path
+        self.operator = operator
+        self.value = value
+        self.lookup_value = lookup_value
+
+    def get_lookup(self, path=None):
+        """
+        Returns a Q object for the comparison. Fields with custom get_lookup()
+        get the original value, others get the converted one.
+        """
+        if path is None:
+            path = self.path
+        if _func(type(self.field).get_lookup) in _converted_lookups:
+            return self.field.get_converted_lookup(
+                path,
+                self.operator,
+                self.lookup_value,
+            )
+        return self.field.get_lookup(path, self.operator, self.value)
+
+
+# validate() implementations that accept any value of allowed types
+_type_validators = (
+    _func(DjangoQLField.validate),
+    _func(IntField.validate),
+)
+
+# get_lookup() implementations that are equivalent to get_converted_lookup()
+# with the value converted by clean()
+_converted_lookups = (
+    _func(DjangoQLField.get_lookup),
+    _func(DateTimeField.get_lookup),
+)
+
+
+class DjangoQLSchemaCompiler(NodeVisitor):
+    def __init__(self, schema):
+        self.schema = schema
+        self.compiled = {}
+
+    def visit_comparison(self, node):
+        # Repeated comparisons are validated once. Constants of different
+        # types never compare equal, so "id = 1" doesn't let "id = True"
+        # through
+        if node not in self.compiled:
+            self.compiled[node] = self.schema.validate_comparison(node)
@@ -1,53 +1,179 @@
+import base64
+import hashlib
 import json
+import time
 
-from django.core.paginator import EmptyPage, Paginator
+from django.core.cache import caches
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_delete, post_save
 from django.http import HttpResponse
 from django.views.generic.base import View
 
+from .cache import LRUCache
+from .compat import text_type
+from .schema import DjangoQLField, StrField, _func
+
 
 class SuggestionsAPIView(View):
+    """
+    Returns suggestions for a field, items_per_page at a time.
+
+    Pages are requested either by their numbers, with the "page" parameter,
+    or with the "cursor" parameter, which is returned with each page that
+    has a next one. Neither of them counts all suggestions. Suggestions
+    returned by StrField are paginated by cursors with keyset pagination,
+    i.e. with a condition on the last value of the previous page instead of
+    an OFFSET, so their pages are equally fast no matter how far they are.
+    None values are never returned after a cursor.
+    """
     http_method_names = ['get']
     schema = None
     items_per_page = 100
+    # Optional DjangoQLSuggestionsCache instance
+    cache = None
 
     def get(self, request, *args, **kwargs):
-        search = request.GET.get('search', '')
-
         try:
-            field_name = request.GET.get('field', '')
-            field = self.get_field(field_name)
-            page_number = int(request.GET.get('page', 1))
-            if page_number < 1:
-                raise ValueError('page must be an integer starting from 1')
-            suggestions = self.get_suggestions(field=field, search=search)
+            params = self.get_params(request)
+            items, next_cursor = self.get_items(**params)
         except ValueError as e:
-            error = str(e) or e.__class__.__name__
-            return HttpResponse(
-                content=json.dumps({'error': error}, indent=2),
-                content_type='application/json; charset=utf-8',
-                status=400,
+            return self.error_response(e)
+        return self.page_response(params['page_number'], items, next_cursor)
+
+    def get_params(self, request):
+        """
+        Returns arguments of get_items() from request parameters, raises
+        ValueError if they are invalid
+        """
+        field = self.get_field(request.GET.get('field', ''))
+        page_number = int(request.GET.get('page', 1))
+        if page_number < 1:
+            raise ValueError('page must be an integer starting from 1')
+        cursor = request.GET.get('cursor') or None
+        page_key = (page_number, cursor, self.items_per_page)
+        if cursor:
+            cursor = self.decode_cursor(cursor)
+        return {
+            'field': field,
+            'search': request.GET.get('search', ''),
+            'page_number': page_number,
+            'cursor': cursor,
+            'page_key': page_key,
+        }
+
+    def get_items(self, field, search, page_number, cursor, page_key):
+        """
+        Returns items of the requested page and the cursor of the next page,
+        from the cache if there's one
+        """
+        def build():
+            suggestions = self.get_suggestions(field=field, search=search)
+            return self.get_page(
+                suggestions,
+                offset=(page_number - 1) * self.items_per_page,
+                cursor=cursor,
             )
 
-        paginator = Paginator(suggestions, self.items_per_page)
-        try:
-            page = paginator.page(page_number)
-        except EmptyPage:
-            items = []
-            has_next = False
-        else:
-            items = list(page.object_list)
-            has_next = page.has_next()
+        if self.cache is None:
+            return build()
+        return self.cache.get_page(
+            self.schema,
+            field,
+            search,
+            page_key,
+            build,
+        )
 
+    def error_response(self, exception):
+        error = str(exception) or exception.__class__.__name__
+        return HttpResponse(
+            content=json.dumps({'error': error}, indent=2),
+            content_type='application/json; charset=utf-8',
+            status=400,
+        )
+
+    def page_response(self, page_number, items, next_cursor):
         response = {
             'items': items,
             'page': page_number,
-            'has_next': has_next,
+            'has_next': next_cursor is not None,
         }
+        if next_cursor is not None:
+            response['cursor'] = self.encode_cursor(next_cursor)
         return HttpResponse(
             content=json.dumps(response, indent=2),
             content_type='application/json; charset=utf-8',
         )
 
+    def get_page(self, suggestions, offset, cursor=None):
+        """
+        Returns items of the page that starts at given offset or cursor, and
+        the cursor of the next page, or None if there's no next page.
+        Fetches one item more than a page holds to find out if there's a next
+        page, instead of counting suggestions.
+        """
+        if cursor is not None:
+            if 'after' in cursor:
+                key = self.get_keyset_key(suggestions)
+                if key is None:
+                    raise ValueError('Invalid cursor')
+                suggestions = suggestions.filter(**{key: cursor['after']})
+                offset = 0
+            else:
+                offset = cursor.get('offset')
+                if not isinstance(offset, int) or offset < 0:
+                    raise ValueError('Invalid cursor')
+        items = list(suggestions[offset:offset + self.items_per_page + 1])
+        if len(items) <= self.items_per_page:
+            return items, None
+        items = items[:self.items_per_page]
+        last = items[-1]
+        if isinstance(last, (text_type, int)) and \
+                not isinstance(last, bool) and \
+                self.get_keyset_key(suggestions) is not None:
+            return items, {'after': last}
+        return items, {'offset': offset + self.items_per_page}
+
+    def get_keyset_key(self, suggestions):
+        """
+        Returns the lookup that selects suggestions after a given one, if
+        suggestions are a flat list of values of a field ordered by this
+        field, like StrField.get_options() returns, otherwise None
+        """
+        if not isinstance(suggestions, QuerySet):
+            return None
+        order_by = suggestions.query.order_by
+        if len(order_by) != 1:
+            return None
+        name = order_by[0]
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if getattr(suggestions, '_fields', None) != (name,) or \
+                not self.is_flat(suggestions):
+            return None
+        return '%s__%s' % (name, 'lt' if descending else 'gt')
+
+    def is_flat(self, suggestions):
+        try:
+            from django.db.models.query import FlatValuesListIterable
+        except ImportError:  # Django < 2.0
+            return getattr(suggestions, 'flat', False)
+        return suggestions._iterable_class is FlatValuesListIterable
+
+    def encode_cursor(self, cursor):
+        content = json.dumps(cursor, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(content).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        try:
+            content = base64.urlsafe_b64decode(cursor.encode('ascii'))
+            result = json.loads(content.decode('utf-8'))
+        except (TypeError, ValueError, UnicodeError):
+            raise ValueError('Invalid cursor')
+        if not isinstance(result, dict):
+            raise ValueError('Invalid cursor')
+        return result
+
     def get_field(self, field_name):
         if not self.schema:
             raise ValueError('DjangoQL schema is undefined')
@@ -78,3 +204,210 @@ class SuggestionsAPIView(View):
                 field.name,
             ))
         return field.get_options(search)
+
+
+class DjangoQLSuggestionsCache(object):
+    """
+    Cache of pages returned by SuggestionsAPIView.
+
+    Pages are stored for timeout seconds, either in a Django cache with
+    given alias, which can be shared by processes, or in an in-process LRU
+    cache with at most maxsize pages if backend is None. Entries are keyed by
+    schema class, field, search and page. Caching is opt-in, set an instance
+    of this class as cache on SuggestionsAPIView or as
+    djangoql_suggestions_cache on DjangoQLSearchMixin.
+
+    If the first page of suggestions for a search has all of them, pages for
+    longer searches that start with it are filtered from this page, without
+    queries. That's done only for fields with default get_options(), and
+    only if the search and the suggestions on the page are ASCII, since
+    database backends fold the case of other characters differently.
+
+    Entries of a model are dropped when its instances are saved or deleted,
+    unless watch_models is False. Only models that this process has cached
+    suggestions for are watched, plus models given in watch_models, if it's
+    a list. Saves of other models cost a set lookup. Saves of watched models
+    cost a version update: a dict update in memory, or an incr() call, and
+    add() and get() if the version has expired, with a Django cache. With a
+    cache shared by processes, pass the models to watch_models, so that
+    processes that haven't cached their suggestions drop them too. Bulk
+    updates and deletes don't send these signals, call invalidate() after
+    them or rely on timeout.
+    """
+    key_prefix = 'djangoql-suggestions'
+
+    def __init__(self, backend=None, timeout=60, maxsize=1000,
+                 prefix_reuse=True, watch_models=True):
+        self.backend = backend
+        self.timeout = timeout
+        self.prefix_reuse = prefix_reuse
+        if backend is None:
+            self._pages = LRUCache(maxsize=maxsize)
+            self._versions = {}
+        self.watch_models = bool(watch_models)
+        self._watched = set()
+        if watch_models:
+            if watch_models is not True:
+                self._watched.update(
+                    text_type(model._meta) for model in watch_models
+                )
+            post_save.connect(self.model_changed)
+            post_delete.connect(self.model_changed)
+
+    def model_changed(self, sender, **kwargs):
+        if text_type(sender._meta) in self._watched:
+            self.invalidate(sender)
+
+    def invalidate(self, model=None):
+        """
+        Drop entries of given model, or all entries
+        """
+        label = text_type(model._meta) if model is not None else '*'
+        key = self.version_key(label)
+        if self.backend is None:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            return
+        cache = caches[self.backend]
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set yet or expired
+            self.init_version(cache, key)
+
+    def version_key(self, label):
+        return '%s:version:%s' % (self.key_prefix, label)
+
+    def init_version(self, cache, key):
+        # Versions start with the current time, so that entries cached
+        # before a version was evicted are not served again
+        cache.add(key, int(time.time() * 1000000), None)
+        return cache.get(key)
+
+    def versions(self, model):
+        keys = [self.version_key('*'), self.version_key(text_type(model._meta))]
+        if self.backend is None:
+            return tuple(self._versions.get(key, 0) for key in keys)
+        cache = caches[self.backend]
+        found = cache.get_many(keys)
+        return tuple(
+            found[key] if key in found else self.init_version(cache, key)
+            for key in keys
+        )
+
+    def key(self, versions, schema, field, search, page_key):
+        content = json.dumps([
+            versions,
+            '%s.%s' % (schema.__class__.__module__, schema.__class__.__name__),
+            text_type(field.model._meta) if field.model else None,
+            field.name,
+            search,
+            page_key,
+        ])
+        return '%s:%s' % (
+            self.key_prefix,
+            hashlib.sha1(content.encode('utf-8')).hexdigest(),
+        )
+
+    def get_many(self, keys):
+        if self.backend is not None:
+            return caches[self.backend].get_many(keys)
+        result = {}
+        now = time.time()
+        for key in keys:
+            entry = self._pages.get(key)
+            if entry is not None and entry[0] > now:
+                result[key] = entry[1]
+        return result
+
+    def set(self, key, value):
+        if self.backend is not None:
+            caches[self.backend].set(key, value, self.timeout)
+        else:
+            self._pages.set(key, (time.time() + self.timeout, value))
+
+    def get_matcher(self, field):
+        """
+        Returns a function that checks if a suggestion for the field matches
+        a search, to filter suggestions for a shorter search with it. Returns
+        None if get_options() of the field can't be emulated like that: only
+        default ones that find values containing or starting with the search,
+        ignoring case, can be.
+        """
+        get_options = _func(type(field).get_options)
+        if get_options is _func(DjangoQLField.get_options):
+            return _contains
+        if get_options is _func(StrField.get_options):
+            if field._field_choices() or field.options_lookup == 'icontains':
+                return _contains
+            if field.options_lookup == 'istartswith':
+                return _startswith
+        return None
+
+    def get_page(self, schema, field, search, page_key, build):
+        """
+        Returns a cached page of suggestions, or builds it with given function
+        and caches it. page_key is a tuple of page number, cursor and page
+        size.
+        """
+        if not field.model:
+            return build()
+        if self.watch_models:
+            self._watched.add(text_type(field.model._meta))
+        # Versions are read before the page is built, so that it's not cached
+        # with versions of changes that it may not reflect
+        versions = self.versions(field.model)
+        keys = [self.key(versions, schema, field, search, page_key)]
+        page_number, cursor, items_per_page = page_key
+        matcher = None
+        # Only ASCII letters are folded the same way by Python and by every
+        # database backend, so non-ASCII searches are always queried
+        if self.prefix_reuse and page_number == 1 and not cursor and \
+                _is_ascii(search):
+            matcher = self.get_matcher(field)
+        if matcher is not None:
+            # First pages of shorter searches, the longest first
+            keys.extend(
+                self.key(versions, schema, field, search[:i], page_key)
+                for i in range(len(search) - 1, -1, -1)
+            )
+        found = self.get_many(keys)
+        if keys[0] in found:
+            return found[keys[0]][:2]
+        lowered = search.lower()
+        for key in keys[1:]:
+            entry = found.get(key)
+            if entry is not None and entry[2]:
+                values = [
+                    text_type(item) if item is not None else None
+                    for item in entry[0]
+                ]
+                if not all(v is None or _is_ascii(v) for v in values):
+                    # Shorter searches have these values too
+                    break
+                items = [
+                    item for item, value in zip(entry[0], values)
+                    if value is not None and matcher(value, lowered)
+                ]
+                return items, None
+
+        items, next_cursor = build()
+        # Pages that have all suggestions can be filtered for longer searches
+        complete = page_number == 1 and not cursor and next_cursor is None
+        self.set(keys[0], (items, next_cursor, complete))
+        return items, next_cursor
+
+
+def _is_ascii(value):
+    try:
+        value.encode('ascii')
+    except UnicodeError:
+        return False
+    return True
+
+
+def _contains(value, search):
+    return search in value.lower()
+
+
+def _startswith(value, search):
+    return value.lower().startswith(search)
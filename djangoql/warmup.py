@@ -0,0 +1,71 @@
+import time
+
+from django.apps import apps
+from django.contrib import admin
+
+from .admin import DjangoQLSearchMixin
+from .parser import get_parser
+from .queryset import DjangoQLQuerySet
+from .schema import DjangoQLSchema
+
+
+try:
+    from django.contrib.admin.sites import all_sites
+except ImportError:  # Django < 2.1
+    all_sites = [admin.site]
+
+
+def get_targets():
+    """
+    Returns (name, function) pairs for everything that can be prepared in
+    advance: the parser, model admins that use DjangoQLSearchMixin and models
+    with DjangoQLQuerySet managers. Calling a function warms up the target.
+    """
+    targets = [('parser', get_parser)]
+    seen = set()
+    for site in sorted(all_sites, key=lambda s: s.name):
+        for model, model_admin in site._registry.items():
+            if isinstance(model_admin, DjangoQLSearchMixin):
+                targets.append((
+                    'admin (%s): %s' % (
+                        site.name,
+                        DjangoQLSchema.model_label(model),
+                    ),
+                    model_admin.djangoql_warm_up,
+                ))
+                seen.add((model_admin.djangoql_schema, model))
+    for model in apps.get_models():
+        for manager in model._meta.managers:
+            if isinstance(manager, tuple):
+                # Django < 1.10: (creation counter, manager, abstract)
+                manager = manager[1]
+            queryset_class = getattr(manager, '_queryset_class', None)
+            if not queryset_class or \
+                    not issubclass(queryset_class, DjangoQLQuerySet):
+                continue
+            schema = queryset_class.djangoql_schema or DjangoQLSchema
+            if (schema, model) in seen:
+                continue
+            seen.add((schema, model))
+            targets.append((
+                'queryset: %s' % DjangoQLSchema.model_label(model),
+                _warm_up_schema(schema, model),
+            ))
+    return targets
+
+
+def _warm_up_schema(schema, model):
+    return lambda: schema.warm_up(model)
+
+
+def warm_up(callback=None):
+    """
+    Warms up all targets returned by get_targets(). If callback is given,
+    it's called with the name of each target and the time it took, in
+    seconds.
+    """
+    for name, func in get_targets():
+        start = time.time()
+        func()
+        if callback is not None:
+            callback(name, time.time() - start)
@@ -5,7 +5,11 @@ from setuptools import setup
 import djangoql
 
 
-packages = ['djangoql']
+packages = [
+    'djangoql',
+    'djangoql.management',
+    'djangoql.management.commands',
+]
 requires = ['ply>=3.8']
 
 setup(
@@ -1,8 +1,14 @@
 import json
 
+from django.contrib import admin
 from django.contrib.auth.models import User
 from django.test import TestCase
 
+from djangoql.admin import DjangoQLSearchMixin
+from djangoql.schema import DjangoQLSchema, StrField
+
+from ..models import Book
+
 
 try:
     from django.core.urlresolvers import reverse
@@ -45,6 +51,58 @@ class DjangoQLAdminTest(TestCase):
                 introspections['suggestions_api_url'],
             )
 
+    def test_introspection_etag(self):
+        self.assertTrue(self.client.login(**self.credentials))
+        url = reverse('admin:core_book_djangoql_introspect')
+        response = self.client.get(url)
+        self.assertEqual(200, response.status_code)
+        etag = response['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertFalse(response.content)
+        other = self.client.get(
+            reverse('admin:auth_user_djangoql_introspect'),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+        self.assertEqual(200, other.status_code)
+        self.assertNotEqual(etag, other['ETag'])
+
+    def test_introspection_options(self):
+        for suggest_options in (True, False):
+            self.check_introspection_options(suggest_options)
+            User.objects.filter(username='other').delete()
+
+    def check_introspection_options(self, suggest_options):
+        class BookAuthorsField(StrField):
+            model = Book
+            name = 'authors'
+            async_options = False
+
+            def get_options(self, search):
+                return list(User.objects.values_list('username', flat=True))
+
+        class AuthorsSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                fields = super(AuthorsSchema, self).get_fields(model)
+                if model == Book:
+                    fields += [
+                        BookAuthorsField(suggest_options=suggest_options),
+                    ]
+                return fields
+
+        class AuthorsAdmin(DjangoQLSearchMixin, admin.ModelAdmin):
+            djangoql_schema = AuthorsSchema
+
+        model_admin = AuthorsAdmin(Book, admin.site)
+        schema = AuthorsSchema(Book)
+        etag, content = model_admin.djangoql_introspection(schema, '/')
+        self.assertIn('"test"', content)
+        User.objects.create(username='other')
+        # Options are serialized again, and the ETag changes with them
+        other_etag, content = model_admin.djangoql_introspection(schema, '/')
+        self.assertIn('"other"', content)
+        self.assertNotEqual(etag, other_etag)
+
     def test_djangoql_syntax_help(self):
         url = reverse('admin:djangoql_syntax_help')
         # unauthorized request should be redirected
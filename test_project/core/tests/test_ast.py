@@ -1,6 +1,20 @@
+import copy
+import pickle
+from array import array
+from decimal import Decimal
 from unittest import TestCase
 
-from djangoql.ast import Comparison, Const, Expression, Name
+from djangoql.ast import Comparison, Const, Expression, List, Logical, Name, \
+    NodeVisitor, operands
+from djangoql.parser import get_parser
+
+
+try:
+    array('q')
+    int_list_type = array
+except ValueError:
+    # Arrays of 64-bit integers aren't available in Python 2
+    int_list_type = tuple
 
 
 class DjangoQLASTTest(TestCase):
@@ -13,3 +27,124 @@ class DjangoQLASTTest(TestCase):
             Expression(Name('age'), Comparison('='), Const(42)),
             Expression(Name('age'), Comparison('='), Const(18)),
         )
+
+    def test_list(self):
+        ints = List([Const(1), Const(2), Const(3)])
+        self.assertIsInstance(ints.values, int_list_type)
+        self.assertEqual([1, 2, 3], ints.value)
+        self.assertEqual([Const(1), Const(2), Const(3)], ints.items)
+        self.assertEqual(ints, List.from_values([1, 2, 3]))
+        self.assertNotEqual(ints, List.from_values([Decimal(1), 2, 3]))
+        self.assertNotEqual(ints, List.from_values([True, 2, 3]))
+        self.assertNotEqual(ints, List.from_values([1, 2]))
+        mixed = List.from_values([1, 'a', None, 2 ** 70])
+        self.assertEqual((1, 'a', None, 2 ** 70), mixed.values)
+        self.assertEqual([1, 'a', None, 2 ** 70], mixed.value)
+
+    def test_value_types(self):
+        # Python considers these values equal, but they aren't the same
+        # constants for validation and lookups
+        self.assertNotEqual(Const(1), Const(True))
+        self.assertNotEqual(Const(1), Const(1.0))
+        self.assertNotEqual(Const(1), Const(Decimal(1)))
+        self.assertEqual(1, len({Const(1), Const(1)}))
+        # Native strings are the same as text in Python 2
+        self.assertEqual(Const(str('a')), Const(u'a'))
+        self.assertEqual(3, len({Const(1), Const(True), Const(1.0)}))
+
+    def test_hash(self):
+        expr = Expression(Name(['book', 'name']), Comparison('='), Const('x'))
+        same = Expression(Name(['book', 'name']), Comparison('='), Const('x'))
+        self.assertEqual(hash(expr), hash(same))
+        self.assertEqual({expr: 1}[same], 1)
+        self.assertEqual(
+            hash(List.from_values([1, 2])),
+            hash(List.from_values([1, 2])),
+        )
+
+    def test_immutable(self):
+        expr = Expression(Name('age'), Comparison('='), Const(18))
+        with self.assertRaises(AttributeError):
+            expr.right = Const(42)
+        with self.assertRaises(AttributeError):
+            expr.extra = 1
+        with self.assertRaises(AttributeError):
+            del expr.left
+
+    def test_interning(self):
+        self.assertIs(Name(['book', 'name']), Name(['book', 'name']))
+        self.assertEqual(('book', 'name'), Name(['book', 'name']).parts)
+        self.assertEqual('age', Name('age').value)
+        self.assertIs(Comparison('='), Comparison('='))
+        self.assertIsNot(Comparison('and'), Logical('and'))
+
+    def test_copy(self):
+        expr = Expression(
+            Name(['book', 'id']),
+            Comparison('in'),
+            List.from_values([1, 2, 3]),
+        )
+        self.assertEqual(expr, copy.deepcopy(expr))
+        restored = pickle.loads(pickle.dumps(expr))
+        self.assertEqual(expr, restored)
+        self.assertIs(expr.left, restored.left)
+        self.assertIs(expr.operator, restored.operator)
+
+    def test_long_chain(self):
+        def chain():
+            expr = Expression(Name('id'), Comparison('='), Const(0))
+            for i in range(1, 10000):
+                expr = Expression(
+                    Expression(Name('id'), Comparison('='), Const(i)),
+                    Logical('or'),
+                    expr,
+                )
+            return expr
+        self.assertEqual(chain(), chain())
+
+    def test_operands(self):
+        a, b, c, d = [
+            Expression(Name('id'), Comparison('='), Const(i))
+            for i in range(4)
+        ]
+        expr = Expression(
+            Expression(a, Logical('or'), b),
+            Logical('or'),
+            Expression(c, Logical('or'), Expression(d, Logical('and'), a)),
+        )
+        self.assertEqual(
+            [a, b, c, Expression(d, Logical('and'), a)],
+            operands(expr),
+        )
+        self.assertEqual([d, a], operands(expr.right.right))
+
+
+class PrintVisitor(NodeVisitor):
+    def visit_comparison(self, node):
+        return '%s %s %s' % (
+            node.left.value, node.operator.operator, node.right.value,
+        )
+
+    def visit_logical(self, node, operator, results):
+        return '(%s)' % (' %s ' % operator.operator).join(results)
+
+
+class NodeVisitorTest(TestCase):
+    def test_visit(self):
+        ast = get_parser().parse('a = 1 or (b = 2 or c = 3 and d = 4)')
+        self.assertEqual(
+            '(a = 1 or b = 2 or (c = 3 and d = 4))',
+            PrintVisitor().visit(ast),
+        )
+        self.assertEqual('a = 1', PrintVisitor().visit(ast.left))
+
+    def test_long_chains(self):
+        for sep in (' or ', ' and '):
+            query = sep.join('id = %s' % i for i in range(10000))
+            result = PrintVisitor().visit(get_parser().parse(query))
+            self.assertEqual('(%s)' % query, result)
+        query = ' and '.join(
+            '(id = %s or id = %s)' % (i, i + 1) for i in range(10000)
+        )
+        result = PrintVisitor().visit(get_parser().parse(query))
+        self.assertEqual('(%s)' % query, result)
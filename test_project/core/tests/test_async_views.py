@@ -0,0 +1,186 @@
+import json
+import time
+import unittest
+
+from django.contrib import admin
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import RequestFactory, TestCase
+
+from djangoql.schema import DjangoQLSchema, StrField
+
+from ..models import Book
+from .test_views import SuggestionsSchema
+
+
+try:
+    import asyncio
+
+    from asgiref.sync import async_to_sync
+
+    from djangoql.async_views import AsyncDjangoQLSearchMixin, \
+        AsyncSuggestionsAPIView, run_cancellable
+except (ImportError, ImproperlyConfigured, SyntaxError):
+    # Python 2 or Django < 4.1
+    async_to_sync = None
+
+
+requires_async = unittest.skipIf(
+    async_to_sync is None,
+    'Async views require Python 3 and Django 4.1+',
+)
+
+
+class AsyncNameField(StrField):
+    model = Book
+    name = 'name'
+    suggest_options = True
+
+    def aget_options(self, search):
+        return asyncio.sleep(0, result=['async %s' % search])
+
+
+class AsyncOptionsSchema(DjangoQLSchema):
+    def get_fields(self, model):
+        if model == Book:
+            return [AsyncNameField()]
+        return super(AsyncOptionsSchema, self).get_fields(model)
+
+
+class InlineNameField(StrField):
+    model = Book
+    name = 'name'
+    suggest_options = True
+    async_options = False
+
+    def get_options(self, search):
+        return list(super(InlineNameField, self).get_options(search))
+
+
+class InlineOptionsSchema(DjangoQLSchema):
+    def get_fields(self, model):
+        if model == Book:
+            return [InlineNameField()]
+        return super(InlineOptionsSchema, self).get_fields(model)
+
+
+@requires_async
+class AsyncSuggestionsAPIViewTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='test')
+        for name in ('c', 'a', 'b'):
+            Book.objects.create(name=name, author=user)
+
+    def get_json(self, schema, status=200, **params):
+        view = AsyncSuggestionsAPIView.as_view(
+            schema=schema(Book),
+            items_per_page=2,
+        )
+        response = async_to_sync(view)(RequestFactory().get('/', params))
+        self.assertEqual(status, response.status_code)
+        return json.loads(response.content.decode('utf8'))
+
+    def test_pages(self):
+        r = self.get_json(SuggestionsSchema, field='name')
+        self.assertEqual(['a', 'b'], r['items'])
+        r = self.get_json(SuggestionsSchema, field='name', cursor=r['cursor'])
+        self.assertEqual(['c'], r['items'])
+        self.assertFalse(r['has_next'])
+        r = self.get_json(SuggestionsSchema, status=400, field='written')
+        self.assertIn("doesn't support suggestions", r['error'])
+
+    def test_aget_options(self):
+        r = self.get_json(AsyncOptionsSchema, field='name', search='x')
+        self.assertEqual(['async x'], r['items'])
+        field = StrField(model=Book, name='name')
+        options = async_to_sync(asyncio.wait_for)(field.aget_options('a'), 5)
+        # Evaluated in the thread
+        self.assertEqual(['a'], options)
+        options = async_to_sync(asyncio.wait_for)(
+            field.aget_options('', limit=1),
+            5,
+        )
+        self.assertEqual(1, len(options))
+
+
+@requires_async
+class RunCancellableTest(TestCase):
+    def test_cancel(self):
+        def query():
+            with connection.cursor() as cursor:
+                # Takes minutes unless it's interrupted
+                cursor.execute(
+                    'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL '
+                    'SELECT x + 1 FROM c WHERE x < 1000000000) '
+                    'SELECT count(*) FROM c',
+                )
+
+        loop = asyncio.new_event_loop()
+        try:
+            task = loop.create_task(run_cancellable(query))
+            loop.call_later(0.2, task.cancel)
+            start = time.time()
+            with self.assertRaises(asyncio.CancelledError):
+                loop.run_until_complete(task)
+        finally:
+            loop.close()
+        self.assertLess(time.time() - start, 5)
+
+
+@requires_async
+class AsyncDjangoQLSearchMixinTest(TestCase):
+    def setUp(self):
+        class AsyncBookAdmin(AsyncDjangoQLSearchMixin, admin.ModelAdmin):
+            djangoql_schema = SuggestionsSchema
+
+        self.model_admin = AsyncBookAdmin(Book, admin.site)
+        self.user = User.objects.create_superuser(
+            username='test',
+            email='test@example.com',
+            password='test',
+        )
+        Book.objects.create(name='a', author=self.user)
+
+    def get(self, view, user, **params):
+        request = RequestFactory().get('/', params)
+        request.user = user
+        view = self.model_admin.djangoql_admin_view(view)
+        return async_to_sync(view)(request)
+
+    def test_suggestions(self):
+        response = self.get(
+            self.model_admin.suggestions,
+            self.user,
+            field='name',
+        )
+        self.assertEqual(200, response.status_code)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(
+            ['a'],
+            json.loads(response.content.decode('utf8'))['items'],
+        )
+        response = self.get(
+            self.model_admin.suggestions,
+            AnonymousUser(),
+            field='name',
+        )
+        self.assertEqual(302, response.status_code)
+
+    def test_introspect(self):
+        response = self.get(self.model_admin.introspect, self.user)
+        self.assertEqual(200, response.status_code)
+        self.assertIn('ETag', response)
+        introspection = json.loads(response.content.decode('utf8'))
+        self.assertEqual('core.book', introspection['current_model'])
+
+    def test_introspect_options(self):
+        # Options that are serialized with the schema are queried in a
+        # thread
+        self.model_admin.djangoql_schema = InlineOptionsSchema
+        response = self.get(self.model_admin.introspect, self.user)
+        introspection = json.loads(response.content.decode('utf8'))
+        self.assertEqual(
+            ['a'],
+            introspection['models']['core.book']['name']['options'],
+        )
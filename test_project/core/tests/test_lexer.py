@@ -1,7 +1,7 @@
 from unittest import TestCase
 
 from djangoql.exceptions import DjangoQLLexerError
-from djangoql.lexer import DjangoQLLexer
+from djangoql.lexer import DjangoQLFastLexer, DjangoQLLexer
 
 
 class DjangoQLLexerTest(TestCase):
@@ -93,3 +93,43 @@ class DjangoQLLexerTest(TestCase):
         for i, t in enumerate(self.lexer.input('1\n  3\n    5\n')):
             self.assertEqual(i + 1, t.lineno)
             self.assertEqual(i * 2 + 1, self.lexer.find_column(t))
+
+    def test_independent_state(self):
+        lexer1, lexer2 = type(self.lexer)(), type(self.lexer)()
+        lexer1.input('a = 1')
+        lexer2.input('b\n  ^')
+        self.assertEqual('NAME', lexer1.token().type)
+        try:
+            list(lexer2)
+            self.fail('Illegal char exception not raised')
+        except DjangoQLLexerError as e:
+            self.assertEqual(2, e.line)
+            self.assertEqual(3, e.column)
+        self.assertEqual('EQUALS', lexer1.token().type)
+
+
+class DjangoQLFastLexerTest(DjangoQLLexerTest):
+    lexer = DjangoQLFastLexer()
+
+    def test_same_tokens(self):
+        reference = DjangoQLLexer()
+        samples = (
+            'a = 1 and b.c in (1, -2.5e3, "x\\"y") or True_x != None',
+            'x\n\r  y ~ "z" !~ 0123 not startswith endswith',
+            'in.x',
+            'a =\n ^',
+        )
+        for s in samples:
+            expected = []
+            try:
+                for t in reference.input(s):
+                    expected.append((t.type, t.value, t.lineno, t.lexpos))
+            except DjangoQLLexerError as e:
+                expected.append((str(e), e.value))
+            actual = []
+            try:
+                for t in self.lexer.input(s):
+                    actual.append((t.type, t.value, t.lineno, t.lexpos))
+            except DjangoQLLexerError as e:
+                actual.append((str(e), e.value))
+            self.assertEqual(expected, actual)
@@ -0,0 +1,145 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from djangoql.optimizer import DjangoQLOptimizer
+from djangoql.parser import get_parser
+from djangoql.schema import DjangoQLSchema
+
+from ..models import Book
+
+
+class OptimizedSchema(DjangoQLSchema):
+    optimizer_class = DjangoQLOptimizer
+
+
+class DjangoQLOptimizerTest(TestCase):
+    def optimize(self, query, model=Book, **kwargs):
+        schema = DjangoQLSchema(model)
+        ast = get_parser().parse(query)
+        schema.validate(ast)
+        return DjangoQLOptimizer(schema, **kwargs).optimize(ast)
+
+    def assertOptimized(self, expected, query, **kwargs):
+        result = self.optimize(query, **kwargs)
+        if expected is None:
+            self.assertIsNone(result)
+        else:
+            self.assertEqual(get_parser().parse(expected), result)
+
+    def test_collapse_equality(self):
+        self.assertOptimized(
+            'id in (1, 2, 3)',
+            'id = 1 or id = 2 or id = 3',
+        )
+        self.assertOptimized(
+            'name in ("a", "b", "c") or id = 1',
+            'name = "a" or id = 1 or name in ("b", "a") or name = "c"',
+        )
+        self.assertOptimized(
+            'author.id in (1, 2) and is_published = True',
+            '(author.id = 1 or author.id = 2) and is_published = True',
+        )
+        self.assertOptimized(
+            'id = 1 or id = 2',
+            'id = 1 or id = 2',
+            collapse_equality=False,
+        )
+
+    def test_not_rewritten(self):
+        samples = [
+            # None means "is null" and can't be put into lists
+            'rating = None or rating = 1',
+            # Fields with choices convert values in their own way
+            'genre = "Drama" or genre = "Comics"',
+            # Fields with custom lookups
+            'written = "2017-01-01" or written = "2018-01-01"',
+            # Different operators
+            'id = 1 or id > 5',
+            'id = 1 and id = 2 or name = "x"',
+        ]
+        for query in samples:
+            self.assertEqual(
+                get_parser().parse(query),
+                self.optimize(query),
+                query,
+            )
+
+    def test_merge_duplicates(self):
+        self.assertOptimized(
+            'name ~ "a" and id > 1',
+            'name ~ "a" and id > 1 and name ~ "a"',
+        )
+        self.assertOptimized(
+            'rating = None',
+            'rating = None or (rating = None)',
+        )
+        self.assertOptimized(
+            'id > 1 and id > 1',
+            'id > 1 and id > 1',
+            merge_duplicates=False,
+        )
+
+    def test_fold_not_in(self):
+        self.assertOptimized(
+            'id not in (1, 2, 3) and name != "x"',
+            'id != 1 and name != "x" and id not in (2, 3)',
+        )
+        self.assertOptimized(
+            'id != 1 or id != 2',
+            'id != 1 or id != 2',
+        )
+        self.assertOptimized(
+            'id != 1 and id != 2',
+            'id != 1 and id != 2',
+            fold_not_in=False,
+        )
+
+    def test_drop_contradictions(self):
+        self.assertOptimized(None, 'id = 1 and id = 2')
+        self.assertOptimized(None, 'id in (1, 2) and name ~ "a" and id = 3')
+        self.assertOptimized(None, 'is_published = True and id = 1 and '
+                                   'is_published = False')
+        self.assertOptimized('id = 2', '(id = 1 and id = 2) or id = 2')
+        self.assertOptimized(None, 'id = 1 and id = 2 or id = 2')
+        self.assertOptimized(
+            'id in (1, 2) and id = 2',
+            'id in (1, 2) and id = 2',
+        )
+        # String comparisons may be case-insensitive
+        self.assertOptimized(
+            'name = "a" and name = "A"',
+            'name = "a" and name = "A"',
+        )
+        self.assertOptimized(
+            'id = 1 and id = 2',
+            'id = 1 and id = 2',
+            drop_contradictions=False,
+        )
+
+    def test_queryset(self):
+        user = User.objects.create(username='u')
+        for name in ('a', 'b', 'c'):
+            Book.objects.create(name=name, author=user)
+        qs = Book.objects.djangoql(
+            'name = "a" or name = "b" or name = "x"',
+            schema=OptimizedSchema,
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        # Older Django versions don't keep the order of IN values
+        column, values = where_clause.rstrip(')').split(' IN (')
+        self.assertEqual('"core_book"."name"', column)
+        self.assertEqual(['a', 'b', 'x'], sorted(values.split(', ')))
+        self.assertEqual(['a', 'b'], sorted(qs.values_list('name', flat=True)))
+
+        qs = Book.objects.djangoql(
+            'id = 1 and id = 2',
+            schema=OptimizedSchema,
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual([], list(qs))
+
+    def test_long_chain(self):
+        query = ' or '.join('id = %s' % i for i in range(10000))
+        result = self.optimize(query)
+        self.assertEqual('in', result.operator.operator)
+        self.assertEqual(list(range(10000)), result.right.value)
@@ -1,10 +1,20 @@
 # -*- coding: utf-8 -*-
+import sys
+import threading
+import types
 import unittest.util
+import warnings
+from decimal import Decimal
 from unittest import TestCase
 
+from django.test import override_settings
+
+import ply.yacc as yacc
+
 from djangoql.ast import Comparison, Const, Expression, List, Logical, Name
-from djangoql.exceptions import DjangoQLParserError
-from djangoql.parser import DjangoQLParser
+from djangoql.exceptions import DjangoQLError, DjangoQLParserError
+from djangoql.lexer import DjangoQLLexer
+from djangoql.parser import DjangoQLParser, get_parser
 
 
 # Show full contents in assertions when comparing long text strings
@@ -85,7 +95,7 @@ class DjangoQLParseTest(TestCase):
             self.parser.parse('pk > 5'),
         )
         self.assertEqual(
-            Expression(Name('rating'), Comparison('<='), Const(523)),
+            Expression(Name('rating'), Comparison('<='), Const(Decimal(523))),
             self.parser.parse('rating <= 5.23e2'),
         )
 
@@ -130,9 +140,167 @@ class DjangoQLParseTest(TestCase):
         for expr in invalid_comparisons:
             self.assertRaises(DjangoQLParserError, self.parser.parse, expr)
 
+    def test_long_list(self):
+        values = list(range(20000))
+        ast = self.parser.parse('id in (%s)' % ', '.join(map(str, values)))
+        self.assertEqual(
+            Expression(Name('id'), Comparison('in'), List.from_values(values)),
+            ast,
+        )
+        self.assertEqual(values, ast.right.value)
+
     def test_entity_props(self):
         self.assertEqual(
             Expression(Name(['user', 'group', 'id']), Comparison('='),
                        Const(5)),
             self.parser.parse('user.group.id = 5'),
         )
+
+
+class NameCollectingParser(DjangoQLParser):
+    def __init__(self, *args, **kwargs):
+        super(NameCollectingParser, self).__init__(*args, **kwargs)
+        self.names = []
+
+    def p_name(self, p):
+        """
+        name : NAME
+        """
+        super(NameCollectingParser, self).p_name(p)
+        self.names.append(p[1])
+
+
+class DjangoQLSharedParserTest(TestCase):
+    def test_parsing_tables_are_shared(self):
+        p1, p2 = DjangoQLParser(), DjangoQLParser()
+        self.assertIsNot(p1.yacc, p2.yacc)
+        self.assertIs(p1.yacc.action, p2.yacc.action)
+        self.assertIsNot(p1.default_lexer, p2.default_lexer)
+        self.assertEqual(
+            p1.parse('a = 1 and b = 2'),
+            p2.parse('a = 1 and b = 2'),
+        )
+
+    def test_instance_state(self):
+        p1, p2 = NameCollectingParser(), NameCollectingParser()
+        p1.parse('a = 1 and b = 2')
+        p2.parse('c = 3')
+        self.assertEqual(['a', 'b'], p1.names)
+        self.assertEqual(['c'], p2.names)
+        with self.assertRaises(DjangoQLParserError):
+            p1.parse('a = ')
+
+    def test_get_parser_per_thread(self):
+        self.assertIs(get_parser(), get_parser())
+        parsers = []
+        thread = threading.Thread(target=lambda: parsers.append(get_parser()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(get_parser(), parsers[0])
+
+
+class NoTablesParser(DjangoQLParser):
+    tabmodule = None
+
+
+class ModifiedGrammarParser(DjangoQLParser):
+    def p_logical(self, p):
+        """
+        logical : AND
+                | OR
+                | COMMA
+        """
+        p[0] = Logical(operator=p[1])
+
+
+class StaleTablesParser(DjangoQLParser):
+    @classmethod
+    def tables_up_to_date(cls):
+        return False
+
+
+class ExtraTokenLexer(DjangoQLLexer):
+    tokens = DjangoQLLexer.tokens + ['EXTRA']
+
+
+class ExtraTokenParser(DjangoQLParser):
+    lexer_class = ExtraTokenLexer
+    tabmodule = None
+
+
+class DjangoQLParsingTablesTest(TestCase):
+    def cold_start(self, parser_class):
+        parser_class._prototypes.pop(parser_class, None)
+        return parser_class()
+
+    def test_tables_up_to_date(self):
+        self.assertTrue(
+            DjangoQLParser.tables_up_to_date(),
+            'Parsing tables are out of date, please regenerate them with '
+            '"python -m djangoql.parser"',
+        )
+        self.assertFalse(DjangoQLParser.write_tables())
+        self.assertFalse(NoTablesParser.tables_up_to_date())
+        self.assertFalse(NoTablesParser.write_tables())
+
+    def test_cold_start(self):
+        def generate(*args, **kwargs):
+            raise AssertionError('Parsing tables are generated')
+
+        original = yacc.LRGeneratedTable
+        yacc.LRGeneratedTable = generate
+        try:
+            self.cold_start(DjangoQLParser).parse('name = "foo"')
+        finally:
+            yacc.LRGeneratedTable = original
+
+    def test_no_tables(self):
+        # Unrelated top-level tables are never imported
+        sys.modules['parsetab'] = types.ModuleType('parsetab')
+        try:
+            parser = self.cold_start(NoTablesParser)
+        finally:
+            del sys.modules['parsetab']
+        self.assertEqual(
+            Expression(Name('a'), Comparison('='), Const(1)),
+            parser.parse('a = 1'),
+        )
+
+    def test_lexer_tokens(self):
+        self.assertIn('EXTRA', ExtraTokenParser._grammar_module().tokens)
+
+    def test_stale_tables(self):
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.cold_start(StaleTablesParser)
+        self.assertEqual(1, len(w))
+        self.assertIn('do not match the grammar', str(w[0].message))
+
+        with override_settings(DJANGOQL_STALE_TABLES='error'):
+            self.assertRaises(
+                DjangoQLError,
+                self.cold_start,
+                StaleTablesParser,
+            )
+
+        with override_settings(DJANGOQL_STALE_TABLES='ignore'):
+            with warnings.catch_warnings(record=True) as w:
+                warnings.simplefilter('always')
+                self.cold_start(StaleTablesParser)
+            self.assertEqual(0, len(w))
+
+    def test_modified_grammar(self):
+        # Tables of the package don't fit, they're built from scratch
+        # without warnings
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            parser = self.cold_start(ModifiedGrammarParser)
+        self.assertEqual(0, len(w))
+        self.assertEqual(
+            Expression(
+                Expression(Name('a'), Comparison('='), Const(1)),
+                Logical(','),
+                Expression(Name('b'), Comparison('='), Const(2)),
+            ),
+            parser.parse('a = 1, b = 2'),
+        )
@@ -1,8 +1,15 @@
+from unittest import skipIf
+
+import django
 from django.contrib.auth.models import User
+from django.db.models import Q
 from django.test import TestCase, override_settings
 
-from djangoql.queryset import apply_search
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.exceptions import DjangoQLLexerError, DjangoQLParserError, \
+    DjangoQLSchemaError
+from djangoql.parser import get_parser
+from djangoql.queryset import DjangoQLQueryCache, apply_search, build_filter
+from djangoql.schema import DateTimeField, DjangoQLSchema, IntField, StrField
 
 from ..models import Book
 
@@ -27,6 +34,10 @@ class BookCustomSearchSchema(DjangoQLSchema):
             ]
 
 
+class IncludeBookSchema(DjangoQLSchema):
+    include = (Book,)
+
+
 class DjangoQLQuerySetTest(TestCase):
     def do_simple_query_test(self):
         qs = Book.objects.djangoql(
@@ -83,6 +94,28 @@ class DjangoQLQuerySetTest(TestCase):
         except Exception as e:
             self.fail(e)
 
+    def test_validation_hooks(self):
+        class NoIdSchema(DjangoQLSchema):
+            def validate(self, node):
+                if 'id' in str(node):
+                    raise DjangoQLSchemaError('id is forbidden')
+                return super(NoIdSchema, self).validate(node)
+
+        class NoNameSchema(DjangoQLSchema):
+            def validate_comparison(self, node):
+                if node.left.value == 'name':
+                    raise DjangoQLSchemaError('name is forbidden')
+                return super(NoNameSchema, self).validate_comparison(node)
+
+        qs = Book.objects.all()
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'id is forbidden'):
+            apply_search(qs, 'id = 1', schema=NoIdSchema)
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'name is'):
+            apply_search(qs, 'id = 1 or name = "x"', schema=NoNameSchema)
+        self.assertIn('"name" = x', str(
+            apply_search(qs, 'name = "x"', schema=NoIdSchema).query,
+        ))
+
     def test_choices(self):
         qs = Book.objects.djangoql(
             'genre = "Drama"',
@@ -111,3 +144,302 @@ class DjangoQLQuerySetTest(TestCase):
         qs = apply_search(User.objects.all(), 'last_login = None')
         where_clause = str(qs.query).split('WHERE')[1].strip()
         self.assertEqual('"auth_user"."last_login" IS NULL', where_clause)
+
+    def test_datetime_list(self):
+        qs = Book.objects.djangoql(
+            'written in ("2017-01-30", "2017-01-31 10:00") or '
+            'written not in ("2018-01-30 10:00:01")',
+        )
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        # Older Django versions don't keep the order of IN values
+        values = where_clause.split(' IN (')[1].split(')')[0]
+        self.assertEqual(
+            ['2017-01-30 00:00:00', '2017-01-31 10:00:00'],
+            sorted(values.split(', ')),
+        )
+        self.assertTrue(where_clause.startswith('("core_book"."written" IN'))
+        self.assertTrue(where_clause.endswith(
+            ' OR NOT ("core_book"."written" IN (2018-01-30 10:00:01)))',
+        ))
+        with self.assertRaises(DjangoQLSchemaError):
+            Book.objects.djangoql('written in ("2017-01-30", "2017-30-01")')
+
+    def test_values_converted_once(self):
+        parsed = []
+
+        class CountingField(DateTimeField):
+            model = Book
+            name = 'written'
+
+            def get_lookup_value(self, value):
+                parsed.append(value)
+                return super(CountingField, self).get_lookup_value(value)
+
+        class CountingSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                return [CountingField(), 'name']
+
+        Book.objects.djangoql(
+            'written > "2017-01-30" and (written in ("2017-01-31", '
+            '"2017-02-01") or name = "x") and written ~ "2017-02-02"',
+            schema=CountingSchema,
+        )
+        self.assertEqual(
+            ['2017-01-30', '2017-01-31', '2017-02-01', '2017-02-02'],
+            parsed,
+        )
+
+    def test_custom_lookup_values_not_converted(self):
+        converted = []
+
+        class NameField(StrField):
+            model = Book
+            name = 'name'
+
+            def get_lookup_value(self, value):
+                converted.append(value)
+                return value.upper()
+
+            def get_lookup(self, path, operator, value):
+                return Q(name=self.get_lookup_value(value))
+
+        class CustomLookupSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                return [NameField()]
+
+        qs = Book.objects.djangoql('name = "x"', schema=CustomLookupSchema)
+        self.assertIn('"name" = X', str(qs.query))
+        # Only get_lookup() converts the value
+        self.assertEqual(['x'], converted)
+
+    def test_mixed_logical_operators(self):
+        qs = Book.objects.djangoql('id = 1 or id = 2 and (id = 3 or id = 4)')
+        where_clause = str(qs.query).split('WHERE')[1].strip()
+        self.assertEqual(
+            '("core_book"."id" = 1 OR ("core_book"."id" = 2 AND '
+            '("core_book"."id" = 3 OR "core_book"."id" = 4)))',
+            where_clause,
+        )
+
+    def test_equal_values_of_different_types(self):
+        # 1 == True in Python, but only one of them is valid for each field
+        for query in ('id = 1 or id = True', 'is_published = True or '
+                      'is_published = 1'):
+            with self.assertRaises(DjangoQLSchemaError):
+                Book.objects.djangoql(query)
+
+    def test_long_query(self):
+        query = ' or '.join('id = %s' % i for i in range(10000))
+        q = build_filter(get_parser().parse(query), DjangoQLSchema(Book))
+        self.assertEqual('OR', q.connector)
+        self.assertEqual(10000, len(q.children))
+        self.assertEqual(('id', 9999), q.children[-1].children[0])
+        qs = Book.objects.djangoql('(%s) and name = "x"' % query)
+        self.assertIn('"core_book"."id" = 9999)', str(qs.query))
+
+
+class ExistsSchema(DjangoQLSchema):
+    multi_valued_relations = 'exists'
+
+
+@skipIf(django.VERSION < (3, 0), 'EXISTS mode requires Django 3.0+')
+class DjangoQLExistsTest(TestCase):
+    def setUp(self):
+        self.users = []
+        for i, username in enumerate(['a', 'b', 'c']):
+            user = User.objects.create(username=username)
+            self.users.append(user)
+            for rating in range(i * 2):
+                Book.objects.create(
+                    name='book%s' % rating,
+                    author=user,
+                    rating=rating,
+                )
+
+    def search(self, query, schema=ExistsSchema, model=User):
+        return apply_search(model.objects.all(), query, schema=schema)
+
+    def test_invalid_mode(self):
+        class InvalidSchema(DjangoQLSchema):
+            multi_valued_relations = 'magic'
+
+        with self.assertRaises(DjangoQLSchemaError):
+            InvalidSchema(User)
+
+    def test_no_joins(self):
+        qs = self.search('book.name ~ "book" and book.rating > 1')
+        sql = str(qs.query)
+        self.assertEqual(0, sql.count('JOIN'))
+        self.assertEqual(1, sql.count('EXISTS'))
+        self.assertEqual(['c'], [u.username for u in qs])
+
+        # Comparisons in the same chain refer to the same book, just like
+        # with joins
+        qs = self.search('book.name = "book0" and book.rating > 1')
+        self.assertEqual(0, qs.count())
+        qs = self.search(
+            'book.name = "book0" and book.rating > 1',
+            schema=DjangoQLSchema,
+        )
+        self.assertEqual(1, str(qs.query).count('JOIN'))
+        self.assertEqual(0, qs.count())
+
+    def test_no_duplicates(self):
+        query = 'book.rating >= 0'
+        qs = self.search(query, schema=DjangoQLSchema)
+        self.assertEqual(6, qs.count())
+        qs = self.search(query)
+        self.assertEqual(['b', 'c'], sorted(u.username for u in qs))
+
+    def test_grouping(self):
+        qs = self.search(
+            'book.name = "book2" or (username = "a" and book.rating > 3 and '
+            'groups.name = "g" and book.rating < 5)',
+        )
+        sql = str(qs.query)
+        self.assertEqual(0, sql.split('EXISTS')[0].count('JOIN'))
+        self.assertEqual(3, sql.count('EXISTS'))
+        self.assertEqual(['c'], [u.username for u in qs])
+
+        # The whole chain is about books, so it's merged with another
+        # comparison of books
+        qs = self.search('book.id = 0 or (book.rating > 2 and book.id > 0)')
+        self.assertEqual(1, str(qs.query).count('EXISTS'))
+        self.assertEqual(['c'], [u.username for u in qs])
+
+    def test_nested_chains(self):
+        queries = (
+            '(book.name = "book0" or username = "zzz") and book.rating > 2',
+            '(book.name = "book0" or username = "a") and '
+            '(book.rating > 2 or username = "b")',
+            '(book.name = "book1" or book.name = "book3") and '
+            'book.rating > 2',
+            'book.rating > 2 or (book.name = "book0" and username = "b")',
+            'book = None or (book.rating > 2 and username = "c")',
+        )
+        for query in queries:
+            self.assertEqual(
+                {u.username for u in self.search(query, DjangoQLSchema)},
+                {u.username for u in self.search(query)},
+                query,
+            )
+        # A single book must match both conditions, which subqueries in
+        # different chains can't check, so books are joined
+        qs = self.search(queries[0])
+        self.assertNotIn('EXISTS', str(qs.query))
+        self.assertEqual([], list(qs))
+        # Any book may match either condition
+        qs = self.search(queries[3])
+        self.assertEqual(2, str(qs.query).count('EXISTS'))
+        self.assertEqual(['b', 'c'], sorted(u.username for u in qs))
+
+    def test_not_grouped(self):
+        # Negated comparisons are checked with subqueries by Django anyway,
+        # and comparisons with None are about existence of related objects
+        for query in ('book.name != "book0"', 'book = None'):
+            self.assertEqual(
+                str(self.search(query, schema=DjangoQLSchema).query),
+                str(self.search(query).query),
+            )
+        qs = self.search('book.name != "book3" and book.rating = 1')
+        self.assertEqual(['b'], [u.username for u in qs])
+
+    def test_related_path(self):
+        qs = self.search(
+            'author.groups.id = 1 and author.book.rating > 2',
+            model=Book,
+        )
+        sql = str(qs.query)
+        self.assertEqual(0, sql.split('EXISTS')[0].count('JOIN'))
+        self.assertEqual(2, sql.count('EXISTS'))
+        # No way back from the related model, so joins are used
+        qs = self.search('similar_books.name = "x"', model=Book)
+        self.assertNotIn('EXISTS', str(qs.query))
+
+
+class DjangoQLQueryCacheTest(TestCase):
+    def test_normalize(self):
+        self.assertEqual(
+            'name = "a  b" and id in (1, 2)',
+            DjangoQLQueryCache.normalize(
+                '  name =  "a  b"\n and\tid in (1,  2) ',
+            ),
+        )
+        self.assertEqual(
+            'name = "say \\"hi  there\\""',
+            DjangoQLQueryCache.normalize('name  =  "say \\"hi  there\\""'),
+        )
+
+    def test_hits_and_misses(self):
+        cache = DjangoQLQueryCache(maxsize=2)
+        qs = apply_search(Book.objects.all(), 'name = "foo"', cache=cache)
+        self.assertEqual({'hits': 0, 'misses': 1, 'size': 1, 'maxsize': 2},
+                         cache.info())
+        cached_qs = apply_search(
+            Book.objects.all(),
+            ' name  =  "foo" ',
+            cache=cache,
+        )
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(str(qs.query), str(cached_qs.query))
+        # Same query for another schema is cached separately
+        apply_search(
+            Book.objects.all(),
+            'name = "foo"',
+            schema=IncludeBookSchema,
+            cache=cache,
+        )
+        self.assertEqual(2, cache.misses)
+        # Least recently used entry is evicted
+        apply_search(Book.objects.all(), 'id = 1', cache=cache)
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(
+            cache.get_ast(DjangoQLSchema, Book, 'name = "foo"'),
+        )
+
+    def test_invalid_queries_are_not_cached(self):
+        cache = DjangoQLQueryCache()
+        for _ in range(2):
+            with self.assertRaisesMessage(DjangoQLSchemaError, 'gav'):
+                apply_search(Book.objects.all(), 'gav = 1', cache=cache)
+            with self.assertRaises(DjangoQLParserError):
+                apply_search(Book.objects.all(), 'name = ', cache=cache)
+        self.assertEqual(0, len(cache))
+
+    def test_illegal_whitespace(self):
+        cache = DjangoQLQueryCache()
+        apply_search(Book.objects.all(), 'name = "a" and id = 1', cache=cache)
+        # Whitespace that the lexer doesn't skip isn't normalized
+        for search in (u'name = "a"\u3000and id = 1', u'\x1cname = "a" and '
+                       u'id = 1'):
+            with self.assertRaises(DjangoQLLexerError):
+                apply_search(Book.objects.all(), search, cache=cache)
+        self.assertEqual(1, len(cache))
+
+    def test_schema_reload(self):
+        cache = DjangoQLQueryCache()
+        apply_search(Book.objects.all(), 'name = "foo"', cache=cache)
+        apply_search(
+            Book.objects.all(),
+            'genre = "Drama"',
+            schema=BookCustomSearchSchema,
+            cache=cache,
+        )
+        # Simulate reloading of the module that defines the schema
+        reloaded = type(
+            BookCustomSearchSchema.__name__,
+            (BookCustomSearchSchema,),
+            {'__module__': BookCustomSearchSchema.__module__},
+        )
+        apply_search(
+            Book.objects.all(),
+            'genre = "Drama"',
+            schema=reloaded,
+            cache=cache,
+        )
+        self.assertEqual(2, len(cache))
+        self.assertIsNone(
+            cache.get_ast(BookCustomSearchSchema, Book, 'genre = "Drama"'),
+        )
+        cache.invalidate(DjangoQLSchema)
+        self.assertEqual(1, len(cache))
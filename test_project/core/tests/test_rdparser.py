@@ -0,0 +1,108 @@
+import random
+from unittest import TestCase
+
+from django.test import override_settings
+
+from djangoql.exceptions import DjangoQLError
+from djangoql.parser import DjangoQLParser, get_parser
+from djangoql.rdparser import DjangoQLRecursiveDescentParser
+
+
+FRAGMENTS = (
+    '(', ')', ',', 'name', 'author.groups.name', '=', '!=', '>', '>=', '<',
+    '<=', '~', '!~', 'in', 'not', 'startswith', 'endswith', 'and', 'or',
+    'True', 'False', 'None', '42', '-2.5', '1e5', '"foo"', '"x\\"y"', '^',
+)
+
+VALUES = ('42', '-2.5', '1e5', '"foo"', 'True', 'False', 'None')
+
+OPERATORS = (
+    '=', '!=', '>', '>=', '<', '<=', '~', '!~', 'startswith',
+    'not startswith', 'endswith', 'not endswith', 'in', 'not in',
+)
+
+
+class DjangoQLRecursiveDescentParserTest(TestCase):
+    ply = DjangoQLParser()
+    rd = DjangoQLRecursiveDescentParser()
+
+    def parse(self, parser, query):
+        try:
+            return parser.parse(query)
+        except DjangoQLError as e:
+            return type(e), str(e), e.value, e.line, e.column
+
+    def assert_equivalent(self, query):
+        self.assertEqual(
+            self.parse(self.ply, query),
+            self.parse(self.rd, query),
+            'Parsers disagree on %r' % query,
+        )
+
+    def random_expression(self, rnd, depth=0):
+        r = rnd.random()
+        if depth < 4 and r < 0.3:
+            return ['('] + self.random_expression(rnd, depth + 1) + [')']
+        if depth < 4 and r < 0.6:
+            return (
+                self.random_expression(rnd, depth + 1) +
+                [rnd.choice(('and', 'or'))] +
+                self.random_expression(rnd, depth + 1)
+            )
+        operator = rnd.choice(OPERATORS)
+        if operator.endswith('in'):
+            values = [rnd.choice(VALUES) for _ in range(rnd.randint(1, 3))]
+            return ['name', operator, '(', ', '.join(values), ')']
+        return ['author.name', operator, rnd.choice(VALUES)]
+
+    def test_samples(self):
+        samples = (
+            '',
+            '   ',
+            'a',
+            '()',
+            ')',
+            'a = (1)',
+            'a in ()',
+            'a in (1,)',
+            'a not = 1',
+            '(a = 1))',
+            '((a = 1)',
+            'a = 1 and',
+            'a = 1 b = 2',
+            'a = "12345678901234567890123" b',
+            'a =\n 1 1',
+            'a = 1 or b = 2 and c = 3',
+            '(a = 1 or b = 2) and (c in (1, "x", None) or d not endswith "z")',
+            'name ~ "Contains a \\"quoted\\" str, \\u0041"',
+            'a = ^',
+            'a = 1 b ^',
+        )
+        for query in samples:
+            self.assert_equivalent(query)
+
+    def test_random_queries(self):
+        rnd = random.Random(42)
+        for _ in range(2000):
+            tokens = self.random_expression(rnd)
+            for _ in range(rnd.randint(0, 2)):
+                pos = rnd.randint(0, len(tokens) - 1)
+                mutation = rnd.random()
+                if mutation < 0.33:
+                    tokens.insert(pos, rnd.choice(FRAGMENTS))
+                elif mutation < 0.66:
+                    del tokens[pos]
+                else:
+                    tokens[pos] = rnd.choice(FRAGMENTS)
+            self.assert_equivalent(rnd.choice((' ', '\n')).join(tokens))
+
+    def test_deep_nesting(self):
+        depth = 5000
+        ast = self.rd.parse('(' * depth + 'a = 1' + ')' * depth)
+        self.assertEqual(self.rd.parse('a = 1'), ast)
+
+    def test_backend_setting(self):
+        self.assertIsInstance(get_parser(), DjangoQLParser)
+        with override_settings(DJANGOQL_PARSER='recursive_descent'):
+            self.assertIsInstance(get_parser(), DjangoQLRecursiveDescentParser)
+        self.assertRaises(DjangoQLError, get_parser, 'gav')
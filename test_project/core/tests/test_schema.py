@@ -1,15 +1,37 @@
+import os
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, timedelta
+from io import StringIO
+
 from django.apps import apps
+from django.apps.registry import Apps
 from django.contrib.auth.models import Group, User
-from django.test import TestCase
+from django.core.management import CommandError, call_command
+from django.db import models
+from django.test import TestCase, override_settings
+from django.utils import timezone
 
+from djangoql.ast import Name
 from djangoql.exceptions import DjangoQLSchemaError
-from djangoql.parser import DjangoQLParser
-from djangoql.schema import DjangoQLSchema, IntField
+from djangoql.parser import DjangoQLParser, get_parser
+from djangoql.schema import DateField, DateTimeField, DjangoQLField, \
+    DjangoQLSchema, FloatField, IntField, LazyModels, RelationField, StrField, \
+    _introspection_cache, _options_dictionaries, _parsed_dates, \
+    _trigram_support, clear_introspection_cache
 from djangoql.serializers import SuggestionsAPISerializer
 
 from ..models import Book
 
 
+try:
+    # Management commands write native strings in Python 2
+    from StringIO import StringIO as CommandOutput
+except ImportError:
+    CommandOutput = StringIO
+
+
 serializer = SuggestionsAPISerializer('/suggestions/')
 
 
@@ -175,3 +197,599 @@ class DjangoQLSchemaTest(TestCase):
                 self.fail("This query should't pass validation: %s" % query)
             except DjangoQLSchemaError:
                 pass
+
+    def test_validate_repeated_comparisons(self):
+        validated = []
+
+        class RecordingSchema(IncludeUserGroupSchema):
+            def validate_comparison(self, node):
+                validated.append(node.right.value)
+                return super(RecordingSchema, self).validate_comparison(node)
+
+        schema = RecordingSchema(User)
+        schema.validate(get_parser().parse('id = 1 or id = 2 or id = 1'))
+        self.assertEqual([1, 2], validated)
+        # Values equal in Python, but of different types, are validated
+        # separately
+        del validated[:]
+        with self.assertRaises(DjangoQLSchemaError):
+            schema.validate(get_parser().parse('id = 1 or id = True'))
+        self.assertEqual([1, True], validated)
+
+    def test_validate_long_query(self):
+        query = ' and '.join('id != %s' % i for i in range(10000))
+        schema = IncludeUserGroupSchema(User)
+        schema.validate(get_parser().parse(query))
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'gav'):
+            schema.validate(get_parser().parse(query + ' or gav = 1'))
+
+
+class UncachedSchema(DjangoQLSchema):
+    cache_introspection = False
+
+
+class DjangoQLIntrospectionCacheTest(TestCase):
+    def setUp(self):
+        clear_introspection_cache()
+
+    def test_shared(self):
+        models = DjangoQLSchema(Book).models
+        self.assertIs(models, DjangoQLSchema(Book).models)
+        self.assertIsNot(models, DjangoQLSchema(User).models)
+        self.assertIsNot(models, ExcludeUserSchema(Book).models)
+        self.assertIsNot(
+            UncachedSchema(Book).models,
+            UncachedSchema(Book).models,
+        )
+
+    def test_suggest_options(self):
+        schema = DjangoQLSchema(Book)
+        other = DjangoQLSchema(Book)
+        other.suggest_options = {Book: ['name']}
+        self.assertIsNot(schema.models, other.models)
+        self.assertFalse(schema.models['core.book']['name'].suggest_options)
+        self.assertTrue(other.models['core.book']['name'].suggest_options)
+
+    def test_invalidation(self):
+        cached = DjangoQLSchema(Book).models
+        with override_settings(USE_TZ=False):
+            self.assertIsNot(cached, DjangoQLSchema(Book).models)
+        cached = DjangoQLSchema(Book).models
+
+        # A separate registry, so that the model isn't installed
+        class NewModel(models.Model):
+            class Meta:
+                app_label = 'core'
+                apps = Apps()
+        self.assertIsNot(cached, DjangoQLSchema(Book).models)
+
+    def test_resolved_names(self):
+        name = Name(['author', 'groups', 'name'])
+        field = DjangoQLSchema(Book).resolve_name(name)
+        self.assertEqual('name', field.name)
+        schema = DjangoQLSchema(Book)
+        self.assertIs(field, schema.resolve_name(name))
+        # Resolved from the index, without looking into models
+        self.assertIsNone(schema._models)
+        self.assertIsNone(schema.resolve_name(Name(['author', 'groups'])))
+
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'Possible choices'):
+            schema.resolve_name(Name(['author', 'nope']))
+        self.assertNotIn(('author', 'nope'), schema.resolved_names)
+
+        clear_introspection_cache()
+        self.assertEqual({}, DjangoQLSchema(Book).resolved_names)
+
+    def test_resolved_names_limit(self):
+        class LimitedSchema(DjangoQLSchema):
+            max_resolved_names = 2
+
+        schema = LimitedSchema(Book)
+        for name in ('id', 'name', 'rating'):
+            schema.resolve_name(Name(name))
+        self.assertEqual([('rating',)], list(schema.resolved_names))
+
+    def test_warm_up(self):
+        with self.assertNumQueries(0):
+            IncludeUserGroupSchema.warm_up(User, Group)
+        key = IncludeUserGroupSchema(User).introspection_key()
+        self.assertIn(key, _introspection_cache)
+        key = IncludeUserGroupSchema(Group).introspection_key()
+        self.assertIn(key, _introspection_cache)
+
+
+class LazySchema(DjangoQLSchema):
+    lazy_introspection = True
+    cache_introspection = False
+
+    def get_fields(self, model):
+        self.introspected.append(self.model_label(model))
+        return super(LazySchema, self).get_fields(model)
+
+
+class LazyExcludeSchema(LazySchema):
+    exclude = (Group,)
+
+
+class DjangoQLLazyIntrospectionTest(TestCase):
+    def schema(self, schema_cls=LazySchema, model=Book):
+        schema = schema_cls(model)
+        schema.introspected = []
+        return schema
+
+    def test_validation(self):
+        schema = self.schema()
+        schema.validate(get_parser().parse('name = "x" and id > 1'))
+        self.assertEqual(['core.book'], schema.introspected)
+        schema.validate(get_parser().parse('author.groups.name = "x"'))
+        self.assertEqual(
+            ['core.book', 'auth.user', 'auth.group'],
+            schema.introspected,
+        )
+
+    def test_same_as_eager(self):
+        for schema_cls in (LazySchema, LazyExcludeSchema):
+            lazy = self.schema(schema_cls)
+            lazy.models['core.book']
+            eager = self.schema(schema_cls)
+            eager.lazy_introspection = False
+            self.assertEqual(
+                list(eager.models.keys()),
+                list(lazy.models.keys()),
+            )
+            self.assertEqual(
+                serializer.serialize(eager),
+                serializer.serialize(lazy),
+            )
+            # Each model is introspected only once
+            self.assertEqual(
+                sorted(set(lazy.introspected)),
+                sorted(lazy.introspected),
+            )
+
+    def test_unknown_models(self):
+        schema = self.schema(LazyExcludeSchema)
+        self.assertIsNone(schema.models.get('core.unknown'))
+        self.assertNotIn('auth.group', schema.models)
+        # Models that aren't discovered yet are found too
+        schema = self.schema()
+        self.assertIn('auth.group', schema.models)
+
+    def test_threads(self):
+        errors = []
+
+        def walk(models, start):
+            start.wait()
+            try:
+                list(models)
+                models['auth.group']
+            except Exception as e:
+                errors.append(e)
+
+        if hasattr(sys, 'setswitchinterval'):
+            # Switch threads as often as possible
+            interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            self.addCleanup(sys.setswitchinterval, interval)
+        for _ in range(30):
+            schema = self.schema()
+            models = LazyModels(schema, Book)
+            start = threading.Event()
+            threads = [
+                threading.Thread(target=walk, args=(models, start))
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual([], errors)
+            self.assertEqual(
+                sorted(set(schema.introspected)),
+                sorted(schema.introspected),
+            )
+
+
+class MaxDepthSchema(DjangoQLSchema):
+    max_depth = 1
+
+
+class MaxRelationsSchema(DjangoQLSchema):
+    max_relations = 1
+
+
+class IncludeFieldsSchema(DjangoQLSchema):
+    include_fields = {
+        Book: ['name', 'author'],
+        User: ['username', 'groups'],
+        Group: ['name', 'user'],
+    }
+
+
+class DjangoQLSchemaLimitsTest(TestCase):
+    def assertSameAsLazy(self, schema_cls):
+        class LazyLimitedSchema(schema_cls):
+            lazy_introspection = True
+
+        lazy = LazyLimitedSchema(Book)
+        # Introspect a model before its distance from Book is known
+        lazy.models['core.book']
+        lazy.models['auth.user']
+        self.assertEqual(
+            serializer.serialize(schema_cls(Book)),
+            serializer.serialize(lazy),
+        )
+
+    def test_max_depth(self):
+        models = MaxDepthSchema(Book).models
+        self.assertEqual(
+            ['auth.user', 'contenttypes.contenttype', 'core.book'],
+            sorted(models.keys()),
+        )
+        self.assertIn('author', models['core.book'])
+        # Relations of the most distant models are not available
+        self.assertNotIn('groups', models['auth.user'])
+        self.assertIn('username', models['auth.user'])
+        with self.assertRaises(DjangoQLSchemaError):
+            MaxDepthSchema(Book).validate(
+                get_parser().parse('author.groups.name = "x"'),
+            )
+        self.assertSameAsLazy(MaxDepthSchema)
+
+    def test_max_relations(self):
+        models = MaxRelationsSchema(Book).models
+        for fields in models.values():
+            relations = [
+                f for f in fields.values() if isinstance(f, RelationField)
+            ]
+            self.assertLessEqual(len(relations), 1)
+        # Relations are taken in the order of get_fields(), which is sorted
+        self.assertIn('author', models['core.book'])
+        self.assertNotIn('content_type', models['core.book'])
+        self.assertIn('name', models['core.book'])
+        self.assertSameAsLazy(MaxRelationsSchema)
+
+    def test_include_fields(self):
+        models = IncludeFieldsSchema(Book).models
+        self.assertEqual(['author', 'name'], list(models['core.book']))
+        self.assertEqual(['groups', 'username'], list(models['auth.user']))
+        self.assertEqual(['name', 'user'], list(models['auth.group']))
+        self.assertEqual(
+            ['auth.group', 'auth.user', 'core.book'],
+            sorted(models.keys()),
+        )
+        self.assertSameAsLazy(IncludeFieldsSchema)
+
+    def test_command(self):
+        out = CommandOutput()
+        call_command(
+            'djangoql_schema',
+            'core.Book',
+            schema='core.tests.test_schema.MaxDepthSchema',
+            stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('core.book', output)
+        self.assertNotIn('auth.group', output)
+        self.assertIn('Models: 3', output)
+        self.assertIn('Serialized size:', output)
+        with self.assertRaises(CommandError):
+            call_command('djangoql_schema', 'core.Unknown')
+
+
+class DjangoQLSnapshotTest(TestCase):
+    def setUp(self):
+        clear_introspection_cache()
+
+    def test_fingerprint(self):
+        fingerprint = DjangoQLSchema(Book).fingerprint()
+        self.assertEqual(40, len(fingerprint))
+        clear_introspection_cache()
+        self.assertEqual(fingerprint, UncachedSchema(Book).fingerprint())
+        self.assertNotEqual(
+            fingerprint,
+            BookCustomFieldsSchema(Book).fingerprint(),
+        )
+        self.assertNotEqual(fingerprint, DjangoQLSchema(User).fingerprint())
+
+    def test_dump_and_load(self):
+        f = StringIO()
+        DjangoQLSchema(Book).dump_snapshot(f)
+        expected = serializer.serialize(DjangoQLSchema(Book))
+        clear_introspection_cache()
+
+        f.seek(0)
+        schema = DjangoQLSchema.load_snapshot(Book, f)
+        self.assertIs(schema.models, DjangoQLSchema(Book).models)
+        self.assertEqual(expected, serializer.serialize(schema))
+        field = schema.models['core.book']['author']
+        self.assertIs(User, field.related_model)
+        self.assertIs(Book, field.model)
+
+        f.seek(0)
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'different'):
+            ExcludeUserSchema.load_snapshot(Book, f)
+
+    def test_not_importable(self):
+        class LocalField(IntField):
+            pass
+
+        class LocalFieldSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                return [LocalField(model=model, name='id')]
+
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'not importable'):
+            LocalFieldSchema(Book).dump_snapshot(StringIO())
+
+    def test_command(self):
+        path = os.path.join(tempfile.mkdtemp(), 'schema.json')
+        out = CommandOutput()
+        call_command('djangoql_schema', 'core.Book', snapshot=path, stdout=out)
+        self.assertIn(
+            'Fingerprint: %s' % DjangoQLSchema(Book).fingerprint(),
+            out.getvalue(),
+        )
+        with open(path) as f:
+            DjangoQLSchema.load_snapshot(Book, f)
+
+
+class RatingField(models.FloatField):
+    pass
+
+
+class FieldClassesSchema(DjangoQLSchema):
+    field_classes = {
+        models.DateTimeField: StrField,
+        RatingField: IntField,
+    }
+
+
+class DjangoQLFieldClassesTest(TestCase):
+    def test_default(self):
+        schema = DjangoQLSchema(Book)
+        fields = schema.models['core.book']
+        self.assertIsInstance(fields['genre'], IntField)
+        self.assertIsInstance(fields['written'], DateTimeField)
+        self.assertIs(
+            FloatField,
+            schema.get_field_cls(RatingField(name='rating')),
+        )
+        self.assertIs(
+            DjangoQLField,
+            schema.get_field_cls(models.DurationField(name='duration')),
+        )
+
+    def test_custom(self):
+        schema = FieldClassesSchema(Book)
+        fields = schema.models['core.book']
+        self.assertIsInstance(fields['written'], StrField)
+        self.assertIsInstance(fields['genre'], IntField)
+        self.assertIs(
+            IntField,
+            schema.get_field_cls(RatingField(name='rating')),
+        )
+
+    def test_get_field_instance(self):
+        class CustomInstanceSchema(DjangoQLSchema):
+            def get_field_instance(self, model, field_name):
+                if field_name == 'name':
+                    return IntField(model=model, name='name')
+                return super(CustomInstanceSchema, self).get_field_instance(
+                    model,
+                    field_name,
+                )
+
+        fields = CustomInstanceSchema(Book).models['core.book']
+        self.assertIsInstance(fields['name'], IntField)
+        self.assertIsInstance(fields['written'], DateTimeField)
+
+
+class DjangoQLFieldChoicesTest(TestCase):
+    def test_lookup_value(self):
+        field = IntField(model=Book, name='genre')
+        self.assertEqual(2, field.get_lookup_value('Comics'))
+        self.assertEqual(2, field.get_lookup_value(2))
+        self.assertEqual(99, field.get_lookup_value(99))
+        self.assertEqual('Nope', field.get_lookup_value('Nope'))
+        self.assertEqual(
+            [1, 2, 3],
+            field.get_lookup_value(['Other', 2, 'Drama', 99]),
+        )
+
+    def test_first_matching_choice(self):
+        class AmbiguousField(IntField):
+            def _field_choices(self):
+                return [(1, 'one'), ('one', 'two'), (3, 'one')]
+
+        field = AmbiguousField(name='x')
+        self.assertEqual(1, field.get_lookup_value('one'))
+        self.assertEqual('one', field.get_lookup_value('two'))
+        self.assertEqual(3, field.get_lookup_value(3))
+        self.assertEqual([1, 'one', 3], field.get_lookup_value(['one']))
+
+    def test_regenerated_choices(self):
+        class GeneratedField(IntField):
+            choices = [(1, 'one')]
+
+            def _field_choices(self):
+                # A new list on every call, whose id may be reused
+                return list(self.choices)
+
+        field = GeneratedField(name='x')
+        for i in range(10):
+            field.choices = [(i, 'one')]
+            self.assertEqual(i, field.get_lookup_value('one'))
+
+    def test_validate_list(self):
+        field = IntField(model=Book, name='genre', nullable=True)
+        field.validate_list([1, 2, 99, 'Drama', None])
+        with self.assertRaisesMessage(DjangoQLSchemaError, "'Nope'"):
+            field.validate_list([1, 'Drama', 'Nope', 'Bad'])
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'True'):
+            IntField(name='id').validate_list([1, True])
+
+        validated = []
+
+        class PositiveField(IntField):
+            def validate(self, value):
+                validated.append(value)
+                if value < 0:
+                    raise DjangoQLSchemaError('Negative')
+
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'Negative'):
+            PositiveField(name='id').validate_list([1, 2, 1, 2, -1])
+        self.assertEqual([1, 2, -1], validated)
+
+
+class DjangoQLDateFieldsTest(TestCase):
+    def test_same_as_strptime(self):
+        date_field = DateField(name='date')
+        datetime_field = DateTimeField(name='written')
+        for value, mask in (
+            ('2017-01-30', '%Y-%m-%d'),
+            ('2017-1-3', '%Y-%m-%d'),
+            ('2017-01-30 10:00', '%Y-%m-%d %H:%M'),
+            ('2017-01-30 1:05:07', '%Y-%m-%d %H:%M:%S'),
+            ('2017-01-30  1:05', '%Y-%m-%d %H:%M'),
+        ):
+            expected = datetime.strptime(value, mask)
+            with override_settings(USE_TZ=False):
+                self.assertEqual(expected, datetime_field.parse(value))
+            if mask == '%Y-%m-%d':
+                self.assertEqual(expected.date(), date_field.parse(value))
+        for value in ('2017-02-30', '2017-01-30\n', '2017-01-30T10:00',
+                      '2017-01-30 24:00', '2017-01-30 10:00:60'):
+            with self.assertRaises(DjangoQLSchemaError):
+                datetime_field.parse(value)
+
+    def test_parsed_values_cache(self):
+        field = DateField(name='date')
+        _parsed_dates.clear()
+        start = date(2000, 1, 1)
+        for i in range(1, _parsed_dates.maxsize + 100):
+            field.parse('2000-01-01')
+            field.parse((start + timedelta(days=i)).isoformat())
+        self.assertEqual(_parsed_dates.maxsize, len(_parsed_dates))
+        # Recently used values stay cached
+        self.assertIn('2000-01-01', _parsed_dates)
+
+    def test_timezone(self):
+        field = DateTimeField(name='written')
+        with override_settings(USE_TZ=False):
+            self.assertIsNone(field.clean('=', u'2017-01-30').tzinfo)
+        # Django < 1.9 doesn't accept time zone names
+        tokyo = timezone.get_fixed_timezone(9 * 60)
+        with override_settings(USE_TZ=True), timezone.override(tokyo):
+            values = field.clean('in', [u'2017-01-30', u'2017-01-30 10:00'])
+            self.assertEqual(
+                [datetime(2017, 1, 30), datetime(2017, 1, 30, 10)],
+                [v.replace(tzinfo=None) for v in values],
+            )
+            self.assertEqual(
+                [timezone.get_current_timezone()] * 2,
+                [v.tzinfo for v in values],
+            )
+
+
+class DjangoQLStrFieldOptionsTest(TestCase):
+    def get_sql(self, search, **attrs):
+        field = StrField(model=Book, name='name')
+        for name, value in attrs.items():
+            setattr(field, name, value)
+        return str(field.get_options(search).query)
+
+    def test_lookups(self):
+        self.assertIn(
+            '"core_book"."name" LIKE %war% ESCAPE',
+            self.get_sql('war'),
+        )
+        self.assertIn(
+            '"core_book"."name" LIKE war% ESCAPE',
+            self.get_sql('war', options_lookup='istartswith'),
+        )
+        self.assertNotIn('LIKE', self.get_sql(''))
+        with self.assertRaisesMessage(DjangoQLSchemaError, 'options_lookup'):
+            self.get_sql('war', options_lookup='iexact')
+
+    def test_trigram(self):
+        # Falls back to icontains on SQLite
+        self.assertIn(
+            '"core_book"."name" LIKE %war% ESCAPE',
+            self.get_sql('war', options_lookup='trigram'),
+        )
+        field = StrField(model=Book, name='name')
+        field.options_lookup = 'trigram'
+        _trigram_support['default'] = True
+        try:
+            self.assertIn(
+                'trigram',
+                field.get_options_lookup(Book.objects.all()),
+            )
+        finally:
+            del _trigram_support['default']
+
+    def test_scan_limit(self):
+        user = User.objects.create(username='test')
+        books = [
+            Book.objects.create(name='book%s' % i, author=user)
+            for i in range(5)
+        ]
+        self.assertIn(
+            '"core_book"."id" >= %s' % books[2].pk,
+            self.get_sql('war', options_scan_limit=3),
+        )
+        self.assertNotIn('"id" >=', self.get_sql('war', options_scan_limit=9))
+        field = StrField(model=Book, name='name')
+        field.options_scan_limit = 2
+        self.assertEqual(['book3', 'book4'], list(field.get_options('')))
+
+
+class DjangoQLStrFieldDictionaryTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='test')
+        for name in ('War and Peace', 'Warlock', 'Peace', 'Anna Karenina'):
+            Book.objects.create(name=name, author=user)
+        self.field = StrField(model=Book, name='name')
+        self.field.options_dictionary_threshold = 10
+
+    def tearDown(self):
+        _options_dictionaries.clear()
+
+    def test_search(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                ['Peace', 'War and Peace'],
+                self.field.get_options('peace'),
+            )
+            self.assertEqual(
+                ['Anna Karenina', 'Peace', 'War and Peace', 'Warlock'],
+                self.field.get_options(''),
+            )
+        self.field.options_lookup = 'istartswith'
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                ['War and Peace', 'Warlock'],
+                self.field.get_options('WAR'),
+            )
+            self.assertEqual([], self.field.get_options('x'))
+
+    def test_threshold(self):
+        self.field.options_dictionary_threshold = 3
+        with self.assertNumQueries(2):
+            options = self.field.get_options('peace')
+            self.assertEqual(['Peace', 'War and Peace'], list(options))
+        # Too many values is remembered
+        with self.assertNumQueries(1):
+            list(self.field.get_options('peace'))
+
+    def test_refresh(self):
+        self.field.get_options('')
+        Book.objects.filter(name='Peace').update(name='Piece')
+        self.assertIn('Peace', self.field.get_options(''))
+        self.field.options_dictionary_timeout = 0
+        self.field.refresh_options_dictionary()
+        self.assertEqual(['Piece'], self.field.get_options('piece'))
+        # Expired values are loaded again
+        Book.objects.filter(name='Piece').update(name='Peace')
+        self.assertEqual([], self.field.get_options('piece'))
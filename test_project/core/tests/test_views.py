@@ -0,0 +1,200 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from djangoql.schema import DjangoQLSchema, StrField
+from djangoql.views import DjangoQLSuggestionsCache, SuggestionsAPIView
+
+from ..models import Book
+
+
+class SuggestionsSchema(DjangoQLSchema):
+    suggest_options = {Book: ['name', 'genre']}
+
+
+class SuggestionsAPIViewTest(TestCase):
+    def setUp(self):
+        user = User.objects.create(username='test')
+        for name in ('e', 'a', 'd', 'b', 'c', 'a'):
+            Book.objects.create(name=name, author=user)
+        self.view = SuggestionsAPIView.as_view(
+            schema=SuggestionsSchema(Book),
+            items_per_page=2,
+        )
+
+    def get_json(self, status=200, **params):
+        response = self.view(RequestFactory().get('/', params))
+        self.assertEqual(status, response.status_code)
+        return json.loads(response.content.decode('utf8'))
+
+    def test_pages(self):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.get_json(field='name', page=2)
+        self.assertEqual(1, len(queries))
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertEqual(['c', 'd'], r['items'])
+        self.assertTrue(r['has_next'])
+        self.assertEqual(2, r['page'])
+
+        r = self.get_json(field='name', page=3)
+        self.assertEqual(['e'], r['items'])
+        self.assertFalse(r['has_next'])
+        self.assertNotIn('cursor', r)
+
+    def test_cursor(self):
+        items = []
+        r = self.get_json(field='name')
+        items.extend(r['items'])
+        while r['has_next']:
+            with CaptureQueriesContext(connection) as queries:
+                r = self.get_json(field='name', cursor=r['cursor'])
+            self.assertNotIn('OFFSET', queries[0]['sql'])
+            items.extend(r['items'])
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], items)
+
+        r = self.get_json(field='name', search='a')
+        self.assertEqual(['a'], r['items'])
+
+    def test_cursor_of_choices(self):
+        r = self.get_json(field='genre')
+        self.assertEqual(['Drama', 'Comics'], r['items'])
+        r = self.get_json(field='genre', cursor=r['cursor'])
+        self.assertEqual(['Other'], r['items'])
+        self.assertFalse(r['has_next'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('x', 'eyJvZmZzZXQiOi0xfQ==', 'WzFd'):
+            r = self.get_json(status=400, field='name', cursor=cursor)
+            self.assertEqual('Invalid cursor', r['error'])
+        cursor = self.get_json(field='name')['cursor']
+        r = self.get_json(status=400, field='genre', cursor=cursor)
+        self.assertEqual('Invalid cursor', r['error'])
+
+
+class DjangoQLSuggestionsCacheTest(TestCase):
+    backend = None
+
+    def setUp(self):
+        self.user = User.objects.create(username='test')
+        for name in ('ab', 'abc', 'b', 'Abd'):
+            Book.objects.create(name=name, author=self.user)
+        self.cache = DjangoQLSuggestionsCache(backend=self.backend)
+        self.view = SuggestionsAPIView.as_view(
+            schema=SuggestionsSchema(Book),
+            items_per_page=3,
+            cache=self.cache,
+        )
+
+    def get_items(self, queries=0, **params):
+        with self.assertNumQueries(queries):
+            response = self.view(RequestFactory().get('/', params))
+        return json.loads(response.content.decode('utf8'))['items']
+
+    def test_cached(self):
+        self.assertEqual(['Abd', 'ab', 'abc'], self.get_items(1, field='name'))
+        self.assertEqual(['Abd', 'ab', 'abc'], self.get_items(field='name'))
+        self.assertEqual(['b'], self.get_items(1, field='name', page=2))
+        self.assertEqual(['b'], self.get_items(field='name', page=2))
+
+    def test_prefix_reuse(self):
+        self.assertEqual(
+            ['Abd', 'ab', 'abc'],
+            self.get_items(1, field='name', search='a'),
+        )
+        self.assertEqual(['abc'], self.get_items(field='name', search='aBc'))
+        self.assertEqual([], self.get_items(field='name', search='ax'))
+        # The first page without search isn't complete
+        self.get_items(1, field='name')
+        self.assertEqual(['Abd'], self.get_items(1, field='name', search='d'))
+        self.assertEqual(
+            ['Comics'],
+            self.get_items(field='genre', search='c'),
+        )
+        self.assertEqual(['Comics'], self.get_items(field='genre', search='co'))
+
+    def test_prefix_reuse_ascii(self):
+        Book.objects.create(name=u'\u0130x', author=self.user)
+        self.assertEqual(
+            [u'\u0130x'],
+            self.get_items(1, field='name', search=u'\u0130'),
+        )
+        # Databases don't agree with Python on folding non-ASCII characters
+        self.get_items(1, field='name', search=u'\u0130x')
+        self.get_items(1, field='name', search='x')
+        self.get_items(1, field='name', search='xy')
+
+    def test_prefix_reuse_startswith(self):
+        class PrefixField(StrField):
+            model = Book
+            name = 'name'
+            suggest_options = True
+            options_lookup = 'istartswith'
+
+        class PrefixSchema(DjangoQLSchema):
+            def get_fields(self, model):
+                return [PrefixField()]
+
+        view = SuggestionsAPIView.as_view(
+            schema=PrefixSchema(Book),
+            items_per_page=3,
+            cache=self.cache,
+        )
+        for search, items, queries in (
+            ('a', ['Abd', 'ab', 'abc'], 1),
+            ('ab', ['Abd', 'ab', 'abc'], 0),
+            ('b', ['b'], 1),
+            ('bd', [], 0),
+        ):
+            request = RequestFactory().get('/', {
+                'field': 'name',
+                'search': search,
+            })
+            with self.assertNumQueries(queries):
+                response = view(request)
+            self.assertEqual(
+                items,
+                json.loads(response.content.decode('utf8'))['items'],
+            )
+
+    def test_invalidation(self):
+        self.get_items(1, field='name', search='a')
+        Book.objects.create(name='abe', author=self.user)
+        self.assertEqual(
+            ['Abd', 'ab', 'abc'],
+            self.get_items(1, field='name', search='ab'),
+        )
+        self.get_items(field='name', search='ab')
+        self.cache.invalidate()
+        self.get_items(1, field='name', search='ab')
+        self.cache.invalidate(User)
+        self.get_items(field='name', search='ab')
+
+    def test_watched_models(self):
+        invalidated = []
+        self.cache.invalidate = invalidated.append
+        # Only models with cached suggestions are watched
+        User.objects.create(username='other')
+        self.assertEqual([], invalidated)
+        self.get_items(1, field='name')
+        Book.objects.create(name='abe', author=self.user)
+        self.assertEqual([Book], invalidated)
+
+        cache = DjangoQLSuggestionsCache(
+            backend=self.backend,
+            watch_models=[User],
+        )
+        cache.invalidate = invalidated.append
+        User.objects.create(username='another')
+        self.assertEqual([Book, User], invalidated)
+
+
+class DjangoQLSuggestionsDjangoCacheTest(DjangoQLSuggestionsCacheTest):
+    backend = 'default'
+
+    def setUp(self):
+        super(DjangoQLSuggestionsDjangoCacheTest, self).setUp()
+        caches['default'].clear()
@@ -0,0 +1,70 @@
+from io import StringIO
+from unittest import skipIf
+
+from django.apps import apps
+from django.core.management import call_command
+from django.core.signals import request_started
+from django.db import close_old_connections
+from django.test import TestCase, override_settings
+
+from djangoql.admin import _introspection_payloads
+from djangoql.schema import _introspection_cache, clear_introspection_cache
+from djangoql.warmup import all_sites, get_targets, warm_up
+
+
+try:
+    # Management commands write native strings in Python 2
+    from StringIO import StringIO as CommandOutput
+except ImportError:
+    CommandOutput = StringIO
+
+
+class DjangoQLWarmUpTest(TestCase):
+    def setUp(self):
+        clear_introspection_cache()
+        _introspection_payloads.clear()
+
+    def test_targets(self):
+        names = [name for name, _ in get_targets()]
+        self.assertEqual('parser', names[0])
+        self.assertIn('admin (admin): core.book', names)
+        self.assertIn('queryset: core.book', names)
+        self.assertNotIn('queryset: auth.user', names)
+
+    @skipIf(len(all_sites) < 2, 'admin sites are listed in Django 2.1+')
+    def test_all_sites(self):
+        names = [name for name, _ in get_targets()]
+        self.assertIn('admin (zaibatsu): auth.user', names)
+
+    def test_warm_up(self):
+        reported = []
+        warm_up(callback=lambda name, seconds: reported.append(name))
+        self.assertEqual([name for name, _ in get_targets()], reported)
+        self.assertTrue(_introspection_cache)
+        admins = [name for name in reported if name.startswith('admin')]
+        self.assertEqual(len(admins), len(_introspection_payloads))
+
+    def test_ready(self):
+        # Like the test client does, so that the test transaction stays
+        request_started.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        config = apps.get_app_config('djangoql')
+        config.ready()
+        request_started.send(sender=None)
+        self.assertFalse(_introspection_cache)
+        with override_settings(DJANGOQL_WARM_UP=True):
+            config.ready()
+        # Warm-up is done on the first request only
+        self.assertFalse(_introspection_cache)
+        request_started.send(sender=None)
+        self.assertTrue(_introspection_payloads)
+        _introspection_payloads.clear()
+        request_started.send(sender=None)
+        self.assertFalse(_introspection_payloads)
+
+    def test_command(self):
+        out = CommandOutput()
+        call_command('djangoql_warm_up', stdout=out)
+        output = out.getvalue()
+        self.assertIn('admin (admin): core.book', output)
+        self.assertIn('Total', output)